@@ -20,7 +20,9 @@ echo ""
 
 # Install packages
 echo "1. Installing python-pptx (PowerPoint processing)..."
-pip3 install python-pptx
+# Pinned: pptxZip subclasses python-pptx's private PackageWriter
+# (scripts/test_compression_profiles.py checks it before moving the pin)
+pip3 install "python-pptx>=1.0.2,<1.1"
 
 echo ""
 echo "2. Installing Pillow (image processing)..."
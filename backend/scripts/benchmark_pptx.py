@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+BD Bible PowerPoint Benchmark Script
+Times the four PPTX services against synthetic templates of growing size and
+compares the results with a stored JSON baseline
+
+Services measured:
+    create_quad_chart     QuadChartGenerator.create_quad_chart (one chart per slide)
+    fill_quad_chart       QuadChartFiller.fill_quad_chart ("[Placeholder]" keys)
+    replace_placeholders  TemplateReplicator.replace_placeholders ("{{PLACEHOLDER}}" keys)
+    analyze_template      analyzeTemplate.analyze_template (cold analysis cache)
+
+Every (service, size) case runs in a fresh process so peak RSS is its own.
+
+Usage:
+    python benchmark_pptx.py                       # run and compare with the baseline
+    python benchmark_pptx.py --save-baseline       # run and store the results as the baseline
+    python benchmark_pptx.py --sizes small,medium --services fill_quad_chart --repeat 5
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import multiprocessing
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICES_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), 'src', 'services')
+
+# Add services directory to path for imports
+sys.path.append(SERVICES_DIR)
+
+DEFAULT_BASELINE = os.path.join(SCRIPTS_DIR, 'benchmarks', 'pptx_baseline.json')
+DEFAULT_THRESHOLD = 0.15
+BASELINE_VERSION = 1
+
+# Synthetic template sizes: slides, text boxes per slide (each holding
+# placeholders), table rows x columns per slide and embedded images per slide
+SIZES = {
+    'small': {'slides': 4, 'shapes': 8, 'table': [3, 3], 'images': 1},
+    'medium': {'slides': 20, 'shapes': 16, 'table': [6, 4], 'images': 2},
+    'large': {'slides': 80, 'shapes': 24, 'table': [10, 6], 'images': 3}
+}
+SERVICES = ['create_quad_chart', 'fill_quad_chart', 'replace_placeholders', 'analyze_template']
+
+# Metrics compared against the baseline (lower is better)
+COMPARED_METRICS = ['total_seconds', 'peak_rss_kb']
+
+
+def build_template(path, size):
+    """Synthetic template with both placeholder styles in text boxes and table cells"""
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+    from PIL import Image
+
+    prs = Presentation()
+    prs.slide_width = Inches(13.333)
+    prs.slide_height = Inches(7.5)
+    rng = random.Random(42)
+    rows, columns = size['table']
+
+    # A few distinct noise images so media does not collapse to one part
+    images = []
+    for idx in range(size['images']):
+        image = Image.frombytes('RGB', (160, 120), bytes(rng.getrandbits(8) for _ in range(160 * 120 * 3)))
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        images.append(buffer.getvalue())
+
+    for slide_idx in range(size['slides']):
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = f'[Company Name] - {{{{TITLE}}}} ({slide_idx + 1})'
+
+        for shape_idx in range(size['shapes']):
+            left = Inches(0.3 + (shape_idx % 4) * 2.1)
+            top = Inches(1.3 + (shape_idx // 4) * 0.55)
+            box = slide.shapes.add_textbox(left, top, Inches(2), Inches(0.5))
+            paragraph = box.text_frame.paragraphs[0]
+            # Split placeholders across runs like edited templates do
+            for text, bold in ((f'[Field {shape_idx}] / {{{{FIELD', True), (f'_{shape_idx}}}}}', False)):
+                run = paragraph.add_run()
+                run.text = text
+                run.font.bold = bold
+                run.font.size = Pt(10)
+            box.text_frame.add_paragraph().text = 'Static text that never changes'
+
+        table = slide.shapes.add_table(
+            rows, columns, Inches(8.8), Inches(1.3), Inches(4.2), Inches(0.3 * rows)
+        ).table
+        for row in range(rows):
+            for column in range(columns):
+                table.cell(row, column).text = f'[Cell {row}.{column}] {{{{CELL_{row}_{column}}}}}'
+
+        for image_idx, image in enumerate(images):
+            slide.shapes.add_picture(
+                io.BytesIO(image), Inches(8.8 + image_idx * 1.4), Inches(5.5), Inches(1.2), Inches(0.9)
+            )
+
+    prs.save(path)
+
+
+def fill_data(size):
+    """Mapping for QuadChartFiller ("[Placeholder]" keys)"""
+    rows, columns = size['table']
+    data = {'[Company Name]': 'Acme Aerospace'}
+    data.update({f'[Field {idx}]': f'Filled value {idx}' for idx in range(size['shapes'])})
+    data.update({
+        f'[Cell {row}.{column}]': f'R{row}C{column}'
+        for row in range(rows) for column in range(columns)
+    })
+    return data
+
+
+def replicate_data(size):
+    """Mapping for TemplateReplicator ("{{PLACEHOLDER}}" names)"""
+    rows, columns = size['table']
+    data = {'TITLE': 'Advanced Radar System'}
+    data.update({f'FIELD_{idx}': [f'Line one {idx}', f'Line two {idx}'] for idx in range(size['shapes'])})
+    data.update({
+        f'CELL_{row}_{column}': f'{row * columns + column}'
+        for row in range(rows) for column in range(columns)
+    })
+    return data
+
+
+def chart_data(slide_idx):
+    """Quad chart content for QuadChartGenerator"""
+    bullets = '\n'.join(f'• Point {n} for chart {slide_idx}' for n in range(5))
+    return {
+        'title': f'Benchmark Chart {slide_idx + 1}',
+        'client': 'Department of Defense',
+        'technical_approach': bullets,
+        'management_approach': bullets,
+        'past_performance': bullets,
+        'cost_schedule': bullets,
+        'footer': 'Benchmark'
+    }
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KB"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class PhaseTimer:
+    def __init__(self):
+        """Collects per-phase wall clock times for one iteration"""
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+
+def run_create_quad_chart(timer, template_path, size, work_dir):
+    from pptxGenerator import QuadChartGenerator
+
+    with timer.phase('load'):
+        generator = QuadChartGenerator()
+    with timer.phase('fill'):
+        for slide_idx in range(size['slides']):
+            generator.create_quad_chart(chart_data(slide_idx))
+    with timer.phase('save'):
+        generator.save(os.path.join(work_dir, 'generated.pptx'))
+
+
+def run_fill_quad_chart(timer, template_path, size, work_dir):
+    from quadChartFiller import QuadChartFiller
+
+    data = fill_data(size)
+    with timer.phase('load'):
+        filler = QuadChartFiller(template_path)
+    with timer.phase('fill'):
+        filler.fill_quad_chart(data)
+    with timer.phase('save'):
+        filler.save(os.path.join(work_dir, 'filled.pptx'))
+
+
+def run_replace_placeholders(timer, template_path, size, work_dir):
+    from pptxTemplateReplicator import TemplateReplicator
+
+    data = replicate_data(size)
+    with timer.phase('load'):
+        replicator = TemplateReplicator(template_path)
+        replicator.load_template()
+    with timer.phase('fill'):
+        replicator.replace_placeholders(data)
+    with timer.phase('save'):
+        replicator.save(os.path.join(work_dir, 'replicated.pptx'))
+
+
+def run_analyze_template(timer, template_path, size, work_dir):
+    from analyzeTemplate import analyze_template
+    from analysisCache import analysis_cache
+
+    # A fresh cache directory per iteration so every run does the full analysis
+    analysis_cache.directory = tempfile.mkdtemp(dir=work_dir, prefix='analysis_')
+    with timer.phase('analyze'):
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyze_template(template_path)
+
+
+RUNNERS = {
+    'create_quad_chart': run_create_quad_chart,
+    'fill_quad_chart': run_fill_quad_chart,
+    'replace_placeholders': run_replace_placeholders,
+    'analyze_template': run_analyze_template
+}
+
+
+def run_case(service, template_path, size, repeat, results):
+    """Child process entry point: run one case `repeat` times and report its timings"""
+    try:
+        import pptxGenerator, quadChartFiller, pptxTemplateReplicator, analyzeTemplate  # noqa: F401
+        import_rss = peak_rss_kb()
+
+        iterations = []
+        with tempfile.TemporaryDirectory(prefix='pptx_bench_') as work_dir:
+            for _ in range(repeat):
+                timer = PhaseTimer()
+                started = time.perf_counter()
+                RUNNERS[service](timer, template_path, size, work_dir)
+                timer.phases['total'] = time.perf_counter() - started
+                iterations.append(timer.phases)
+
+        results.put({'success': True, 'iterations': iterations, 'import_rss_kb': import_rss,
+                     'peak_rss_kb': peak_rss_kb()})
+    except Exception as e:
+        results.put({'success': False, 'error': f'{type(e).__name__}: {e}'})
+
+
+def summarize(service, size_name, size, outcome):
+    """Reduce a case's iterations to the figures stored in baselines"""
+    if not outcome['success']:
+        return {'service': service, 'size': size_name, 'success': False, 'error': outcome['error']}
+
+    iterations = outcome['iterations']
+    totals = [iteration['total'] for iteration in iterations]
+    phases = {
+        name: {
+            'first': round(iterations[0][name], 5),
+            'median': round(statistics.median(iteration[name] for iteration in iterations), 5),
+            'min': round(min(iteration[name] for iteration in iterations), 5)
+        }
+        for name in iterations[0]
+    }
+    total_seconds = statistics.median(totals)
+
+    return {
+        'service': service,
+        'size': size_name,
+        'success': True,
+        'slides': size['slides'],
+        'repeat': len(iterations),
+        'total_seconds': round(total_seconds, 5),
+        'slides_per_second': round(size['slides'] / total_seconds, 2) if total_seconds else None,
+        'phases': phases,
+        'peak_rss_kb': outcome['peak_rss_kb'],
+        'rss_over_imports_kb': outcome['peak_rss_kb'] - outcome['import_rss_kb']
+    }
+
+
+def run_benchmarks(services, size_names, repeat):
+    """Run every requested case; returns the results document stored as a baseline"""
+    context = multiprocessing.get_context('spawn')
+    cases = {}
+
+    with tempfile.TemporaryDirectory(prefix='pptx_bench_templates_') as template_dir:
+        for size_name in size_names:
+            size = SIZES[size_name]
+            template_path = os.path.join(template_dir, f'{size_name}.pptx')
+            build_template(template_path, size)
+            template_bytes = os.path.getsize(template_path)
+
+            for service in services:
+                queue = context.Queue()
+                process = context.Process(target=run_case, args=(service, template_path, size, repeat, queue))
+                process.start()
+                try:
+                    outcome = queue.get()
+                finally:
+                    process.join()
+
+                case = summarize(service, size_name, size, outcome)
+                case['template_bytes'] = template_bytes
+                cases[f'{service}/{size_name}'] = case
+                print(format_case(case), flush=True)
+
+    return {
+        'version': BASELINE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'sizes': {name: SIZES[name] for name in size_names},
+        'cases': cases
+    }
+
+
+def format_case(case):
+    name = f"{case['service']}/{case['size']}"
+    if not case['success']:
+        return f"❌ {name:<34} {case['error']}"
+    phases = ' '.join(
+        f"{phase}={timing['median'] * 1000:.1f}ms"
+        for phase, timing in case['phases'].items() if phase != 'total'
+    )
+    return (f"  {name:<34} {case['total_seconds'] * 1000:9.1f}ms "
+            f"{case['slides_per_second']:8.1f} slides/s {case['peak_rss_kb'] / 1024:7.1f}MB  {phases}")
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline
+    Returns a list of {case, metric, baseline, current, ratio, status} where status is
+    'regression' or 'improvement' when the ratio moves past the threshold, else 'ok'
+    """
+    comparisons = []
+    for name, case in results['cases'].items():
+        previous = baseline.get('cases', {}).get(name)
+        if not previous or not previous.get('success') or not case.get('success'):
+            continue
+
+        for metric in COMPARED_METRICS:
+            if not previous.get(metric):
+                continue
+            ratio = case[metric] / previous[metric]
+            if ratio > 1 + threshold:
+                status = 'regression'
+            elif ratio < 1 - threshold:
+                status = 'improvement'
+            else:
+                status = 'ok'
+            comparisons.append({
+                'case': name,
+                'metric': metric,
+                'baseline': previous[metric],
+                'current': case[metric],
+                'ratio': round(ratio, 3),
+                'status': status
+            })
+
+    return comparisons
+
+
+def main():
+    """Main function for command-line execution"""
+    parser = argparse.ArgumentParser(description='Benchmark the PPTX services against synthetic templates')
+    parser.add_argument('--sizes', default=','.join(SIZES),
+                        help=f"Comma-separated template sizes ({', '.join(SIZES)})")
+    parser.add_argument('--services', default=','.join(SERVICES),
+                        help=f"Comma-separated services ({', '.join(SERVICES)})")
+    parser.add_argument('--repeat', type=int, default=3, help='Iterations per case (median is reported)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Relative change treated as a regression (0.15 = 15%%)')
+    parser.add_argument('--output', help='Also write the results JSON here')
+    args = parser.parse_args()
+
+    size_names = [name for name in args.sizes.split(',') if name]
+    services = [name for name in args.services.split(',') if name]
+    unknown = [name for name in size_names if name not in SIZES] + [name for name in services if name not in RUNNERS]
+    if unknown:
+        parser.error(f"Unknown size or service: {', '.join(unknown)}")
+
+    print("⏱️  BD Bible PPTX Benchmarks")
+    print("=" * 40)
+    results = run_benchmarks(services, size_names, max(1, args.repeat))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Baseline saved to: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    comparisons = compare(results, baseline, args.threshold)
+    print(f"\n📊 Compared with baseline from {baseline.get('created')} (threshold {args.threshold:.0%})")
+    symbols = {'regression': '🔺', 'improvement': '🔻', 'ok': '  '}
+    for item in comparisons:
+        print(f"{symbols[item['status']]} {item['case']:<34} {item['metric']:<14} "
+              f"{item['baseline']:>12} -> {item['current']:>12}  x{item['ratio']}")
+
+    regressions = [item for item in comparisons if item['status'] == 'regression']
+    failures = [name for name, case in results['cases'].items() if not case['success']]
+    print("\n" + "=" * 40)
+    if regressions or failures:
+        print(f"❌ {len(regressions)} regression(s), {len(failures)} failed case(s)")
+        sys.exit(1)
+    print("✨ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+BD Bible Compression Profile Test Script
+pptxZip.ProfilePackageWriter subclasses python-pptx's private PackageWriter.
+This checks that the internals it relies on are still there and that every
+profile saves the same parts python-pptx's own save does, so a python-pptx
+upgrade that changes them fails here instead of in production renders.
+"""
+
+import io
+import os
+import sys
+import inspect
+import zipfile
+
+# Add services directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'services'))
+
+import pptx
+from pptx import Presentation
+from pptx.util import Inches
+from pptx.opc.serialized import PackageWriter
+from PIL import Image
+
+from pptxZip import COMPRESSION_PROFILES, is_precompressed, save_presentation
+
+# PackageWriter internals used by ProfilePackageWriter
+REQUIRED_METHODS = ['_write_content_types_stream', '_write_pkg_rels', '_write_parts']
+REQUIRED_INIT_PARAMS = ['pkg_file', 'pkg_rels', 'parts']
+
+
+def build_presentation():
+    """Presentation with text and a PNG, so both media handling paths run"""
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[5])
+    slide.shapes.title.text = 'Compression profile test'
+
+    image = io.BytesIO()
+    Image.new('RGB', (64, 64), color='navy').save(image, format='PNG')
+    image.seek(0)
+    slide.shapes.add_picture(image, Inches(1), Inches(2))
+    return prs
+
+
+def check_internals():
+    """True if PackageWriter still has the private API ProfilePackageWriter overrides"""
+    ok = True
+    for name in REQUIRED_METHODS:
+        if not callable(getattr(PackageWriter, name, None)):
+            print(f"❌ PackageWriter.{name} is missing")
+            ok = False
+    params = list(inspect.signature(PackageWriter.__init__).parameters)[1:]
+    if params[:len(REQUIRED_INIT_PARAMS)] != REQUIRED_INIT_PARAMS:
+        print(f"❌ PackageWriter.__init__ takes {params}, expected {REQUIRED_INIT_PARAMS}")
+        ok = False
+    if ok:
+        print(f"✅ PackageWriter internals present (python-pptx {pptx.__version__})")
+    return ok
+
+
+def check_profile(name, expected):
+    """True if a profile's output has python-pptx's parts and the profile's compression"""
+    output = io.BytesIO()
+    save_presentation(build_presentation(), output, name)
+    output.seek(0)
+
+    with zipfile.ZipFile(output) as saved:
+        members = {info.filename: info for info in saved.infolist()}
+        if sorted(members) != sorted(expected):
+            print(f"❌ {name}: members differ from Presentation.save")
+            return False
+        if any(saved.read(member) != expected[member] for member in members
+               if not member.startswith('docProps/')):
+            print(f"❌ {name}: part content differs from Presentation.save")
+            return False
+        store_media = COMPRESSION_PROFILES[name]['store_media']
+        for member, info in members.items():
+            stored = info.compress_type == zipfile.ZIP_STORED
+            if stored != (store_media and is_precompressed(member)):
+                print(f"❌ {name}: {member} has the wrong compression method")
+                return False
+
+    output.seek(0)
+    Presentation(output)
+    print(f"✅ {name}: {len(members)} members, reopens with python-pptx")
+    return True
+
+
+def test_compression_profiles():
+    print("🧪 Testing pptxZip compression profiles")
+    print("=" * 40)
+
+    passed = check_internals()
+    if passed:
+        reference = io.BytesIO()
+        build_presentation().save(reference)
+        reference.seek(0)
+        with zipfile.ZipFile(reference) as saved:
+            expected = {member: saved.read(member) for member in saved.namelist()}
+        for name in COMPRESSION_PROFILES:
+            passed &= check_profile(name, expected)
+
+    print("\n" + "=" * 40)
+    if not passed:
+        print("❌ pptxZip no longer matches this python-pptx version; see install-python-packages.sh")
+        sys.exit(1)
+    print("✨ Compression profiles match python-pptx's package writer!")
+
+
+if __name__ == "__main__":
+    test_compression_profiles()
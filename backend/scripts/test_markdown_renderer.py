@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+BD Bible Markdown Renderer Test Script
+Regression checks for markdownRenderer: link labels holding code spans or
+escaped characters, and documents without headings, which must still come
+back as one (preamble) section so paged and section requests serve them.
+"""
+
+import os
+import sys
+
+# Add services directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'services'))
+
+from markdownRenderer import render_inline, render_markdown
+
+INLINE_CASES = [
+    ('[`code` here](http://x)', '<a href="http://x"><code>code</code> here</a>'),
+    ('[a\\*b](http://x)', '<a href="http://x">a*b</a>'),
+    ('`before` [`x` \\_y\\_](https://x "T") `after`',
+     '<code>before</code> <a href="https://x" title="T"><code>x</code> _y_</a> <code>after</code>'),
+    ('[`run` it](javascript:alert(1))', '<code>run</code> it'),
+    ('[outer [inner]](http://x)', '<a href="http://x">outer [inner]</a>')
+]
+
+
+def check_inline():
+    """True if every inline case renders as expected"""
+    ok = True
+    for markdown, expected in INLINE_CASES:
+        try:
+            rendered = render_inline(markdown)
+        except Exception as e:
+            print(f"❌ {markdown!r} raised {type(e).__name__}: {e}")
+            ok = False
+            continue
+        if rendered != expected:
+            print(f"❌ {markdown!r} rendered {rendered!r}")
+            ok = False
+    if ok:
+        print(f"✅ {len(INLINE_CASES)} link labels with code spans and escapes")
+    return ok
+
+
+def check_sections():
+    """True if documents with and without headings are fully covered by their sections"""
+    ok = True
+    for markdown, ids in [
+        ('Plain roles document\n\n- Capture\n- Proposal\n', ['preamble']),
+        ('Intro\n\n# Capture\nText\n', ['preamble', 'capture']),
+        ('# Capture\nText\n', ['capture'])
+    ]:
+        html_text, sections = render_markdown(markdown)
+        if [section['id'] for section in sections] != ids:
+            print(f"❌ {markdown!r}: sections {[section['id'] for section in sections]}, expected {ids}")
+            ok = False
+        elif sections[0]['start'] != 0 or sections[-1]['end'] != len(html_text):
+            print(f"❌ {markdown!r}: sections do not cover the rendered HTML")
+            ok = False
+    if ok:
+        print("✅ Sections cover documents with and without headings")
+    return ok
+
+
+def test_markdown_renderer():
+    print("🧪 Testing markdown renderer")
+    print("=" * 40)
+
+    passed = check_inline()
+    passed &= check_sections()
+
+    print("\n" + "=" * 40)
+    if not passed:
+        print("❌ Markdown renderer regressions found")
+        sys.exit(1)
+    print("✨ Markdown renderer checks passed!")
+
+
+if __name__ == "__main__":
+    test_markdown_renderer()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+BD Bible Section Offset Test Script
+sectionIndex serves sections by byte range straight from the source file, so
+its offsets have to be exact on disk bytes. This checks them on files with
+CRLF line endings and invalid UTF-8, where decoded text and bytes differ.
+"""
+
+import os
+import sys
+import tempfile
+
+# Add services directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'services'))
+
+from sectionIndex import SectionIndex
+
+DOCUMENTS = {
+    'crlf.md': b'Intro line\r\n\r\n# Capture\r\nWin themes\r\n\r\n## Pricing\r\nVolume\r\n# Proposal\r\nDone\r\n',
+    'invalid.md': b'# First\nbad \xff\xfe bytes \xe2\x82\n# Second\nafter\n',
+    'outline.txt': b'Preface\r\n1\tStrategy\r\nText \xc3\xa9\r\n1.1\tGates\r\nMore\r\n'
+}
+
+
+def check_document(index, relative, data):
+    """True if every section's byte range starts at its heading and they tile the file"""
+    entries = index.get(relative)['sections']
+    position = 0
+    for entry in entries:
+        chunk = data[entry['offset']:entry['offset'] + entry['length']]
+        if entry['offset'] != position:
+            print(f"❌ {relative}#{entry['id']}: starts at byte {entry['offset']}, expected {position}")
+            return False
+        if entry['level'] and entry['title'].encode('utf-8') not in chunk.split(b'\n', 1)[0]:
+            print(f"❌ {relative}#{entry['id']}: range does not start at its heading: {chunk[:30]!r}")
+            return False
+        position += entry['length']
+    if position != len(data):
+        print(f"❌ {relative}: sections cover {position} of {len(data)} bytes")
+        return False
+
+    content = index.section(relative, entries[-1]['id'])['content']
+    if content != data[entries[-1]['offset']:].decode('utf-8', errors='replace'):
+        print(f"❌ {relative}: last section reads back {content!r}")
+        return False
+    print(f"✅ {relative}: {len(entries)} sections on exact byte ranges")
+    return True
+
+
+def test_section_offsets():
+    print("🧪 Testing section byte offsets")
+    print("=" * 40)
+
+    passed = True
+    with tempfile.TemporaryDirectory() as root:
+        for name, data in DOCUMENTS.items():
+            with open(os.path.join(root, name), 'wb') as f:
+                f.write(data)
+        index = SectionIndex(root=root, directory=os.path.join(root, 'index'))
+        for name, data in DOCUMENTS.items():
+            passed &= check_document(index, name, data)
+
+    print("\n" + "=" * 40)
+    if not passed:
+        print("❌ Section offsets drift from the file's bytes")
+        sys.exit(1)
+    print("✨ Section offsets match the file's bytes!")
+
+
+if __name__ == "__main__":
+    test_section_offsets()
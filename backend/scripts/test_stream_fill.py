@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+BD Bible Streaming Fill Test Script
+Checks that the raw-XML streaming fill produces the same content as the
+python-pptx object-model fill, and that untouched members are copied raw
+"""
+
+import io
+import os
+import sys
+import zipfile
+import tempfile
+from lxml import etree
+
+# Add services directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'services'))
+
+from pptx import Presentation
+from pptx.util import Inches
+from PIL import Image
+
+from quadChartFiller import fill_template_from_json
+from pptxTemplateReplicator import process_template
+from pptxStreamFill import stream_fill
+
+REAL_TEMPLATE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'templates', 'powerpoint', 'space-bd-quad-charts.pptx'
+)
+CT_NS = '{http://schemas.openxmlformats.org/package/2006/content-types}'
+
+
+def build_template(path):
+    """Template with an image, split-run placeholders, a table and a group"""
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+
+    image = io.BytesIO()
+    Image.new('RGB', (64, 64), color='navy').save(image, format='PNG')
+    image.seek(0)
+    slide.shapes.add_picture(image, Inches(8), Inches(0.2), Inches(1), Inches(1))
+
+    # Placeholders split across runs with different formatting
+    box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(6), Inches(1))
+    paragraph = box.text_frame.paragraphs[0]
+    for text, bold in (('Client: {{CLIENT', True), ('_NAME}} / [Project ', False), ('Title]', True)):
+        run = paragraph.add_run()
+        run.text = text
+        run.font.bold = bold
+    box.text_frame.add_paragraph().text = '{{MISSING}} stays, {{SUMMARY}} fills'
+
+    table = slide.shapes.add_table(2, 2, Inches(0.5), Inches(2), Inches(6), Inches(1)).table
+    table.cell(0, 0).text = '{{CLIENT_NAME}}'
+    table.cell(1, 1).text = 'Value: [Contract Value]'
+
+    group = slide.shapes.add_group_shape()
+    inner = group.shapes.add_textbox(Inches(0.5), Inches(4), Inches(4), Inches(1))
+    inner.text_frame.text = '{{SUMMARY}} and [Project Title]'
+
+    second = prs.slides.add_slide(prs.slide_layouts[6])
+    second.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.text = 'No placeholders'
+
+    prs.save(path)
+
+
+def canonical_xml(data):
+    parser = etree.XMLParser(remove_blank_text=True)
+    root = etree.fromstring(data, parser)
+    try:
+        return etree.tostring(root, method='c14n')
+    except etree.C14NError:
+        # Some Office parts use namespace URIs C14N rejects; compare plain serialization
+        return etree.tostring(root)
+
+
+def relationships(data):
+    """Relationships as a set; python-pptx reorders them on save"""
+    root = etree.fromstring(data)
+    return {tuple(sorted(rel.attrib.items())) for rel in root}
+
+
+def content_types(data):
+    """Resolve the content type of every part from [Content_Types].xml"""
+    root = etree.fromstring(data)
+    defaults = {d.get('Extension').lower(): d.get('ContentType') for d in root.iter(f'{CT_NS}Default')}
+    overrides = {o.get('PartName'): o.get('ContentType') for o in root.iter(f'{CT_NS}Override')}
+    return defaults, overrides
+
+
+def compare_packages(expected_path, actual_path):
+    """Return a list of differences between two packages' content"""
+    problems = []
+    with zipfile.ZipFile(expected_path) as expected, zipfile.ZipFile(actual_path) as actual:
+        expected_names = set(expected.namelist())
+        actual_names = set(actual.namelist())
+        if expected_names != actual_names:
+            problems.append(f'member sets differ: {sorted(expected_names ^ actual_names)}')
+
+        for name in sorted(expected_names & actual_names):
+            left, right = expected.read(name), actual.read(name)
+            if name == '[Content_Types].xml':
+                left_defaults, left_overrides = content_types(left)
+                right_defaults, right_overrides = content_types(right)
+                for part in expected_names - {name}:
+                    part_name = '/' + part
+                    extension = part.rsplit('.', 1)[-1].lower()
+                    if (left_overrides.get(part_name, left_defaults.get(extension)) !=
+                            right_overrides.get(part_name, right_defaults.get(extension))):
+                        problems.append(f'content type differs for {part_name}')
+            elif name.endswith('.rels'):
+                if relationships(left) != relationships(right):
+                    problems.append(f'relationships differ: {name}')
+            elif name.endswith('.xml'):
+                if canonical_xml(left) != canonical_xml(right):
+                    problems.append(f'XML differs: {name}')
+            elif left != right:
+                problems.append(f'bytes differ: {name}')
+    return problems
+
+
+def check_raw_copies(template_path, output_path, result):
+    """Every member except rewritten slides must be copied without recompression"""
+    problems = []
+    with zipfile.ZipFile(template_path) as source, zipfile.ZipFile(output_path) as output:
+        rewritten = 0
+        for info in source.infolist():
+            copied = output.getinfo(info.filename)
+            if (copied.compress_size, copied.CRC, copied.compress_type) != \
+                    (info.compress_size, info.CRC, info.compress_type):
+                rewritten += 1
+                if '/slides/slide' not in info.filename:
+                    problems.append(f'{info.filename} was not copied raw')
+        if output.testzip() is not None:
+            problems.append('output archive fails CRC check')
+    if rewritten > result['slides_rewritten']:
+        problems.append(f'{rewritten} members changed, expected {result["slides_rewritten"]}')
+    return problems
+
+
+def run_case(label, template_path, data, mode, workdir):
+    model_path = os.path.join(workdir, f'{label}_model.pptx')
+    stream_path = os.path.join(workdir, f'{label}_stream.pptx')
+
+    if mode == 'replicate':
+        model_result = process_template(template_path, data, model_path)
+    else:
+        fill_template_from_json(template_path, data, model_path)
+        model_result = None
+    result = stream_fill(template_path, data, stream_path, mode)
+
+    problems = compare_packages(model_path, stream_path)
+    problems += check_raw_copies(template_path, stream_path, result)
+    if model_result is not None:
+        expected = sorted((r['slide'], r['placeholder']) for r in model_result['replacements_made'])
+        actual = sorted((r['slide'], r['placeholder']) for r in result['replacements_made'])
+        if sorted(set(expected)) != sorted(set(actual)):
+            problems.append(f'reported replacements differ: {expected} vs {actual}')
+
+    # The stream output must still open in python-pptx
+    Presentation(stream_path)
+
+    if problems:
+        print(f"❌ {label}: {result['replacement_count']} replacements")
+        for problem in problems:
+            print(f"   - {problem}")
+        return False
+
+    print(f"✅ {label}: {result['replacement_count']} replacements, "
+          f"{result['members_copied']} members copied raw")
+    return True
+
+
+def test_stream_fill():
+    print("🧪 Testing Streaming Fill Against Object-Model Fill")
+    print("=" * 40)
+
+    fill_data = {
+        '{{CLIENT_NAME}}': 'Department of Defense',
+        '[Project Title]': 'Orbital Logistics',
+        '[Contract Value]': 1250000,
+        '{{SUMMARY}}': ['Line one', 'Line two'],
+        'Unused': None
+    }
+    replicate_data = {
+        'CLIENT_NAME': 'NASA <Goddard> & Partners',
+        'SUMMARY': ['First point', 'Second point']
+    }
+
+    passed = True
+    with tempfile.TemporaryDirectory() as workdir:
+        synthetic = os.path.join(workdir, 'synthetic.pptx')
+        build_template(synthetic)
+
+        passed &= run_case('synthetic_fill', synthetic, fill_data, 'fill', workdir)
+        passed &= run_case('synthetic_replicate', synthetic, replicate_data, 'replicate', workdir)
+
+        if os.path.exists(REAL_TEMPLATE):
+            real_data = {
+                'Company Name': 'Acme Aerospace',
+                'Technical Approach': ['Reusable bus', 'Modular payloads'],
+                'Contract Value': '$2.5M'
+            }
+            passed &= run_case('real_fill', REAL_TEMPLATE, real_data, 'fill', workdir)
+            passed &= run_case('real_replicate', REAL_TEMPLATE, replicate_data, 'replicate', workdir)
+        else:
+            print("⚠️ Real quad chart template not found, skipping")
+
+    print("\n" + "=" * 40)
+    if not passed:
+        print("❌ Streaming fill output differs from object-model output")
+        sys.exit(1)
+    print("✨ Streaming fill matches object-model fill!")
+
+
+if __name__ == "__main__":
+    test_stream_fill()
@@ -1,5 +1,71 @@
 const fs = require('fs').promises;
+const { createReadStream } = require('fs');
 const path = require('path');
+const crypto = require('crypto');
+const renderWorker = require('./services/renderWorker');
+
+// Pre-rendered HTML records by requested document, reused while the source's size and mtime are unchanged
+const renderedHtml = new Map();
+
+const getRenderedHtml = async (document) => {
+  const cached = renderedHtml.get(document);
+  if (cached) {
+    const stat = await fs.stat(cached.record.source_path).catch(() => null);
+    if (stat && cached.mtimeMs === stat.mtimeMs && cached.size === stat.size) {
+      return cached.record;
+    }
+  }
+  const record = await renderWorker.submit('rendered_html', { document });
+  const stat = await fs.stat(record.source_path);
+  renderedHtml.set(document, { mtimeMs: stat.mtimeMs, size: stat.size, record });
+  return record;
+};
+
+// Serve a document's rendered HTML (whole, ?section=ID or ?page=N&pageSize=M) with a strong ETag.
+// Revalidations answer 304 from the in-memory record without touching the worker or the HTML file.
+const sendRenderedHtml = async (req, res, document) => {
+  const record = await getRenderedHtml(document);
+  let sections = record.sections;
+  let etag = record.etag;
+
+  if (req.query.section !== undefined) {
+    const section = sections.find(s => s.id === req.query.section);
+    if (!section) {
+      return res.status(404).json({ error: `Section not found: ${req.query.section}` });
+    }
+    sections = [section];
+    etag = section.etag;
+  } else if (req.query.page !== undefined) {
+    const page = parseInt(req.query.page, 10) || 0;
+    const pageSize = Math.min(parseInt(req.query.pageSize, 10) || 20, 200);
+    sections = record.sections.slice(page * pageSize, (page + 1) * pageSize);
+    etag = crypto.createHash('sha256').update(sections.map(s => s.etag).join(',')).digest('hex').slice(0, 32);
+    res.set('X-Has-More', String((page + 1) * pageSize < record.sections.length));
+  }
+
+  res.set({
+    'ETag': `"${etag}"`,
+    'Cache-Control': 'no-cache',
+    'Content-Type': 'text/html; charset=utf-8',
+    'X-Total-Sections': String(record.sections.length),
+    'Access-Control-Expose-Headers': 'ETag, X-Total-Sections, X-Has-More'
+  });
+  if (req.fresh) {
+    return res.status(304).end();
+  }
+
+  const start = sections === record.sections ? 0 : (sections.length ? sections[0].offset : 0);
+  const end = sections === record.sections
+    ? record.length
+    : (sections.length ? sections[sections.length - 1].offset + sections[sections.length - 1].length : 0);
+  res.set('Content-Length', String(end - start));
+  if (end <= start) {
+    return res.end();
+  }
+  createReadStream(record.html_path, { start, end: end - 1 })
+    .on('error', (error) => res.destroy(error))
+    .pipe(res);
+};
 
 const setupContentRoutes = (app) => {
   // List documents endpoint
@@ -28,12 +94,104 @@ const setupContentRoutes = (app) => {
     }
   });
 
+  // Ranked full-text search over the BD Bible sections
+  app.get('/api/content/search', async (req, res) => {
+    const query = (req.query.q || '').trim();
+    if (!query) {
+      return res.status(400).json({ error: 'Search query (q) is required' });
+    }
+
+    try {
+      const limit = Math.min(parseInt(req.query.limit, 10) || 10, 50);
+      const { total, results } = await renderWorker.submit('search', { query, limit });
+      res.json({ query, total, results });
+    } catch (error) {
+      console.error('Search error:', error);
+      res.status(500).json({ error: 'Search failed' });
+    }
+  });
+
+  // Precomputed related sections of a document, or of one of its sections
+  app.get('/api/content/related', async (req, res) => {
+    const { document, section } = req.query;
+    if (!document) {
+      return res.status(400).json({ error: 'Document is required' });
+    }
+
+    try {
+      const limit = Math.min(parseInt(req.query.limit, 10) || 10, 50);
+      const { file, related } = await renderWorker.submit('related', { document, section, limit });
+      res.json({ file, section: section || null, related });
+    } catch (error) {
+      if (/^Unknown (document|section)/.test(error.message)) {
+        return res.status(404).json({ error: error.message });
+      }
+      console.error('Related sections error:', error);
+      res.status(500).json({ error: 'Failed to load related sections' });
+    }
+  });
+
+  // Pre-rendered HTML of any content document, by corpus path or file name
+  app.get('/api/content/html', async (req, res) => {
+    const document = (req.query.document || '').trim();
+    if (!document) {
+      return res.status(400).json({ error: 'Document is required' });
+    }
+    try {
+      await sendRenderedHtml(req, res, document);
+    } catch (error) {
+      res.status(404).json({ error: 'Document not found' });
+    }
+  });
+
+  // Pre-rendered HTML of a documentation page
+  app.get('/api/content/documentation/:slug/html', async (req, res) => {
+    try {
+      const filePath = path.join(__dirname, '../data/content/documentation', `${req.params.slug}.md`);
+      await sendRenderedHtml(req, res, filePath);
+    } catch (error) {
+      res.status(404).json({ error: 'Document not found' });
+    }
+  });
+
+  // Table of contents of a document, from its section index
+  app.get('/api/content/documentation/:slug/toc', async (req, res) => {
+    try {
+      const filePath = path.join(__dirname, '../data/content/documentation', `${req.params.slug}.md`);
+      const { sections, toc } = await renderWorker.submit('document_toc', { path: filePath });
+      res.json({ slug: req.params.slug, sections, toc });
+    } catch (error) {
+      res.status(404).json({ error: 'Document not found' });
+    }
+  });
+
   // Get specific document
   app.get('/api/content/documentation/:slug', async (req, res) => {
     try {
       const { slug } = req.params;
       const filePath = path.join(__dirname, '../data/content/documentation', `${slug}.md`);
-      
+
+      // ?section=ID or ?page=N: read just that byte range through the section index
+      const { section, page } = req.query;
+      if (section !== undefined || page !== undefined) {
+        const result = await renderWorker.submit('document_read', {
+          path: filePath,
+          section,
+          page: parseInt(page, 10) || 0,
+          page_size: Math.min(parseInt(req.query.pageSize, 10) || 20, 200)
+        });
+        return res.json({
+          content: result.content,
+          slug: slug,
+          type: 'documentation',
+          section: result.section,
+          sections: result.sections,
+          page: result.page,
+          totalSections: result.total_sections,
+          hasMore: result.has_more
+        });
+      }
+
       const content = await fs.readFile(filePath, 'utf-8');
       res.json({ 
         content: content,
@@ -7,6 +7,7 @@ const express = require('express');
 const router = express.Router();
 const { Op } = require('sequelize');
 const path = require('path');
+const crypto = require('crypto');
 const fs = require('fs').promises;
 const multer = require('multer');
 const { authenticateToken, authorizeRole } = require('../middleware/auth');
@@ -58,6 +59,60 @@ router.get('/templates/preview/:filename', async (req, res) => {
     }
 });
 
+/**
+ * GET /api/quad-chart-workflow/previews/:filename
+ * Serve rendered slide thumbnails (see pptxGenerator.generatePreview)
+ */
+router.get('/previews/:filename', authenticateToken, async (req, res) => {
+    // Thumbnails are named <render hash>_<width>.png
+    if (!/^[0-9a-f]{64}_\d+\.png$/.test(req.params.filename)) {
+        return res.status(404).json({ error: 'Preview not found' });
+    }
+
+    res.sendFile(path.join(pptxGenerator.previewDir, req.params.filename), (error) => {
+        if (error && !res.headersSent) {
+            res.status(404).json({ error: 'Preview not found' });
+        }
+    });
+});
+
+// Thumbnail sizes a client may ask for (slidePreview.THUMBNAIL_SIZES)
+const PREVIEW_SIZES = ['small', 'medium', 'large'];
+
+/**
+ * GET /api/quad-chart-workflow/:id/preview
+ * Render (or fetch the cached) thumbnail of a quad chart
+ */
+router.get('/:id/preview', authenticateToken, async (req, res) => {
+    const { size } = req.query;
+    if (size !== undefined && !PREVIEW_SIZES.includes(size)) {
+        return res.status(400).json({ error: `size must be one of: ${PREVIEW_SIZES.join(', ')}` });
+    }
+
+    try {
+        const quadChart = await QuadChartSubmission.findOne({
+            where: {
+                id: req.params.id,
+                [Op.or]: [
+                    { userId: req.user.id },
+                    { '$creator.manager_id$': req.user.id }
+                ]
+            },
+            include: ['creator']
+        });
+
+        if (!quadChart) {
+            return res.status(404).json({ error: 'Quad chart not found' });
+        }
+
+        const previewUrl = await pptxGenerator.generatePreview(quadChart, { size });
+        res.json({ previewUrl });
+    } catch (error) {
+        console.error('Error generating preview:', error);
+        res.status(500).json({ error: 'Failed to generate preview' });
+    }
+});
+
 /**
  * POST /api/quad-charts/create
  * Create a new quad chart
@@ -305,6 +360,37 @@ router.get('/:id/download', authenticateToken, async (req, res) => {
             return res.status(404).json({ error: 'Quad chart not found' });
         }
 
+        const downloadName = `${quadChart.opportunityName}_QuadChart.pptx`;
+
+        if (process.env.PPTX_DOWNLOAD_STREAM === 'true') {
+            // Stream the worker's render into the response; failures before the first byte get a 500
+            res.attachment(downloadName);
+            try {
+                await pptxGenerator.streamQuadChart(quadChart, res);
+            } catch (error) {
+                if (res.headersSent) {
+                    // Part of the file is already out; abort rather than send a broken .pptx
+                    console.error('Error streaming PowerPoint:', error);
+                    res.destroy(error);
+                    return;
+                }
+                // Nothing sent yet: answer with a JSON error, not an attachment
+                res.removeHeader('Content-Disposition');
+                res.removeHeader('Content-Type');
+                throw error;
+            }
+
+            await QuadChartHistory.create({
+                quadChartId: quadChart.id,
+                userId: req.user.id,
+                action: 'downloaded',
+                versionNumber: quadChart.versionNumber,
+                ipAddress: req.ip,
+                userAgent: req.get('user-agent')
+            });
+            return;
+        }
+
         // Generate PowerPoint
         const pptxPath = await pptxGenerator.generateQuadChart(quadChart);
 
@@ -319,7 +405,7 @@ router.get('/:id/download', authenticateToken, async (req, res) => {
         });
 
         // Send file
-        res.download(pptxPath, `${quadChart.opportunityName}_QuadChart.pptx`, async (err) => {
+        res.download(pptxPath, downloadName, async (err) => {
             if (err) {
                 console.error('Error sending file:', err);
             }
@@ -441,6 +527,81 @@ router.get('/all', authenticateToken, authorizeRole(['admin', 'manager']), async
     }
 });
 
+// Background regenerate runs by job ID; finished runs are kept for an hour for polling
+const regenerateJobs = new Map();
+const REGENERATE_JOB_TTL_MS = 60 * 60 * 1000;
+
+/**
+ * POST /api/quad-chart-workflow/regenerate
+ * Re-render every approved quad chart, e.g. after a template fix (admin only)
+ * Responds 202 with a job ID right away; poll GET /api/quad-chart-workflow/regenerate/:jobId
+ */
+router.post('/regenerate', authenticateToken, authorizeRole(['admin']), async (req, res) => {
+    try {
+        const where = { status: 'approved' };
+        if (req.body.templateName) {
+            where.templateName = req.body.templateName;
+        }
+
+        const quadCharts = await QuadChartSubmission.findAll({ where });
+        const job = {
+            jobId: crypto.randomBytes(8).toString('hex'),
+            status: 'running',
+            total: quadCharts.length,
+            completed: 0,
+            succeeded: 0,
+            failed: [],
+            startedAt: new Date().toISOString(),
+            finishedAt: null
+        };
+        regenerateJobs.set(job.jobId, job);
+
+        pptxGenerator.generateBatch(quadCharts, {
+            workers: req.body.workers,
+            onProgress: (event) => {
+                if (event.event === 'job') {
+                    job.completed += 1;
+                }
+            }
+        }).then((results) => {
+            job.failed = results.filter(result => !result.success);
+            job.succeeded = results.length - job.failed.length;
+            job.completed = results.length;
+            job.status = 'completed';
+        }).catch((error) => {
+            console.error('Error regenerating quad charts:', error);
+            job.status = 'failed';
+            job.error = error.message;
+        }).finally(() => {
+            job.finishedAt = new Date().toISOString();
+            setTimeout(() => regenerateJobs.delete(job.jobId), REGENERATE_JOB_TTL_MS).unref();
+        });
+
+        res.status(202).json({
+            message: `Regenerating ${quadCharts.length} quad charts`,
+            jobId: job.jobId,
+            total: quadCharts.length,
+            // Built from the mount point so it always names the GET route below
+            statusUrl: `${req.baseUrl}/regenerate/${job.jobId}`
+        });
+    } catch (error) {
+        console.error('Error regenerating quad charts:', error);
+        res.status(500).json({ error: 'Failed to regenerate quad charts' });
+    }
+});
+
+/**
+ * GET /api/quad-chart-workflow/regenerate/:jobId
+ * Progress and outcome of a regenerate run (admin only)
+ */
+router.get('/regenerate/:jobId', authenticateToken, authorizeRole(['admin']), (req, res) => {
+    const job = regenerateJobs.get(req.params.jobId);
+    if (!job) {
+        return res.status(404).json({ error: 'Regenerate job not found' });
+    }
+    res.json(job);
+});
+
 /**
  * POST /api/quad-charts/:id/approve
  * Approve a quad chart (admin/manager only)
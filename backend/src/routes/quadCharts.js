@@ -149,6 +149,24 @@ router.delete('/:id', verifyToken, async (req, res) => {
   }
 });
 
+// POST /api/quad-charts/check-fit - Report whether quadrant content fits, and at which font size
+router.post('/check-fit', verifyToken, async (req, res) => {
+  try {
+    const result = await pptxService.checkTextFit(req.body || {});
+
+    res.json({
+      success: true,
+      data: result
+    });
+  } catch (error) {
+    console.error('Error checking text fit:', error);
+    res.status(500).json({
+      success: false,
+      error: error.message || 'Failed to check text fit'
+    });
+  }
+});
+
 // POST /api/quad-charts/:id/generate-pptx - Generate PowerPoint
 router.post('/:id/generate-pptx', verifyToken, async (req, res) => {
   try {
@@ -185,6 +203,38 @@ router.post('/:id/generate-pptx', verifyToken, async (req, res) => {
   }
 });
 
+// POST /api/quad-charts/generate-deck - Generate many charts as one deck or separate files
+router.post('/generate-deck', verifyToken, async (req, res) => {
+  try {
+    const { ids, combined = true } = req.body || {};
+
+    const charts = Array.isArray(ids) && ids.length > 0
+      ? ids.map(id => quadChartModel.findById(id)).filter(Boolean)
+      : quadChartModel.findAll();
+
+    if (charts.length === 0) {
+      return res.status(404).json({
+        success: false,
+        error: 'No quad charts found'
+      });
+    }
+
+    const result = await pptxService.generateQuadChartBatch(charts, { combined: combined !== false });
+
+    res.json({
+      success: true,
+      data: result,
+      message: `${result.generated} of ${charts.length} quad charts generated`
+    });
+  } catch (error) {
+    console.error('Error generating PPTX deck:', error);
+    res.status(500).json({
+      success: false,
+      error: error.message || 'Failed to generate PowerPoint deck'
+    });
+  }
+});
+
 // GET /api/quad-charts/download/:filename - Download generated PPTX
 router.get('/download/:filename', verifyToken, async (req, res) => {
   try {
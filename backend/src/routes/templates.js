@@ -122,7 +122,7 @@ router.post('/:id/clone', verifyToken, async (req, res) => {
 router.get('/:id/history', verifyToken, async (req, res) => {
   try {
     const templateId = req.params.id;
-    const history = TemplateManager.getTemplateHistory(templateId);
+    const history = await TemplateManager.getTemplateHistory(templateId);
     res.json({ success: true, history });
   } catch (error) {
     console.error('Error fetching template history:', error);
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Persistent, incremental template analysis cache
+Analysis results are stored per template content hash, and per slide under a
+hash of the slide's XML (plus its relationships, layout, master and theme). Re-analyzing an
+edited template therefore only walks the slides whose XML actually changed;
+unchanged slides are served from earlier results, even across templates.
+"""
+
+import os
+import json
+import hashlib
+import zipfile
+import tempfile
+import threading
+from lxml import etree
+
+from templateCache import template_cache
+from pptxStreamFill import P_NS, presentation_part_name, read_rels, rels_part_name, slide_order
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ANALYSIS_DIR = os.environ.get(
+    'TEMPLATE_ANALYSIS_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'template_analysis')
+)
+
+# Analyzer code; editing any of these invalidates stored results
+ANALYZER_SOURCES = ['analyzeTemplate.py', 'pptxTemplateReplicator.py', 'analysisCache.py']
+RELATIONSHIPS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+SLIDE_LAYOUT_REL = f'{RELATIONSHIPS}/slideLayout'
+SLIDE_MASTER_REL = f'{RELATIONSHIPS}/slideMaster'
+THEME_REL = f'{RELATIONSHIPS}/theme'
+
+
+def analyzer_version():
+    """Hash of the analyzer source files"""
+    digest = hashlib.sha256()
+    for name in ANALYZER_SOURCES:
+        path = os.path.join(SERVICES_DIR, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:16]
+
+
+ANALYZER_VERSION = analyzer_version()
+
+
+def canonical_xml(data):
+    """XML bytes independent of declaration and quoting style, so re-saved parts hash the same"""
+    return etree.tostring(etree.fromstring(data))
+
+
+def slide_keys(template_path):
+    """
+    Return (slide size, [slide key, ...] in presentation order) straight from the package
+    A slide's key covers its XML, its relationships and the layout, master and
+    theme it inherits from (fonts, colours, placeholder geometry), which is
+    everything the slide analysis reads. Parts are hashed in canonical form so a
+    template re-saved by another tool only misses on slides whose content changed.
+    """
+    with zipfile.ZipFile(template_path) as source:
+        order = slide_order(source)
+        names = set(source.namelist())
+        # Layouts, masters and themes are shared by many slides; hash each once
+        part_hashes = {}
+
+        def part_hash(part_name):
+            if part_name not in part_hashes:
+                part_hashes[part_name] = hashlib.sha256(canonical_xml(source.read(part_name))).digest()
+            return part_hashes[part_name]
+
+        part_rels = {}
+
+        def related_part(part_name, rel_type):
+            """Target of a part's first relationship of a type, if it is in the package"""
+            if part_name not in part_rels:
+                part_rels[part_name] = read_rels(source, part_name) \
+                    if rels_part_name(part_name) in names else {}
+            for target_type, target in part_rels[part_name].values():
+                if target_type == rel_type and target in names:
+                    return target
+            return None
+
+        presentation = etree.fromstring(source.read(presentation_part_name(source)))
+        slide_size = presentation.find(f'{{{P_NS}}}sldSz')
+        size = (
+            int(slide_size.get('cx')) if slide_size is not None else None,
+            int(slide_size.get('cy')) if slide_size is not None else None
+        )
+
+        keys = []
+        for part_name in sorted(order, key=order.get):
+            digest = hashlib.sha256(ANALYZER_VERSION.encode('utf-8'))
+            digest.update(canonical_xml(source.read(part_name)))
+            layout = related_part(part_name, SLIDE_LAYOUT_REL)
+            if part_rels[part_name]:
+                # Relationship order is not significant and differs between writers
+                digest.update(json.dumps(sorted(part_rels[part_name].items())).encode('utf-8'))
+            master = related_part(layout, SLIDE_MASTER_REL) if layout else None
+            theme = related_part(master, THEME_REL) if master else None
+            for inherited in (layout, master, theme):
+                # Placeholder bytes keep a missing part from shifting the next one's position
+                digest.update(part_hash(inherited) if inherited else b'\0' * 32)
+            keys.append(digest.hexdigest())
+
+    return size, keys
+
+
+def to_json_value(value):
+    """Round-trip through JSON so enums/lengths are stored exactly as clients receive them"""
+    return json.loads(json.dumps(value, default=str))
+
+
+class AnalysisCache:
+    def __init__(self, directory=DEFAULT_ANALYSIS_DIR):
+        """
+        Initialize the cache
+        Args:
+            directory: Where template and slide analysis records are stored
+        """
+        self.directory = os.path.abspath(directory)
+        self.slides_analyzed = 0
+        self.slides_reused = 0
+        self.lock = threading.Lock()
+
+    def record_path(self, kind, key):
+        return os.path.join(self.directory, kind, f'{key}.json')
+
+    def read(self, kind, key):
+        try:
+            with open(self.record_path(kind, key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, kind, key, record):
+        """Write a record atomically so concurrent readers never see a partial file"""
+        path = self.record_path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.analysis_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(record, f, separators=(',', ':'), default=str)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def analyze_slide(self, slide):
+        """Run every per-slide analysis once and keep the results without slide positions"""
+        from analyzeTemplate import analyze_slide
+        from pptxTemplateReplicator import describe_slide, find_slide_placeholders
+
+        analysis = analyze_slide(slide, 0)
+        analysis.pop('slide_number')
+        info = describe_slide(slide, 0)
+        info.pop('index')
+        placeholders = find_slide_placeholders(slide, 0)
+        for placeholder in placeholders:
+            placeholder.pop('slide')
+
+        return to_json_value({
+            'analysis': analysis,
+            'info': info,
+            'placeholders': placeholders
+        })
+
+    def template_record(self, template_path):
+        """Return the stored analysis for a template, analyzing only slides not seen before"""
+        digest = template_cache.content_hash(template_path)
+        record = self.read('templates', digest)
+        if record is not None and record.get('analyzer_version') == ANALYZER_VERSION:
+            return record
+
+        (slide_width, slide_height), keys = slide_keys(template_path)
+        slides = [self.read('slides', key) for key in keys]
+        missing = [idx for idx, slide in enumerate(slides) if slide is None]
+
+        if missing:
+            presentation = template_cache.load(template_path)
+            presentation_slides = presentation.slides
+            for idx in missing:
+                slides[idx] = self.analyze_slide(presentation_slides[idx])
+                self.write('slides', keys[idx], slides[idx])
+
+        with self.lock:
+            self.slides_analyzed += len(missing)
+            self.slides_reused += len(keys) - len(missing)
+
+        record = {
+            'template_hash': digest,
+            'analyzer_version': ANALYZER_VERSION,
+            'slide_width': slide_width,
+            'slide_height': slide_height,
+            'slide_keys': keys,
+            'slides': slides
+        }
+        self.write('templates', digest, record)
+        return record
+
+    def template_info(self, template_path):
+        """Same shape as TemplateReplicator.get_template_info"""
+        record = self.template_record(template_path)
+        placeholders = []
+        slides = []
+
+        for idx, slide in enumerate(record['slides']):
+            placeholders.extend(dict({'slide': idx}, **placeholder) for placeholder in slide['placeholders'])
+            slides.append(dict({'index': idx}, **slide['info']))
+
+        return {
+            'slide_count': len(record['slides']),
+            'slide_width': record['slide_width'],
+            'slide_height': record['slide_height'],
+            'placeholders': placeholders,
+            'slides': slides
+        }
+
+    def analysis(self, template_path):
+        """Same shape as the analysis dict built by analyzeTemplate.analyze_template"""
+        record = self.template_record(template_path)
+        return {
+            'template_file': str(template_path),
+            'slide_count': len(record['slides']),
+            'slide_width': record['slide_width'],
+            'slide_height': record['slide_height'],
+            'slides': [
+                dict({'slide_number': idx + 1}, **slide['analysis'])
+                for idx, slide in enumerate(record['slides'])
+            ]
+        }
+
+    def stats(self):
+        with self.lock:
+            return {
+                'directory': self.directory,
+                'analyzer_version': ANALYZER_VERSION,
+                'slides_analyzed': self.slides_analyzed,
+                'slides_reused': self.slides_reused
+            }
+
+
+# Shared process-wide cache used by analyzeTemplate, the replicator and the render worker
+analysis_cache = AnalysisCache()
@@ -5,10 +5,19 @@ Analyze PowerPoint template to identify all elements, formatting, and structure
 
 import os
 import sys
+import zipfile
 from pathlib import Path
+from lxml import etree
 from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.enum.shapes import MSO_SHAPE_TYPE, PP_PLACEHOLDER
 import json
+from jobIO import pop_option
+
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+NSMAP = {'p': P_NS, 'a': A_NS}
+TABLE_URI = 'http://schemas.openxmlformats.org/drawingml/2006/table'
+CHART_URI = 'http://schemas.openxmlformats.org/drawingml/2006/chart'
 
 def analyze_font(font):
     """Extract font properties"""
@@ -192,32 +201,21 @@ def analyze_template(template_path):
     print(f"Template: {template_path}")
     print(f"{'='*60}\n")
 
-    # Load presentation
-    prs = Presentation(template_path)
+    # Analysis is cached per template hash; only new or edited slides are walked
+    from analysisCache import analysis_cache
+    analysis = analysis_cache.analysis(template_path)
 
     # Basic presentation info
     print(f"PRESENTATION INFO:")
-    print(f"  - Total slides: {len(prs.slides)}")
-    print(f"  - Slide width: {prs.slide_width} EMUs ({prs.slide_width/914400:.2f} inches)")
-    print(f"  - Slide height: {prs.slide_height} EMUs ({prs.slide_height/914400:.2f} inches)")
-
-    # Analyze each slide
-    analysis = {
-        'template_file': str(template_path),
-        'slide_count': len(prs.slides),
-        'slide_width': prs.slide_width,
-        'slide_height': prs.slide_height,
-        'slides': []
-    }
+    print(f"  - Total slides: {analysis['slide_count']}")
+    print(f"  - Slide width: {analysis['slide_width']} EMUs ({analysis['slide_width']/914400:.2f} inches)")
+    print(f"  - Slide height: {analysis['slide_height']} EMUs ({analysis['slide_height']/914400:.2f} inches)")
 
-    for slide_idx, slide in enumerate(prs.slides):
+    for slide_idx, slide_analysis in enumerate(analysis['slides']):
         print(f"\n{'-'*40}")
         print(f"SLIDE {slide_idx + 1}:")
         print(f"{'-'*40}")
 
-        slide_analysis = analyze_slide(slide, slide_idx)
-        analysis['slides'].append(slide_analysis)
-
         # Print summary
         print(f"  Layout: {slide_analysis['layout_name']}")
         print(f"  Total shapes: {len(slide_analysis['shapes'])}")
@@ -245,10 +243,11 @@ def analyze_template(template_path):
             for tbl in tables:
                 print(f"    [{tbl['index']}] {tbl['name']} - {tbl['table']['rows']}x{tbl['table']['columns']}")
 
-    # Save detailed analysis to JSON
+    # Save detailed analysis to JSON, leaving the file alone if nothing changed
     output_path = Path(template_path).parent / 'template_analysis.json'
-    with open(output_path, 'w') as f:
-        json.dump(analysis, f, indent=2, default=str)
+    content = json.dumps(analysis, indent=2, default=str)
+    if not output_path.exists() or output_path.read_text() != content:
+        output_path.write_text(content)
 
     print(f"\n{'='*60}")
     print(f"ANALYSIS COMPLETE")
@@ -257,13 +256,256 @@ def analyze_template(template_path):
 
     return analysis
 
+def write_record(out, record):
+    """Write one compact NDJSON record"""
+    out.write(json.dumps(record, separators=(',', ':'), default=str))
+    out.write('\n')
+
+def xml_text_frame_text(tx_body):
+    """Text of an <a:txBody>/<p:txBody>, with the same separators python-pptx uses"""
+    paragraphs = []
+    for paragraph in tx_body.iterfind('a:p', NSMAP):
+        parts = []
+        for child in paragraph:
+            tag = etree.QName(child).localname
+            if tag in ('r', 'fld'):
+                parts.append(child.findtext('a:t', '', NSMAP))
+            elif tag == 'br':
+                parts.append('\v')
+        paragraphs.append(''.join(parts))
+    return '\n'.join(paragraphs)
+
+def xml_shape_type(element):
+    """python-pptx style shape type for a slide shape element"""
+    tag = etree.QName(element).localname
+    if element.find('.//p:nvPr/p:ph', NSMAP) is not None and tag in ('sp', 'pic', 'graphicFrame'):
+        return MSO_SHAPE_TYPE.PLACEHOLDER
+    if tag == 'sp':
+        if element.find('p:nvSpPr/p:cNvSpPr', NSMAP) is not None and \
+                element.find('p:nvSpPr/p:cNvSpPr', NSMAP).get('txBox') == '1':
+            return MSO_SHAPE_TYPE.TEXT_BOX
+        if element.find('p:spPr/a:custGeom', NSMAP) is not None:
+            return MSO_SHAPE_TYPE.FREEFORM
+        return MSO_SHAPE_TYPE.AUTO_SHAPE
+    if tag == 'graphicFrame':
+        uri = element.find('a:graphic/a:graphicData', NSMAP)
+        uri = uri.get('uri') if uri is not None else None
+        if uri == TABLE_URI:
+            return MSO_SHAPE_TYPE.TABLE
+        if uri == CHART_URI:
+            return MSO_SHAPE_TYPE.CHART
+        return None
+    return {
+        'pic': MSO_SHAPE_TYPE.PICTURE,
+        'grpSp': MSO_SHAPE_TYPE.GROUP,
+        'cxnSp': MSO_SHAPE_TYPE.LINE
+    }.get(tag)
+
+def summarize_xml_shape(element, index):
+    """Geometry, text and placeholder info for one shape element (no fonts, fills or lines)"""
+    c_nv_pr = element.find('./*/p:cNvPr', NSMAP)
+    xfrm = element.find('./*/a:xfrm', NSMAP)
+    if xfrm is None:
+        xfrm = element.find('p:xfrm', NSMAP)
+
+    offset = xfrm.find('a:off', NSMAP) if xfrm is not None else None
+    extent = xfrm.find('a:ext', NSMAP) if xfrm is not None else None
+
+    shape_info = {
+        'index': index,
+        'name': c_nv_pr.get('name') if c_nv_pr is not None else None,
+        'shape_type': str(xml_shape_type(element)),
+        'left': int(offset.get('x')) if offset is not None else None,
+        'top': int(offset.get('y')) if offset is not None else None,
+        'width': int(extent.get('cx')) if extent is not None else None,
+        'height': int(extent.get('cy')) if extent is not None else None
+    }
+
+    tx_body = element.find('p:txBody', NSMAP)
+    if tx_body is not None:
+        shape_info['text'] = xml_text_frame_text(tx_body)
+
+    placeholder = element.find('./*/p:nvPr/p:ph', NSMAP)
+    if placeholder is not None:
+        shape_info['placeholder'] = {
+            'idx': int(placeholder.get('idx', 0)),
+            'type': str(PP_PLACEHOLDER.from_xml(placeholder.get('type', 'obj')))
+        }
+
+    table = element.find('a:graphic/a:graphicData/a:tbl', NSMAP)
+    if table is not None:
+        rows = table.findall('a:tr', NSMAP)
+        shape_info['is_table'] = True
+        shape_info['table'] = {
+            'rows': len(rows),
+            'columns': len(table.findall('a:tblGrid/a:gridCol', NSMAP)),
+            'cells': [
+                {'row': row_idx, 'col': col_idx, 'text': xml_text_frame_text(cell.find('a:txBody', NSMAP))}
+                for row_idx, row in enumerate(rows)
+                for col_idx, cell in enumerate(row.findall('a:tc', NSMAP))
+                if cell.find('a:txBody', NSMAP) is not None
+            ]
+        }
+
+    if etree.QName(element).localname == 'grpSp':
+        shape_info['is_group'] = True
+        shape_info['shapes'] = [
+            summarize_xml_shape(child, idx) for idx, child in enumerate(iter_xml_shapes(element))
+        ]
+
+    return shape_info
+
+def iter_xml_shapes(container):
+    """Shape elements of a <p:spTree> or <p:grpSp>, in z-order"""
+    for child in container:
+        if etree.QName(child).localname in ('sp', 'pic', 'graphicFrame', 'grpSp', 'cxnSp', 'contentPart'):
+            yield child
+
+def stream_summary(template_path, out):
+    """
+    Summary-level NDJSON straight from the package, one slide part at a time
+    Never builds the python-pptx object model, so memory stays flat however
+    many slides the deck has.
+    """
+    from pptxStreamFill import presentation_part_name, slide_order
+
+    slides = 0
+    shapes = 0
+    with zipfile.ZipFile(template_path) as source:
+        order = slide_order(source)
+        presentation = etree.fromstring(source.read(presentation_part_name(source)))
+        slide_size = presentation.find('p:sldSz', NSMAP)
+        write_record(out, {
+            'type': 'presentation',
+            'level': 'summary',
+            'template_file': str(template_path),
+            'slide_count': len(order),
+            'slide_width': int(slide_size.get('cx')) if slide_size is not None else None,
+            'slide_height': int(slide_size.get('cy')) if slide_size is not None else None
+        })
+
+        for part_name in sorted(order, key=order.get):
+            slide_number = order[part_name] + 1
+            root = etree.fromstring(source.read(part_name))
+            tree = root.find('p:cSld/p:spTree', NSMAP)
+            elements = list(iter_xml_shapes(tree)) if tree is not None else []
+
+            placeholders = []
+            for idx, element in enumerate(elements):
+                shape_info = summarize_xml_shape(element, idx)
+                if 'placeholder' in shape_info:
+                    placeholders.append(dict(shape_info['placeholder'], name=shape_info['name'],
+                                             text=shape_info.get('text')))
+                write_record(out, dict({'type': 'shape', 'slide_number': slide_number}, **shape_info))
+
+            write_record(out, {
+                'type': 'slide',
+                'slide_number': slide_number,
+                'shape_count': len(elements),
+                'placeholders': placeholders
+            })
+            slides += 1
+            shapes += len(elements)
+            # Drop this slide's tree before parsing the next one
+            del root, tree, elements
+
+    write_record(out, {'type': 'end', 'slides': slides, 'shapes': shapes})
+
+def stream_full(template_path, out):
+    """
+    Full-level NDJSON (per-run fonts, fills, lines), written slide by slide as analyzed
+    Records are written as each slide is analyzed, but resolving fonts, fills and
+    lines needs the python-pptx object model, which parses the whole package up
+    front: memory grows with the deck. Use the summary level (stream_summary) when
+    memory must stay flat regardless of deck size.
+    """
+    prs = Presentation(template_path)
+    write_record(out, {
+        'type': 'presentation',
+        'level': 'full',
+        'template_file': str(template_path),
+        'slide_count': len(prs.slides),
+        'slide_width': prs.slide_width,
+        'slide_height': prs.slide_height
+    })
+
+    slides = 0
+    shapes = 0
+    for slide_idx, slide in enumerate(prs.slides):
+        shape_count = 0
+        for idx, shape in enumerate(slide.shapes):
+            try:
+                shape_info = analyze_shape(shape, idx)
+            except Exception as e:
+                shape_info = {'index': idx, 'name': getattr(shape, 'name', 'Unknown'), 'error': str(e)}
+            write_record(out, dict({'type': 'shape', 'slide_number': slide_idx + 1}, **shape_info))
+            shape_count += 1
+
+        write_record(out, {
+            'type': 'slide',
+            'slide_number': slide_idx + 1,
+            'layout_name': slide.slide_layout.name if slide.slide_layout else None,
+            'shape_count': shape_count,
+            'placeholders': [
+                {
+                    'idx': shape.placeholder_format.idx,
+                    'type': str(shape.placeholder_format.type) if shape.placeholder_format.type else None,
+                    'name': shape.name,
+                    'text': shape.text if shape.has_text_frame else None
+                } for shape in slide.placeholders
+            ]
+        })
+        slides += 1
+        shapes += shape_count
+
+    write_record(out, {'type': 'end', 'slides': slides, 'shapes': shapes})
+
+def stream_analysis(template_path, out, level='full'):
+    """
+    Write the template analysis as NDJSON: a presentation record, then for each
+    slide its shape records followed by a slide record, then an end record
+    Args:
+        template_path: Template to analyze
+        out: Writable text stream
+        level: 'full' (fonts, fills, lines) or 'summary' (geometry, text, placeholders)
+    """
+    if level == 'summary':
+        stream_summary(template_path, out)
+    elif level == 'full':
+        stream_full(template_path, out)
+    else:
+        raise ValueError(f"Unknown analysis level: {level}")
+
 if __name__ == "__main__":
-    # Get template path
-    template_path = Path(__file__).parent.parent.parent / "templates" / "powerpoint" / "space-bd-quad-charts.pptx"
+    # Usage: python analyzeTemplate.py [template_path] [--ndjson | --ndjson=<output_path|->] [--summary]
+    #   --ndjson          write NDJSON next to the template (template_analysis.ndjson)
+    #   --ndjson=PATH     write NDJSON to PATH, or to stdout for '-'
+    #   --summary         summary level (bounded memory); the default full level loads the whole deck
+    args = sys.argv[1:]
+    level = 'summary' if '--summary' in args else 'full'
+    args = [arg for arg in args if arg != '--summary']
+
+    ndjson_output = pop_option(args, 'ndjson')
+    if '--ndjson' in args:
+        args.remove('--ndjson')
+        ndjson_output = ''
+
+    # Get template path (defaults to the standard quad chart template)
+    if args:
+        template_path = Path(args[0])
+    else:
+        template_path = Path(__file__).parent.parent.parent / "templates" / "powerpoint" / "space-bd-quad-charts.pptx"
 
     if not template_path.exists():
         print(f"Error: Template not found at {template_path}")
         sys.exit(1)
 
-    # Run analysis
-    analyze_template(template_path)
\ No newline at end of file
+    if ndjson_output is None:
+        # Run analysis
+        analyze_template(template_path)
+    elif ndjson_output == '-':
+        stream_analysis(template_path, sys.stdout, level)
+    else:
+        output_path = Path(ndjson_output or template_path.parent / 'template_analysis.ndjson')
+        with open(output_path, 'w') as f:
+            stream_analysis(template_path, f, level)
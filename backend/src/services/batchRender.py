@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Parallel batch renderer
+Spreads fill/replicate jobs over a pool of worker processes for bulk
+regeneration (e.g. re-rendering every approved chart after a template fix).
+
+Jobs use the render worker request format, one per JSON array element or JSONL line:
+    {"id": "...", "type": "fill", "params": {"template_path": ..., "data": {...}, "output_path": ...}}
+
+Progress is written to stdout as JSON lines:
+    {"event": "start", "total": 120, "workers": 8, "max_jobs_per_worker": 50}
+    {"event": "job", "id": "...", "success": true, "result": {...}, "done": 1, "total": 120, "elapsed": 0.41}
+    {"event": "done", "total": 120, "succeeded": 119, "failed": 1, "elapsed": 14.2}
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import multiprocessing
+
+# Allow importing sibling service scripts regardless of the working directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pptxGenerator import read_records
+from renderWorker import run_job
+
+DEFAULT_WORKERS = int(os.environ.get('BATCH_RENDER_WORKERS', 0)) or os.cpu_count() or 1
+DEFAULT_MAX_JOBS_PER_WORKER = int(os.environ.get('BATCH_RENDER_MAX_JOBS_PER_WORKER', 50))
+
+
+def init_worker():
+    """Pool initializer: leave Ctrl+C handling to the parent process"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Render code may print; keep the worker's stdout off the progress stream
+    sys.stdout = sys.stderr
+
+
+def render_one(request):
+    """Run one job in a pool process; failures come back as results, never exceptions"""
+    started = time.time()
+    if not isinstance(request, dict):
+        response = {'id': None, 'success': False, 'error': 'Job must be a JSON object'}
+    else:
+        response = run_job(request)
+        # Tracebacks stay in the worker log; progress lines carry the message only
+        traceback_text = response.pop('traceback', None)
+        if traceback_text:
+            print(traceback_text, file=sys.stderr)
+    response['elapsed'] = round(time.time() - started, 3)
+    return response
+
+
+def render_batch(jobs, workers=DEFAULT_WORKERS, max_jobs_per_worker=DEFAULT_MAX_JOBS_PER_WORKER,
+                 progress=None):
+    """
+    Render jobs in parallel worker processes
+    Args:
+        jobs: List of render worker requests ({id, type, params})
+        workers: Number of worker processes
+        max_jobs_per_worker: Jobs a worker process handles before it is replaced (bounds memory)
+        progress: Optional callable receiving each progress event dict
+    Returns:
+        Summary dict with per-job results in completion order
+    """
+    jobs = list(jobs)
+    workers = max(1, min(workers, len(jobs) or 1))
+    started = time.time()
+
+    def emit(event):
+        if progress:
+            progress(event)
+
+    emit({
+        'event': 'start',
+        'total': len(jobs),
+        'workers': workers,
+        'max_jobs_per_worker': max_jobs_per_worker
+    })
+
+    results = []
+    pool = multiprocessing.Pool(
+        processes=workers,
+        initializer=init_worker,
+        maxtasksperchild=max_jobs_per_worker or None
+    )
+    try:
+        for response in pool.imap_unordered(render_one, jobs):
+            results.append(response)
+            emit(dict(response, event='job', done=len(results), total=len(jobs)))
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    succeeded = sum(1 for r in results if r['success'])
+    summary = {
+        'event': 'done',
+        'total': len(jobs),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'elapsed': round(time.time() - started, 3)
+    }
+    emit(summary)
+    return dict(summary, results=results)
+
+
+def main():
+    """Main function for command-line execution"""
+    parser = argparse.ArgumentParser(description='Render PowerPoint jobs in parallel worker processes')
+    parser.add_argument('jobs', nargs='?', default='-',
+                        help='JSON array or JSONL file of render jobs ("-" for stdin)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help='Number of worker processes')
+    parser.add_argument('--max-jobs-per-worker', type=int, default=DEFAULT_MAX_JOBS_PER_WORKER,
+                        help='Replace a worker process after this many jobs (0 = never)')
+    args = parser.parse_args()
+
+    def print_event(event):
+        print(json.dumps(event, default=str), flush=True)
+
+    try:
+        stream = sys.stdin if args.jobs == '-' else open(args.jobs, encoding='utf-8')
+        try:
+            jobs = list(read_records(stream))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        # Per-job failures are reported in the progress stream, not the exit code
+        render_batch(jobs, args.workers, args.max_jobs_per_worker, print_event)
+
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    except Exception as e:
+        print(json.dumps({'event': 'error', 'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
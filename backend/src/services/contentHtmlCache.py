@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered HTML for the markdown content documents
+Every markdown file under data/documents and data/content is rendered once
+to a sanitized HTML fragment (markdownRenderer) and stored with a metadata
+record: a strong ETag (hash of the HTML), the source's size/mtime/hash, and
+the byte range and ETag of each top-level section. The server answers
+conditional requests from the ETag alone and streams unchanged HTML straight
+from disk.
+
+Re-rendering is incremental: a source is re-hashed only when its size or
+mtime changed, and re-rendered only when its hash (or the renderer) changed.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+
+from contentSections import DEFAULT_CONTENT_ROOT, content_files, file_hash, resolve_document
+from markdownRenderer import render_markdown
+from jobTiming import JobTimer
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HTML_DIR = os.environ.get(
+    'RENDERED_HTML_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'rendered_html')
+)
+
+# Renderer code; editing any of these re-renders every document
+RENDERER_SOURCES = ['contentSections.py', 'markdownRenderer.py', 'contentHtmlCache.py']
+
+
+def renderer_version():
+    """Hash of the renderer source files"""
+    digest = hashlib.sha256()
+    for name in RENDERER_SOURCES:
+        path = os.path.join(SERVICES_DIR, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:16]
+
+
+RENDERER_VERSION = renderer_version()
+
+
+def etag(data):
+    """Strong ETag value (without quotes) for some bytes"""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+class ContentHtmlCache:
+    def __init__(self, root=DEFAULT_CONTENT_ROOT, directory=DEFAULT_HTML_DIR):
+        """
+        Initialize the cache
+        Args:
+            root: Content root the document paths are relative to
+            directory: Where rendered HTML and metadata are stored
+        """
+        self.root = os.path.abspath(root)
+        self.directory = os.path.abspath(directory)
+        self.lock = threading.Lock()
+        self.records = {}
+        self.renders = 0
+
+    def output_path(self, relative, extension):
+        return os.path.join(self.directory, relative.replace('/', '__') + extension)
+
+    def write_file(self, path, data):
+        """Write a file atomically so concurrent readers never see a partial file"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.html_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def read_record(self, relative):
+        try:
+            with open(self.output_path(relative, '.json'), encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get('renderer') != RENDERER_VERSION or not os.path.exists(record['html_path']):
+            return None
+        return record
+
+    def render(self, relative, stat, digest):
+        """Render one document and store its HTML and metadata"""
+        with open(os.path.join(self.root, relative), encoding='utf-8', errors='replace') as f:
+            html_text, sections = render_markdown(f.read())
+        data = html_text.encode('utf-8')
+
+        # Character ranges of the sections -> byte ranges of the stored file
+        ranges = []
+        byte_position = char_position = 0
+        for section in sections:
+            byte_position += len(html_text[char_position:section['start']].encode('utf-8'))
+            chunk = html_text[section['start']:section['end']].encode('utf-8')
+            ranges.append({
+                'id': section['id'],
+                'title': section['title'],
+                'level': section['level'],
+                'offset': byte_position,
+                'length': len(chunk),
+                'etag': etag(chunk)
+            })
+            byte_position += len(chunk)
+            char_position = section['end']
+
+        html_path = self.output_path(relative, '.html')
+        self.write_file(html_path, data)
+        self.renders += 1
+        return {
+            'renderer': RENDERER_VERSION,
+            'file': relative,
+            'source_path': os.path.join(self.root, relative),
+            'html_path': html_path,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': digest,
+            'etag': etag(data),
+            'length': len(data),
+            'sections': ranges
+        }
+
+    def refresh(self, relative):
+        """
+        Current record of one document, re-rendering it if the source changed
+        Returns:
+            (record, rendered)
+        """
+        path = os.path.join(self.root, relative)
+        stat = os.stat(path)
+        record = self.records.get(relative) or self.read_record(relative)
+        if record and record['size'] == stat.st_size and record['mtime'] == stat.st_mtime_ns:
+            self.records[relative] = record
+            return record, False
+
+        digest = file_hash(path)
+        rendered = not (record and record['hash'] == digest)
+        if rendered:
+            record = self.render(relative, stat, digest)
+        record['size'], record['mtime'] = stat.st_size, stat.st_mtime_ns
+        self.write_file(self.output_path(relative, '.json'), json.dumps(record, indent=2).encode('utf-8'))
+        self.records[relative] = record
+        return record, rendered
+
+    def get(self, document):
+        """
+        Rendered HTML record of a document
+        Args:
+            document: Corpus path, absolute path or file name of a markdown document
+        Returns:
+            Record with 'html_path', 'etag' and per-section byte ranges and ETags
+        """
+        relative = resolve_document(document, self.root)
+        if relative is None or not relative.endswith('.md'):
+            raise FileNotFoundError(f'Document not found: {document}')
+        with self.lock:
+            record, _ = self.refresh(relative)
+        return dict(record, success=True)
+
+    def build_all(self):
+        """Render every changed markdown document and drop output for removed ones"""
+        timer = JobTimer('render_content_html')
+        with self.lock:
+            files = [relative for relative in content_files(self.root) if relative.endswith('.md')]
+            rendered = [relative for relative in files if self.refresh(relative)[1]]
+
+            current = {relative.replace('/', '__') for relative in files}
+            removed = []
+            if os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    stem, extension = os.path.splitext(name)
+                    if extension in ('.html', '.json') and stem not in current:
+                        os.remove(os.path.join(self.directory, name))
+                        if extension == '.json':
+                            removed.append(stem.replace('__', '/'))
+            for relative in removed:
+                self.records.pop(relative, None)
+
+        result = {
+            'success': True,
+            'documents': len(files),
+            'rendered': rendered,
+            'unchanged': len(files) - len(rendered),
+            'removed': removed
+        }
+        result.update(timer.finish())
+        return result
+
+    def stats(self):
+        return {
+            'documents': len(self.records),
+            'renders': self.renders
+        }
+
+
+# Process-wide cache shared by the render worker's jobs
+content_html = ContentHtmlCache()
+
+
+def main():
+    """Main function for command-line execution"""
+    if len(sys.argv) < 2 or sys.argv[1] not in ('build', 'get') or (sys.argv[1] == 'get' and len(sys.argv) < 3):
+        print("Usage: python contentHtmlCache.py build")
+        print("       python contentHtmlCache.py get <document>")
+        sys.exit(1)
+
+    try:
+        result = content_html.build_all() if sys.argv[1] == 'build' else content_html.get(sys.argv[2])
+        print(json.dumps(result, indent=2))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
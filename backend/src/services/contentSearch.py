@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Persistent full-text search over the BD Bible content
+Documents are chunked into sections (see contentSections) and indexed into a
+positional inverted index that is stored on disk and kept per file: a refresh
+only re-indexes files whose content hash changed, and drops files that are
+gone. Sections are ranked with BM25.
+
+Query syntax:
+    gate review        either word, ranked by BM25
+    "pursue decision"  exact phrase (required)
+    capt*              any word starting with "capt"
+"""
+
+import os
+import re
+import sys
+import json
+import html
+import math
+import bisect
+import hashlib
+import tempfile
+import threading
+from collections import Counter
+
+from contentSections import DEFAULT_CONTENT_ROOT, content_files, file_hash, read_sections
+from jobTiming import JobTimer
+from jobIO import pop_option
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_DIR = os.environ.get(
+    'SEARCH_INDEX_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'search_index')
+)
+INDEX_FILE = 'content_index.json'
+
+# Indexing code; editing any of these rebuilds the index from scratch
+INDEX_SOURCES = ['contentSections.py', 'contentSearch.py']
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+DEFAULT_LIMIT = 10
+MIN_PREFIX_LENGTH = 2
+# A prefix expands to at most this many indexed words (the most common ones)
+MAX_PREFIX_TERMS = 50
+SNIPPET_TOKENS = 30
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+QUERY_PATTERN = re.compile(r'"([^"]*)"?|(\S+)')
+# Markdown syntax left out of snippets
+SNIPPET_MARKUP = re.compile(r'[#*_`|>{}\[\]]+|\s+')
+
+
+def index_version():
+    """Hash of the indexing source files"""
+    digest = hashlib.sha256()
+    for name in INDEX_SOURCES:
+        path = os.path.join(SERVICES_DIR, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:16]
+
+
+INDEX_VERSION = index_version()
+
+
+def tokenize(text):
+    """Lowercased words of a text"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def parse_query(query):
+    """
+    Split a query into clauses
+    Returns:
+        List of ('term', word), ('prefix', stem) and ('phrase', [words]) tuples
+    """
+    clauses = []
+    for match in QUERY_PATTERN.finditer(query):
+        phrase, word = match.groups()
+        if phrase is not None:
+            words = tokenize(phrase)
+            if len(words) > 1:
+                clauses.append(('phrase', words))
+            elif words:
+                clauses.append(('term', words[0]))
+            continue
+
+        words = tokenize(word)
+        if not words:
+            continue
+        if word.endswith('*') and len(words) == 1 and len(words[0]) >= MIN_PREFIX_LENGTH:
+            clauses.append(('prefix', words[0]))
+        elif len(words) > 1:
+            # Hyphenated or dotted words ("go/no-go", "1.3") are matched as phrases
+            clauses.append(('phrase', words))
+        else:
+            clauses.append(('term', words[0]))
+    return clauses
+
+
+def phrase_positions(postings, words):
+    """
+    Start positions of a phrase per section
+    Returns:
+        {section key: [start positions]}
+    """
+    lists = [postings.get(word) for word in words]
+    if any(entries is None for entries in lists):
+        return {}
+    # Intersect on the rarest word first
+    keys = set(min(lists, key=len))
+    for entries in lists:
+        keys &= entries.keys()
+
+    matches = {}
+    for key in keys:
+        starts = set(lists[0][key])
+        for offset, entries in enumerate(lists[1:], 1):
+            starts &= {position - offset for position in entries[key]}
+            if not starts:
+                break
+        if starts:
+            matches[key] = sorted(starts)
+    return matches
+
+
+def build_snippet(text, positions, length=SNIPPET_TOKENS):
+    """
+    HTML snippet of a section around its best cluster of matched words
+    Args:
+        text: Section text
+        positions: Token positions to highlight
+        length: Snippet length in words
+    Returns:
+        HTML-escaped text with matches wrapped in <mark>
+    """
+    spans = [match.span() for match in TOKEN_PATTERN.finditer(text)]
+    if not spans:
+        return ''
+    marked = sorted(position for position in positions if position < len(spans))
+
+    # Window of `length` tokens covering the most matches
+    first = 0
+    if marked:
+        best = 0
+        for idx, start in enumerate(marked):
+            covered = bisect.bisect_left(marked, start + length, idx) - idx
+            if covered > best:
+                best, first = covered, start
+        # Lead in with a little context before the first match
+        first = max(0, min(first - length // 5, len(spans) - length))
+    last = min(len(spans), first + length)
+
+    def plain(segment):
+        return html.escape(SNIPPET_MARKUP.sub(' ', segment))
+
+    marked = set(marked)
+    parts = ['… ' if first > 0 else '']
+    cursor = spans[first][0]
+    for position in range(first, last):
+        start, end = spans[position]
+        parts.append(plain(text[cursor:start]))
+        word = html.escape(text[start:end])
+        parts.append(f'<mark>{word}</mark>' if position in marked else word)
+        cursor = end
+    parts.append(' …' if last < len(spans) else '')
+    return re.sub(r'\s+', ' ', ''.join(parts)).strip()
+
+
+class ContentIndex:
+    def __init__(self, root=DEFAULT_CONTENT_ROOT, directory=DEFAULT_INDEX_DIR):
+        """
+        Initialize the index
+        Args:
+            root: Content root the corpus paths are relative to
+            directory: Where the index is stored
+        """
+        self.root = os.path.abspath(root)
+        self.path = os.path.join(os.path.abspath(directory), INDEX_FILE)
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.files = {}
+        self.sections = {}
+        self.postings = {}
+        self.total_length = 0
+        self.vocabulary = None
+        self.files_indexed = 0
+        self.searches = 0
+
+    def load(self):
+        """Load the stored index if it was built by this version of the indexer"""
+        self.loaded = True
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if stored.get('version') != INDEX_VERSION:
+            return
+        self.files = stored['files']
+        self.sections = stored['sections']
+        self.postings = stored['postings']
+        self.total_length = sum(section['length'] for section in self.sections.values())
+
+    def save(self):
+        """Write the index atomically so concurrent readers never see a partial file"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix='.index_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': INDEX_VERSION,
+                    'files': self.files,
+                    'sections': self.sections,
+                    'postings': self.postings
+                }, f, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def remove_file(self, relative):
+        """Drop a file's sections from the postings"""
+        for key in self.files.pop(relative, {}).get('sections', []):
+            section = self.sections.pop(key)
+            self.total_length -= section['length']
+            for word in set(tokenize(section['text'])):
+                entries = self.postings.get(word)
+                if entries is not None:
+                    entries.pop(key, None)
+                    if not entries:
+                        del self.postings[word]
+
+    def add_file(self, relative, record):
+        """Index a file's sections"""
+        keys = []
+        for section in read_sections(os.path.join(self.root, relative), relative):
+            key = f"{relative}#{section['id']}"
+            words = tokenize(section['text'])
+            self.sections[key] = {
+                'file': relative,
+                'id': section['id'],
+                'title': section['title'],
+                'line': section['line'],
+                'length': len(words),
+                'text': section['text']
+            }
+            self.total_length += len(words)
+            positions = {}
+            for position, word in enumerate(words):
+                positions.setdefault(word, []).append(position)
+            for word, word_positions in positions.items():
+                self.postings.setdefault(word, {})[key] = word_positions
+            keys.append(key)
+        record['sections'] = keys
+        self.files[relative] = record
+
+    def refresh(self, rebuild=False):
+        """
+        Bring the index up to date with the content files
+        Files are re-hashed only when their size or mtime changed, and re-indexed
+        only when their hash changed.
+        Returns:
+            {'indexed': [files], 'removed': [files]}
+        """
+        with self.lock:
+            if not self.loaded:
+                self.load()
+            if rebuild:
+                self.files, self.sections, self.postings, self.total_length = {}, {}, {}, 0
+
+            indexed = []
+            current = content_files(self.root)
+            for relative in current:
+                path = os.path.join(self.root, relative)
+                stat = os.stat(path)
+                record = self.files.get(relative)
+                if record and record['size'] == stat.st_size and record['mtime'] == stat.st_mtime_ns:
+                    continue
+                digest = file_hash(path)
+                if record and record['hash'] == digest:
+                    record['size'], record['mtime'] = stat.st_size, stat.st_mtime_ns
+                    continue
+                self.remove_file(relative)
+                self.add_file(relative, {'hash': digest, 'size': stat.st_size, 'mtime': stat.st_mtime_ns})
+                indexed.append(relative)
+
+            removed = sorted(set(self.files) - set(current))
+            for relative in removed:
+                self.remove_file(relative)
+
+            if indexed or removed or not os.path.exists(self.path):
+                self.vocabulary = None
+                self.files_indexed += len(indexed)
+                self.save()
+            return {'indexed': indexed, 'removed': removed}
+
+    def expand_prefix(self, stem):
+        """Indexed words starting with stem, most common first"""
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self.vocabulary, stem)
+        end = bisect.bisect_left(self.vocabulary, stem + '\uffff', start)
+        words = self.vocabulary[start:end]
+        words.sort(key=lambda word: len(self.postings[word]), reverse=True)
+        return words[:MAX_PREFIX_TERMS]
+
+    def search(self, query, limit=DEFAULT_LIMIT, refresh=False):
+        """
+        Ranked sections matching a query
+        Args:
+            query: Words, "quoted phrases" and prefix* terms
+            limit: Maximum number of results
+            refresh: Re-index changed files first (the render worker refreshes on a
+                timer instead, so searches never wait on a corpus scan)
+        Returns:
+            Result dict with total matches and the top sections, each with an
+            HTML snippet (matches in <mark>)
+        """
+        timer = JobTimer('search')
+        if refresh or not self.loaded:
+            with timer.phase('refresh'):
+                self.refresh()
+
+        with self.lock:
+            with timer.phase('rank'):
+                scores, highlights = self.rank(parse_query(query))
+                ranked = sorted(scores, key=lambda key: (-scores[key], key))
+            with timer.phase('snippets'):
+                results = []
+                for key in ranked[:limit]:
+                    section = self.sections[key]
+                    results.append({
+                        'file': section['file'],
+                        'document': os.path.basename(section['file']),
+                        'section': section['id'],
+                        'title': section['title'],
+                        'line': section['line'],
+                        'score': round(scores[key], 4),
+                        'snippet': build_snippet(section['text'], highlights[key])
+                    })
+            self.searches += 1
+
+        result = {'success': True, 'query': query, 'total': len(ranked), 'results': results}
+        result.update(timer.finish())
+        return result
+
+    def rank(self, clauses):
+        """
+        BM25 scores of the sections matching the clauses
+        Words and prefixes are optional and add to the score; every phrase must
+        match, and is scored as one term with the summed IDF of its words.
+        Returns:
+            ({section key: score}, {section key: set of token positions to highlight})
+        """
+        count = len(self.sections)
+        if not count:
+            return {}, {}
+        average = self.total_length / count or 1.0
+
+        def idf(frequency):
+            return math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+
+        def bm25(weight, frequency, length):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average)
+            return weight * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        scores = Counter()
+        highlights = {}
+        required = None
+
+        for kind, value in clauses:
+            if kind == 'phrase':
+                matches = phrase_positions(self.postings, value)
+                weight = sum(idf(len(self.postings[word])) for word in value) if matches else 0
+                required = set(matches) if required is None else required & matches.keys()
+                for key, starts in matches.items():
+                    scores[key] += bm25(weight, len(starts), self.sections[key]['length'])
+                    marks = highlights.setdefault(key, set())
+                    for start in starts:
+                        marks.update(range(start, start + len(value)))
+                continue
+
+            words = self.expand_prefix(value) if kind == 'prefix' else [value]
+            for word in words:
+                entries = self.postings.get(word)
+                if not entries:
+                    continue
+                weight = idf(len(entries))
+                for key, positions in entries.items():
+                    scores[key] += bm25(weight, len(positions), self.sections[key]['length'])
+                    highlights.setdefault(key, set()).update(positions)
+
+        if required is not None:
+            scores = {key: score for key, score in scores.items() if key in required}
+        return dict(scores), highlights
+
+    def stats(self):
+        return {
+            'files': len(self.files),
+            'sections': len(self.sections),
+            'terms': len(self.postings),
+            'files_indexed': self.files_indexed,
+            'searches': self.searches
+        }
+
+
+# Process-wide index shared by the render worker's jobs
+content_index = ContentIndex()
+
+
+def main():
+    """Main function for command-line execution"""
+    args = sys.argv[1:]
+    limit = pop_option(args, 'limit')
+    rebuild = '--rebuild' in args
+    args = [arg for arg in args if arg != '--rebuild']
+
+    if not args and not rebuild:
+        print("Usage: python contentSearch.py <query> [--limit=N] [--rebuild]")
+        print("       python contentSearch.py --rebuild")
+        sys.exit(1)
+
+    try:
+        if args:
+            if rebuild:
+                content_index.refresh(rebuild=True)
+            result = content_index.search(' '.join(args), limit=int(limit) if limit else DEFAULT_LIMIT, refresh=True)
+        else:
+            result = {'success': True, **content_index.refresh(rebuild=True), **content_index.stats()}
+        print(json.dumps(result, indent=2))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
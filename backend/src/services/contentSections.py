@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Section-level chunking of the BD Bible content
+Markdown files are split at their headings (outside code fences) and the
+plain-text Bible export at its numbered outline lines ("1.3.2<TAB>Title").
+Every section gets an ID that is stable across edits elsewhere in the file:
+the slug of its heading, suffixed -2, -3, ... when a heading repeats.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONTENT_ROOT = os.environ.get(
+    'CONTENT_ROOT',
+    os.path.join(SERVICES_DIR, '..', '..', '..')
+)
+
+# Files and directories (relative to the content root) that make up the corpus
+CONTENT_SOURCES = [
+    'bible_complete_text.txt',
+    'data/documents',
+    'data/content',
+    'backend/data/content'
+]
+CONTENT_EXTENSIONS = ('.md', '.txt')
+
+MARKDOWN_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+HEADING_ANCHOR = re.compile(r'\s*\{#[^}]*\}\s*$')
+CODE_FENCE = re.compile(r'^\s*(```|~~~)')
+OUTLINE_HEADING = re.compile(r'^(\d+(?:\.\d+)*)\t+(\S.*?)\s*$')
+SLUG_STRIP = re.compile(r'[^\w\s-]')
+SLUG_SPACE = re.compile(r'[\s_-]+')
+
+
+def slugify(title):
+    """URL-safe slug of a heading, e.g. 'Gate 1: Pursue' -> 'gate-1-pursue'"""
+    slug = SLUG_SPACE.sub('-', SLUG_STRIP.sub('', title.lower())).strip('-')
+    return slug or 'section'
+
+
+def content_files(root=DEFAULT_CONTENT_ROOT, sources=None):
+    """
+    Content files under the root
+    Returns:
+        Sorted list of paths relative to the root, with forward slashes
+    """
+    root = os.path.abspath(root)
+    files = set()
+    for source in sources or CONTENT_SOURCES:
+        path = os.path.join(root, source)
+        if os.path.isfile(path):
+            files.add(source)
+        elif os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                for name in names:
+                    if name.endswith(CONTENT_EXTENSIONS):
+                        relative = os.path.relpath(os.path.join(directory, name), root)
+                        files.add(relative.replace(os.sep, '/'))
+    return sorted(files)
+
+
+def resolve_document(document, root=DEFAULT_CONTENT_ROOT):
+    """
+    Corpus-relative path of a document given by path (relative or absolute) or file name
+    File names are looked up across the corpus, preferring data/documents.
+    Returns:
+        Relative path, or None if it is not a content file
+    """
+    root = os.path.abspath(root)
+    path = os.path.abspath(os.path.join(root, document))
+    relative = os.path.relpath(path, root).replace(os.sep, '/')
+    in_corpus = any(relative == source or relative.startswith(source + '/') for source in CONTENT_SOURCES)
+    if in_corpus and os.path.isfile(path) and relative.endswith(CONTENT_EXTENSIONS):
+        return relative
+    matches = [name for name in content_files(root) if os.path.basename(name) == document]
+    matches.sort(key=lambda name: (not name.startswith('data/documents/'), name))
+    return matches[0] if matches else None
+
+
+def file_hash(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def heading_of(line, markdown):
+    """(level, title) if the line starts a section, else None"""
+    if markdown:
+        match = MARKDOWN_HEADING.match(line)
+        if match:
+            return len(match.group(1)), HEADING_ANCHOR.sub('', match.group(2))
+    else:
+        match = OUTLINE_HEADING.match(line)
+        if match:
+            return match.group(1).count('.') + 1, match.group(2)
+    return None
+
+
+def split_sections(text, markdown=True, default_title=''):
+    """
+    Split a document into heading-delimited sections
+    Args:
+        text: Document text
+        markdown: True for markdown headings, False for numbered outline lines
+        default_title: Title of any text before the first heading
+    Returns:
+        List of {'id', 'title', 'level', 'line', 'start', 'end', 'text'}; start/end are
+        character offsets of the section (heading line included) in text
+    """
+    sections = []
+    seen = {}
+    in_fence = False
+    current = None
+    offset = 0
+
+    def close(end):
+        if current is not None:
+            current['end'] = end
+            current['text'] = text[current['start']:end]
+            if current['level'] or current['text'].strip():
+                sections.append(current)
+
+    def open_section(title, level, line_number, start):
+        slug = slugify(title) if level else 'preamble'
+        seen[slug] = seen.get(slug, 0) + 1
+        if seen[slug] > 1:
+            slug = f'{slug}-{seen[slug]}'
+        return {'id': slug, 'title': title, 'level': level, 'line': line_number, 'start': start}
+
+    for line_number, line in enumerate(text.splitlines(keepends=True), 1):
+        if markdown and CODE_FENCE.match(line):
+            in_fence = not in_fence
+        heading = None if in_fence else heading_of(line.rstrip('\r\n'), markdown)
+        if heading is not None:
+            close(offset)
+            current = open_section(heading[1], heading[0], line_number, offset)
+        elif current is None:
+            current = open_section(default_title, 0, line_number, offset)
+        offset += len(line)
+    close(offset)
+    return sections
+
+
+def read_text(path):
+    """
+    Text of a content file whose character offsets map exactly onto its bytes
+    Line endings are kept as they are and each invalid UTF-8 byte decodes to one
+    lone surrogate, so text[:n].encode('utf-8', 'surrogateescape') is the file's
+    leading bytes.
+    """
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8', errors='surrogateescape')
+
+
+def clean_text(text):
+    """Text from read_text with invalid bytes shown as U+FFFD"""
+    return text.encode('utf-8', errors='surrogateescape').decode('utf-8', errors='replace')
+
+
+def read_sections(path, relative=None):
+    """Sections of a content file, chunked by its type; start/end index read_text(path)"""
+    text = read_text(path)
+    name = os.path.basename(relative or path)
+    title = os.path.splitext(name)[0].replace('_', ' ').replace('-', ' ')
+    sections = split_sections(text, markdown=not name.endswith('.txt'), default_title=title)
+    for section in sections:
+        section['title'] = clean_text(section['title'])
+        section['text'] = clean_text(section['text'])
+    return sections
+
+
+def main():
+    """Main function for command-line execution"""
+    if len(sys.argv) < 2:
+        print("Usage: python contentSections.py <file>")
+        sys.exit(1)
+
+    try:
+        sections = read_sections(sys.argv[1])
+        print(json.dumps([
+            {key: section[key] for key in ('id', 'title', 'level', 'line', 'start', 'end')}
+            for section in sections
+        ], indent=2))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,10 +9,13 @@ const ExcelJS = require('exceljs');
 const path = require('path');
 const fs = require('fs').promises;
 const schedule = require('node-schedule');
+const { spawn } = require('child_process');
+const renderWorker = require('./renderWorker');
 
 class DataAggregator {
     constructor() {
         this.reportsDir = path.join(__dirname, '../../../reports');
+        this.exportScript = path.join(__dirname, 'submissionExport.py');
         this.initializeScheduledJobs();
     }
 
@@ -43,8 +46,24 @@ class DataAggregator {
 
     /**
      * Get quad chart statistics
+     * Computed by the render worker from a columnar snapshot of the database
+     * (submissionStats.py) that only re-reads changed rows; falls back to
+     * querying through Sequelize if the worker is unavailable.
      */
     async getQuadChartStatistics(filters = {}) {
+        try {
+            const { timing, rows_read, ...stats } = await renderWorker.submit('statistics', { filters });
+            return stats;
+        } catch (error) {
+            console.error('Statistics engine error, querying the database instead:', error.message);
+            return this.queryQuadChartStatistics(filters);
+        }
+    }
+
+    /**
+     * Get quad chart statistics with one query per breakdown
+     */
+    async queryQuadChartStatistics(filters = {}) {
         try {
             const whereClause = this.buildWhereClause(filters);
 
@@ -114,6 +133,9 @@ class DataAggregator {
             // Contract value statistics
             const contractValueStats = await this.getContractValueStatistics(whereClause);
 
+            // History entries per action
+            const activity = await this.getHistoryActivity(whereClause);
+
             return {
                 overview: {
                     total: totalCharts,
@@ -125,7 +147,8 @@ class DataAggregator {
                 userActivity,
                 trends: submissionTrends,
                 approvalMetrics,
-                contractValueStats
+                contractValueStats,
+                activity
             };
         } catch (error) {
             console.error('Error getting statistics:', error);
@@ -133,6 +156,29 @@ class DataAggregator {
         }
     }
 
+    /**
+     * Get history entries per action for the submissions matching the filters
+     */
+    async getHistoryActivity(whereClause) {
+        const rows = await QuadChartHistory.findAll({
+            attributes: [
+                'action',
+                [fn('COUNT', col('QuadChartHistory.id')), 'count']
+            ],
+            include: [
+                {
+                    association: 'quadChart',
+                    attributes: [],
+                    where: whereClause
+                }
+            ],
+            group: ['action'],
+            raw: true
+        });
+
+        return Object.fromEntries(rows.map(row => [row.action, parseInt(row.count, 10)]));
+    }
+
     /**
      * Build where clause from filters
      */
@@ -564,71 +610,52 @@ class DataAggregator {
 
     /**
      * Export all submissions to Excel
+     * Rows are streamed from SQLite straight into the workbook by submissionExport.py
+     * (xlsxwriter in constant_memory mode), so neither the rows nor the workbook are
+     * held in the Node heap.
+     * @param {Object} filters - Same filters as buildWhereClause
+     * @param {Object} options - { columns: ['id', 'opportunityName', ...] } to choose and order
+     *                           columns (defaults to the standard export columns)
+     * @returns {Promise<string>} Path of the written .xlsx file
      */
-    async exportAllSubmissions(filters = {}) {
-        const whereClause = this.buildWhereClause(filters);
+    async exportAllSubmissions(filters = {}, options = {}) {
+        // Generate file
+        const timestamp = new Date().toISOString().split('T')[0];
+        const filename = `QuadChart_Export_${timestamp}.xlsx`;
+        const filepath = path.join(this.reportsDir, filename);
 
-        const submissions = await QuadChartSubmission.findAll({
-            where: whereClause,
-            include: [
-                {
-                    association: 'creator',
-                    attributes: ['name', 'email']
-                }
-            ],
-            order: [['createdAt', 'DESC']]
-        });
+        await fs.mkdir(this.reportsDir, { recursive: true });
 
-        const workbook = new ExcelJS.Workbook();
-        const sheet = workbook.addWorksheet('Quad Chart Submissions');
+        const args = [this.exportScript, '-', filepath];
+        if (options.columns && options.columns.length > 0) {
+            args.push(`--columns=${options.columns.join(',')}`);
+        }
 
-        // Define columns
-        sheet.columns = [
-            { header: 'ID', key: 'id', width: 10 },
-            { header: 'Opportunity Name', key: 'opportunityName', width: 30 },
-            { header: 'Company Name', key: 'companyName', width: 25 },
-            { header: 'Client Name', key: 'clientName', width: 25 },
-            { header: 'Contract Value', key: 'contractValue', width: 15 },
-            { header: 'Status', key: 'status', width: 12 },
-            { header: 'Version', key: 'versionNumber', width: 10 },
-            { header: 'Created By', key: 'createdBy', width: 20 },
-            { header: 'Created Date', key: 'createdAt', width: 15 },
-            { header: 'Submitted Date', key: 'submittedAt', width: 15 },
-            { header: 'Approved Date', key: 'approvedAt', width: 15 }
-        ];
+        await new Promise((resolve, reject) => {
+            const child = spawn(renderWorker.resolvePython(), args);
+            let errorOutput = '';
 
-        // Add data
-        submissions.forEach(submission => {
-            sheet.addRow({
-                id: submission.id,
-                opportunityName: submission.opportunityName,
-                companyName: submission.companyName,
-                clientName: submission.clientName,
-                contractValue: submission.contractValue,
-                status: submission.status,
-                versionNumber: submission.versionNumber,
-                createdBy: submission.creator?.name || '',
-                createdAt: submission.createdAt?.toISOString().split('T')[0],
-                submittedAt: submission.submittedAt?.toISOString().split('T')[0],
-                approvedAt: submission.approvedAt?.toISOString().split('T')[0]
+            child.stderr.on('data', (data) => {
+                errorOutput += data.toString();
             });
-        });
 
-        // Style header row
-        sheet.getRow(1).font = { bold: true };
-        sheet.getRow(1).fill = {
-            type: 'pattern',
-            pattern: 'solid',
-            fgColor: { argb: 'FFE0E0E0' }
-        };
+            child.on('error', (error) => {
+                reject(new Error(`Failed to start Python process: ${error.message}`));
+            });
 
-        // Generate file
-        const timestamp = new Date().toISOString().split('T')[0];
-        const filename = `QuadChart_Export_${timestamp}.xlsx`;
-        const filepath = path.join(this.reportsDir, filename);
+            child.on('close', (code) => {
+                if (code === 0) {
+                    resolve();
+                } else {
+                    console.error('Submission export error:', errorOutput);
+                    reject(new Error(`Submission export failed with exit code ${code}`));
+                }
+            });
 
-        await fs.mkdir(this.reportsDir, { recursive: true });
-        await workbook.xlsx.writeFile(filepath);
+            // Filters go over stdin (dates serialize as ISO strings)
+            child.stdin.on('error', () => {});
+            child.stdin.end(JSON.stringify(filters));
+        });
 
         return filepath;
     }
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Streaming ingestion of the team Bible DOCX into markdown sections
+word/document.xml is read with lxml iterparse: each top-level paragraph or
+table is converted to markdown and freed as soon as it ends, so memory stays
+flat however long the document is. The document is cut into one markdown
+file per heading at or above SPLIT_LEVEL (parts and appendices), named by a
+stable ID, the slug of its heading, so inserting a section does not rename
+the others. Files whose content hash is unchanged are not rewritten, which
+keeps their mtimes and lets the search index and related-section arrays
+refresh only what changed.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import tempfile
+import zipfile
+from lxml import etree
+
+from contentSections import slugify
+from jobTiming import JobTimer
+from jobIO import pop_option
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DOCX = os.environ.get(
+    'BIBLE_DOCX',
+    os.path.join(SERVICES_DIR, '..', '..', '..', '20250923.1RPRC_BD_TEAM_BIBLE_COMPLETE.docx')
+)
+DEFAULT_OUTPUT_DIR = os.environ.get(
+    'BIBLE_SECTIONS_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', '..', 'data', 'documents', 'bible')
+)
+MANIFEST_FILE = 'manifest.json'
+
+# Headings at this outline level or above (1 = Heading 1) start a new section file
+SPLIT_LEVEL = int(os.environ.get('BIBLE_SPLIT_LEVEL', 2))
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+W = f'{{{W_NS}}}'
+HYPERLINK_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink'
+
+# Paragraph styles that never carry content of their own
+SKIPPED_STYLES = re.compile(r'^(TOC\d*|TOCHeading)$')
+CODE_STYLES = {'SourceCode'}
+# Character style of generated outline numbers ("1.2.4"), which would break stable heading IDs
+NUMBER_STYLES = {'SectionNumber'}
+TITLE_STYLES = {'Title'}
+MARKDOWN_ESCAPE = re.compile(r'([\\`*_\[\]|])')
+
+
+def is_on(element):
+    """A w:b / w:i style toggle that is present and not switched off"""
+    return element is not None and element.get(f'{W}val') not in ('0', 'false', 'off')
+
+
+def is_number_run(run):
+    style = run.find(f'{W}rPr/{W}rStyle')
+    return style is not None and style.get(f'{W}val') in NUMBER_STYLES
+
+
+def plain_text(element):
+    """Unformatted text of a paragraph, without outline numbers"""
+    parts = []
+    for run in element.iter(f'{W}r'):
+        if not is_number_run(run):
+            parts.extend(' ' if child.tag == f'{W}tab' else (child.text or '')
+                         for child in run if child.tag in (f'{W}t', f'{W}tab'))
+    return ' '.join(''.join(parts).split())
+
+
+def read_styles(package):
+    """Outline level (1-based) of each heading paragraph style, following basedOn"""
+    if 'word/styles.xml' not in package.namelist():
+        return {}
+    root = etree.fromstring(package.read('word/styles.xml'))
+    levels, based_on = {}, {}
+    for style in root.iter(f'{W}style'):
+        style_id = style.get(f'{W}styleId')
+        outline = style.find(f'{W}pPr/{W}outlineLvl')
+        if outline is not None and int(outline.get(f'{W}val')) < 9:
+            levels[style_id] = int(outline.get(f'{W}val')) + 1
+        parent = style.find(f'{W}basedOn')
+        if parent is not None:
+            based_on[style_id] = parent.get(f'{W}val')
+
+    resolved = {}
+    for style_id in set(levels) | set(based_on):
+        current, seen = style_id, set()
+        while current is not None and current not in levels and current not in seen:
+            seen.add(current)
+            current = based_on.get(current)
+        if current in levels and not SKIPPED_STYLES.match(style_id):
+            resolved[style_id] = levels[current]
+    return resolved
+
+
+def read_numbering(package):
+    """Whether each (numId, ilvl) list level is numbered (True) or bulleted (False)"""
+    if 'word/numbering.xml' not in package.namelist():
+        return {}
+    root = etree.fromstring(package.read('word/numbering.xml'))
+    formats = {}
+    for abstract in root.iter(f'{W}abstractNum'):
+        for level in abstract.iter(f'{W}lvl'):
+            number_format = level.find(f'{W}numFmt')
+            formats[(abstract.get(f'{W}abstractNumId'), level.get(f'{W}ilvl'))] = (
+                number_format is not None and number_format.get(f'{W}val') not in ('bullet', 'none')
+            )
+    numbered = {}
+    for num in root.iter(f'{W}num'):
+        abstract_id = num.find(f'{W}abstractNumId').get(f'{W}val')
+        for (abstract, level), is_numbered in formats.items():
+            if abstract == abstract_id:
+                numbered[(num.get(f'{W}numId'), level)] = is_numbered
+    return numbered
+
+
+def read_hyperlinks(package):
+    """External hyperlink targets by relationship ID"""
+    name = 'word/_rels/document.xml.rels'
+    if name not in package.namelist():
+        return {}
+    root = etree.fromstring(package.read(name))
+    return {
+        rel.get('Id'): rel.get('Target')
+        for rel in root
+        if rel.get('Type') == HYPERLINK_REL and rel.get('TargetMode') == 'External'
+    }
+
+
+class MarkdownConverter:
+    def __init__(self, styles, numbering, hyperlinks):
+        """
+        Convert body elements to markdown
+        Args:
+            styles: Heading level by paragraph style ID
+            numbering: Numbered (True) or bulleted (False) by (numId, ilvl)
+            hyperlinks: External link targets by relationship ID
+        """
+        self.styles = styles
+        self.numbering = numbering
+        self.hyperlinks = hyperlinks
+
+    def run_text(self, run):
+        """(text, bold, italic) of one w:r"""
+        if is_number_run(run):
+            return '', False, False
+        parts = []
+        for child in run:
+            if child.tag == f'{W}t':
+                parts.append(MARKDOWN_ESCAPE.sub(r'\\\1', child.text or ''))
+            elif child.tag == f'{W}tab':
+                parts.append(' ')
+            elif child.tag in (f'{W}br', f'{W}cr'):
+                parts.append('  \n')
+        properties = run.find(f'{W}rPr')
+        bold = properties is not None and is_on(properties.find(f'{W}b'))
+        italic = properties is not None and is_on(properties.find(f'{W}i'))
+        return ''.join(parts), bold, italic
+
+    def runs_text(self, runs):
+        """Markdown of a sequence of runs; neighbouring runs with the same emphasis share one marker"""
+        groups = []
+        for text, bold, italic in (self.run_text(run) for run in runs):
+            if not text:
+                continue
+            if groups and (groups[-1][1], groups[-1][2]) == (bold, italic):
+                groups[-1][0] += text
+            else:
+                groups.append([text, bold, italic])
+
+        parts = []
+        for text, bold, italic in groups:
+            marker = ('**' if bold else '') + ('*' if italic else '')
+            stripped = text.strip()
+            if not marker or not stripped:
+                parts.append(text)
+                continue
+            # Emphasis must hug the text, so surrounding spaces stay outside the markers
+            lead, trail = text[:len(text) - len(text.lstrip())], text[len(text.rstrip()):]
+            parts.append(f'{lead}{marker}{stripped}{marker[::-1]}{trail}')
+        return ''.join(parts)
+
+    def inline_text(self, paragraph):
+        """Markdown text of a paragraph's runs and hyperlinks"""
+        parts = []
+        runs = []
+        for child in paragraph:
+            if child.tag == f'{W}r':
+                runs.append(child)
+                continue
+            if child.tag == f'{W}hyperlink':
+                parts.append(self.runs_text(runs))
+                runs = []
+                text = self.runs_text(child.iter(f'{W}r'))
+                target = self.hyperlinks.get(child.get(f'{{{R_NS}}}id'))
+                parts.append(f'[{text.strip()}]({target})' if target and text.strip() else text)
+            elif child.tag in (f'{W}ins', f'{W}smartTag', f'{W}sdt'):
+                runs.extend(child.iter(f'{W}r'))
+        parts.append(self.runs_text(runs))
+        return ''.join(parts)
+
+    def paragraph(self, paragraph):
+        """
+        Classify and convert one paragraph
+        Returns:
+            ('heading', level, title) | ('code', text) | ('block', markdown) | ('rule',) | None to skip
+        """
+        properties = paragraph.find(f'{W}pPr')
+        style = None
+        if properties is not None:
+            style_element = properties.find(f'{W}pStyle')
+            style = style_element.get(f'{W}val') if style_element is not None else None
+        if style and SKIPPED_STYLES.match(style):
+            return None
+
+        if style in CODE_STYLES:
+            return ('code', ''.join(
+                '\n' if child.tag in (f'{W}br', f'{W}cr') else (child.text or '')
+                for run in paragraph.iter(f'{W}r') for child in run if child.tag in (f'{W}t', f'{W}br', f'{W}cr')
+            ))
+
+        text = self.inline_text(paragraph).strip()
+        level = self.styles.get(style)
+        if level is None and style in TITLE_STYLES:
+            level = 1
+        if level is not None and text:
+            return ('heading', level, plain_text(paragraph))
+
+        if not text:
+            # Horizontal rules are empty paragraphs holding a VML rect
+            if paragraph.find(f'.//{{urn:schemas-microsoft-com:vml}}rect') is not None:
+                return ('rule',)
+            return None
+
+        numbering = properties.find(f'{W}numPr') if properties is not None else None
+        if numbering is not None and numbering.find(f'{W}numId') is not None:
+            level_element = numbering.find(f'{W}ilvl')
+            depth = level_element.get(f'{W}val') if level_element is not None else '0'
+            numbered = self.numbering.get((numbering.find(f'{W}numId').get(f'{W}val'), depth), False)
+            return ('item', '  ' * int(depth) + ('1. ' if numbered else '- ') + text)
+        return ('block', text)
+
+    def table(self, table):
+        """Markdown pipe table; the first row is the header"""
+        rows = []
+        for row in table.iter(f'{W}tr'):
+            cells = []
+            for cell in row.iter(f'{W}tc'):
+                texts = [self.inline_text(p).strip() for p in cell.iter(f'{W}p')]
+                cells.append('<br>'.join(text for text in texts if text))
+            rows.append(cells)
+        if not rows:
+            return None
+        width = max(len(cells) for cells in rows)
+        lines = []
+        for idx, cells in enumerate(rows):
+            lines.append('| ' + ' | '.join(cells + [''] * (width - len(cells))) + ' |')
+            if idx == 0:
+                lines.append('|' + '---|' * width)
+        return ('block', '\n'.join(lines))
+
+
+class SectionWriter:
+    def __init__(self, output_dir, previous):
+        """
+        Collect markdown per section and write changed sections
+        Args:
+            output_dir: Directory the section files go to
+            previous: Section records of the last ingestion, by ID
+        """
+        self.output_dir = output_dir
+        self.previous = previous
+        self.sections = []
+        self.seen = {}
+        self.written = []
+        self.unchanged = 0
+        self.current = None
+
+    def start(self, title, level):
+        self.finish()
+        slug = slugify(title)
+        self.seen[slug] = self.seen.get(slug, 0) + 1
+        if self.seen[slug] > 1:
+            slug = f'{slug}-{self.seen[slug]}'
+        self.current = {'id': slug, 'title': title, 'level': level, 'lines': [], 'mode': None}
+
+    def add(self, kind, text=''):
+        """Append a block; consecutive list items and code lines are kept together"""
+        if self.current is None:
+            self.start('Preamble', 0)
+        lines = self.current['lines']
+        if kind == 'code':
+            if self.current['mode'] != 'code':
+                lines.extend(['', '```'])
+            lines.append(text)
+        else:
+            if self.current['mode'] == 'code':
+                lines.append('```')
+            if kind != 'item' or self.current['mode'] != 'item':
+                lines.append('')
+            lines.append(text)
+        self.current['mode'] = kind
+
+    def finish(self):
+        """Write the current section if its content changed"""
+        section = self.current
+        if section is None:
+            return
+        self.current = None
+        lines = section.pop('lines')
+        if section.pop('mode') == 'code':
+            lines.append('```')
+        content = f"# {section['title']}\n\n" + '\n'.join(lines).strip('\n') + '\n'
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+        section['file'] = f"{section['id']}.md"
+        section['hash'] = digest
+        path = os.path.join(self.output_dir, section['file'])
+        previous = self.previous.get(section['id'])
+        if previous and previous['hash'] == digest and os.path.exists(path):
+            self.unchanged += 1
+        else:
+            write_text(path, content)
+            self.written.append(section['id'])
+        self.sections.append(section)
+
+
+def write_text(path, content):
+    """Write a file atomically so readers never see a partial section"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.ingest_', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def body_elements(package):
+    """
+    Stream the top-level w:p / w:tbl elements of word/document.xml
+    Each element is yielded whole and cleared afterwards, with its already
+    processed siblings removed, so the tree never holds more than one block.
+    """
+    with package.open('word/document.xml') as stream:
+        for _, element in etree.iterparse(stream, events=('end',), tag=(f'{W}p', f'{W}tbl', f'{W}sdt')):
+            parent = element.getparent()
+            if parent is None or parent.tag != f'{W}body':
+                continue
+            yield element
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def ingest_docx(docx_path=DEFAULT_DOCX, output_dir=DEFAULT_OUTPUT_DIR, split_level=SPLIT_LEVEL):
+    """
+    Split a DOCX into markdown section files
+    Args:
+        docx_path: Source .docx
+        output_dir: Directory for the section files and manifest
+        split_level: Headings at this level or above start a new file
+    Returns:
+        Result dict with the sections written, unchanged and removed, and timing
+    """
+    timer = JobTimer('ingest_docx')
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            previous = {section['id']: section for section in json.load(f)['sections']}
+    except (OSError, ValueError, KeyError):
+        previous = {}
+
+    with zipfile.ZipFile(docx_path) as package:
+        with timer.phase('read_parts'):
+            converter = MarkdownConverter(read_styles(package), read_numbering(package), read_hyperlinks(package))
+        writer = SectionWriter(output_dir, previous)
+
+        with timer.phase('convert'):
+            for element in body_elements(package):
+                if element.tag == f'{W}tbl':
+                    block = converter.table(element)
+                elif element.tag == f'{W}p':
+                    block = converter.paragraph(element)
+                else:
+                    # Content controls hold the generated table of contents
+                    block = None
+                if block is None:
+                    continue
+
+                kind = block[0]
+                if kind == 'heading':
+                    _, level, title = block
+                    if level <= split_level:
+                        writer.start(title, level)
+                    else:
+                        depth = min(6, level - writer.current['level'] + 1) if writer.current else min(6, level)
+                        writer.add('block', '#' * depth + ' ' + title)
+                elif kind == 'rule':
+                    writer.add('block', '---')
+                else:
+                    writer.add(kind, block[1])
+            writer.finish()
+
+    # Sections that no longer exist are removed (only files this pipeline wrote)
+    current = {section['id'] for section in writer.sections}
+    removed = sorted(set(previous) - current)
+    for section_id in removed:
+        path = os.path.join(output_dir, previous[section_id]['file'])
+        if os.path.exists(path):
+            os.remove(path)
+
+    if writer.written or removed or not os.path.exists(manifest_path):
+        write_text(manifest_path, json.dumps({
+            'source': os.path.basename(docx_path),
+            'split_level': split_level,
+            'sections': writer.sections
+        }, indent=2) + '\n')
+
+    result = {
+        'success': True,
+        'output_dir': output_dir,
+        'sections': len(writer.sections),
+        'written': writer.written,
+        'unchanged': writer.unchanged,
+        'removed': removed
+    }
+    result.update(timer.finish())
+    return result
+
+
+def main():
+    """Main function for command-line execution"""
+    args = sys.argv[1:]
+    output_dir = pop_option(args, 'output-dir')
+    split_level = pop_option(args, 'split-level')
+    refresh = '--refresh' in args
+    args = [arg for arg in args if arg != '--refresh']
+
+    if args and args[0] in ('-h', '--help'):
+        print("Usage: python docxIngest.py [docx_path] [--output-dir=DIR] [--split-level=N] [--refresh]")
+        sys.exit(1)
+
+    try:
+        result = ingest_docx(
+            args[0] if args else DEFAULT_DOCX,
+            output_dir=output_dir or DEFAULT_OUTPUT_DIR,
+            split_level=int(split_level) if split_level else SPLIT_LEVEL
+        )
+        if refresh:
+            # Downstream indexes re-read only the section files that were rewritten
+            from contentSearch import content_index
+            from relatedSections import related_sections
+            result['search_index'] = content_index.refresh()
+            result['related_sections'] = related_sections.build()
+        print(json.dumps(result, indent=2))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Precompiled placeholder fill plans
+A plan records which paragraphs of a template contain placeholders,
+including text inside tables and group shapes, so a render touches only those
+locations with one combined matcher instead of scanning every shape per key.
+"""
+
+import re
+from collections import namedtuple
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from templateCache import template_cache
+
+# {{PLACEHOLDER_NAME}} markers used by TemplateReplicator templates
+REPLICATOR_PATTERN = re.compile(r'\{\{([A-Z_0-9]+)\}\}')
+
+# One placeholder location
+#   slide:      slide index
+#   shape_path: shape indexes from the slide shape tree down through groups
+#   cell:       (row, col) for table cells, otherwise None
+#   paragraph:  paragraph index within the text frame
+#   keys:       placeholder keys found in the paragraph (matches may span runs)
+PlanEntry = namedtuple('PlanEntry', ['slide', 'shape_path', 'cell', 'paragraph', 'keys'])
+
+
+def iter_text_frames(shapes, path=()):
+    """Yield (shape_path, cell, shape, text_frame) for every text frame, recursing into groups"""
+    for idx, shape in enumerate(shapes):
+        shape_path = path + (idx,)
+
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from iter_text_frames(shape.shapes, shape_path)
+            continue
+
+        if shape.has_text_frame:
+            yield shape_path, None, shape, shape.text_frame
+
+        if shape.has_table:
+            for row_idx, row in enumerate(shape.table.rows):
+                for col_idx, cell in enumerate(row.cells):
+                    yield shape_path, (row_idx, col_idx), shape, cell.text_frame
+
+
+class FillPlan:
+    def __init__(self, pattern, entries):
+        self.pattern = pattern
+        self.entries = entries
+
+    @classmethod
+    def compile(cls, presentation, pattern):
+        """Walk the template once and record every paragraph the pattern matches"""
+        entries = []
+        for slide_idx, slide in enumerate(presentation.slides):
+            for shape_path, cell, _, text_frame in iter_text_frames(slide.shapes):
+                for para_idx, paragraph in enumerate(text_frame.paragraphs):
+                    keys = [m.group(0) for m in pattern.finditer(paragraph.text)]
+                    if keys:
+                        entries.append(PlanEntry(
+                            slide_idx, shape_path, cell, para_idx, tuple(dict.fromkeys(keys))
+                        ))
+        return cls(pattern, entries)
+
+    def locate(self, presentation):
+        """Yield (entry, shape, paragraph) for each plan entry resolved in presentation"""
+        slides = list(presentation.slides)
+        shape_lists = {}
+
+        for entry in self.entries:
+            if entry.slide >= len(slides):
+                continue
+
+            # Resolve the shape through the group path, caching shape lists per container
+            container_key = (entry.slide,)
+            shapes = shape_lists.get(container_key)
+            if shapes is None:
+                shapes = shape_lists[container_key] = list(slides[entry.slide].shapes)
+
+            shape = None
+            for depth, idx in enumerate(entry.shape_path):
+                if idx >= len(shapes):
+                    shape = None
+                    break
+                shape = shapes[idx]
+                if depth < len(entry.shape_path) - 1:
+                    container_key = (entry.slide,) + entry.shape_path[:depth + 1]
+                    shapes = shape_lists.get(container_key)
+                    if shapes is None:
+                        shapes = shape_lists[container_key] = list(shape.shapes)
+            if shape is None:
+                continue
+
+            if entry.cell:
+                text_frame = shape.table.cell(*entry.cell).text_frame
+            else:
+                text_frame = shape.text_frame
+
+            paragraphs = text_frame.paragraphs
+            if entry.paragraph < len(paragraphs):
+                yield entry, shape, paragraphs[entry.paragraph]
+
+
+def get_fill_plan(template_hash, presentation, pattern):
+    """
+    Return the fill plan for a template and matcher
+    Plans are held with the parsed template in the in-memory template cache, one per
+    matcher. The {{KEY}} replicator plan does not depend on the fill data and is
+    compiled when the template is analyzed at registration (render worker
+    'template_info'); after a worker restart or cache eviction it is compiled again
+    on the next fill. QuadChartFiller matches the literal keys of its data, so its
+    plans are compiled on the first fill with each key set.
+    If the template has been evicted, the plan is compiled from the given (unfilled)
+    presentation and not kept.
+    """
+    plan = template_cache.get_plan(
+        template_hash,
+        pattern.pattern,
+        lambda template: FillPlan.compile(template, pattern)
+    )
+    if plan is None:
+        plan = FillPlan.compile(presentation, pattern)
+    return plan
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Command-line job I/O without argv payloads or temp files
+Job data can be passed as '-' (read JSON from stdin) or 'fd:N' (read JSON
+from an inherited file descriptor) instead of inline JSON, which avoids the
+ARG_MAX limit on long quadrant text. An output path of '-' builds the .pptx
+in memory and writes the bytes to stdout; the result JSON then goes to
+stderr so the two never mix. In-process callers (the render worker) can
+pass a writable binary stream as the output path instead.
+"""
+
+import io
+import os
+import sys
+import json
+
+STDIO = '-'
+FD_PREFIX = 'fd:'
+
+
+def read_job_data(source):
+    """
+    Parse job data from a CLI argument
+    Args:
+        source: '-' for stdin, 'fd:N' for file descriptor N, otherwise inline JSON
+    """
+    if source == STDIO:
+        return json.load(sys.stdin)
+    if source.startswith(FD_PREFIX):
+        with os.fdopen(int(source[len(FD_PREFIX):]), encoding='utf-8') as f:
+            return json.load(f)
+    return json.loads(source)
+
+
+def pop_option(args, name):
+    """
+    Remove a --name=value option from an argument list and return its value (or None)
+    Args:
+        args: Mutable list of command-line arguments
+        name: Option name without the leading dashes
+    """
+    prefix = f'--{name}='
+    for idx, arg in enumerate(args):
+        if arg.startswith(prefix):
+            del args[idx]
+            return arg[len(prefix):]
+    return None
+
+
+def is_stdout(output_path):
+    return output_path == STDIO
+
+
+def is_stream(output_path):
+    """True for a writable binary stream passed in place of an output path"""
+    return hasattr(output_path, 'write')
+
+
+def save_output(save, output_path):
+    """
+    Save a presentation to a path, or to stdout when output_path is '-'
+    Args:
+        save: Callable writing the .pptx to a path or binary stream and returning the path
+        output_path: Destination path, '-' or a writable binary stream
+    Returns:
+        (saved path or None for stdout and streams, bytes written)
+    """
+    if is_stream(output_path):
+        start = output_path.tell()
+        save(output_path)
+        return None, output_path.tell() - start
+
+    if not is_stdout(output_path):
+        saved_path = save(output_path)
+        return saved_path, os.path.getsize(saved_path)
+
+    buffer = io.BytesIO()
+    save(buffer)
+    data = buffer.getbuffer()
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+    return None, len(data)
+
+
+def print_result(result, output_path):
+    """Print the result JSON where it cannot corrupt the .pptx bytes"""
+    print(json.dumps(result), file=sys.stderr if is_stdout(output_path) else sys.stdout)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Per-phase timing and opt-in profiling for PowerPoint jobs
+Every entry point reports where its time went (template load, fill, save) in
+its result JSON. With PPTX_PROFILE=true each job also writes a cProfile
+stats file, readable with `python -m pstats <file>`.
+
+cProfile profiles only the thread that enabled it, and Python 3.12+ allows one
+active profiler per process, so profiled jobs must not overlap: the render
+worker runs jobs one at a time under profile_guard() while profiling is on.
+"""
+
+import os
+import time
+import cProfile
+import itertools
+import threading
+from contextlib import contextmanager
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_ENABLED = os.environ.get('PPTX_PROFILE', 'false').lower() == 'true'
+DEFAULT_PROFILE_DIR = os.environ.get(
+    'PPTX_PROFILE_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'profiles')
+)
+
+# Distinguishes profiles of jobs that finish within the same second
+profile_counter = itertools.count(1)
+
+# Serializes profiled jobs in multi-threaded hosts (see profile_guard)
+profile_lock = threading.Lock()
+# The profiler a JobTimer is running on this thread; nested timers leave it to the outer one
+profile_state = threading.local()
+
+
+@contextmanager
+def profile_guard(profile=PROFILE_ENABLED):
+    """
+    Context that keeps profiled jobs from running concurrently
+    Wrap each job run on a thread pool in it; it is a no-op when profiling is off.
+    """
+    if not profile:
+        yield
+        return
+    with profile_lock:
+        try:
+            yield
+        finally:
+            # A job that failed before finish() leaves its profiler running
+            profiler = getattr(profile_state, 'profiler', None)
+            if profiler is not None:
+                profiler.disable()
+                profile_state.profiler = None
+
+
+class JobTimer:
+    def __init__(self, job_name, profile=PROFILE_ENABLED, profile_dir=DEFAULT_PROFILE_DIR):
+        """
+        Start timing a job
+        Args:
+            job_name: Used in the profile file name
+            profile: Run the job under cProfile
+            profile_dir: Where profile files are written
+        """
+        self.job_name = job_name
+        self.phases = {}
+        self.profile_dir = profile_dir
+        self.profiler = None
+
+        # An enclosing job's profiler on this thread already covers this one
+        if profile and getattr(profile_state, 'profiler', None) is None:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profiler = profile_state.profiler = profiler
+            except ValueError:
+                # Another profiler is active in the process (Python 3.12+)
+                pass
+
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block; repeated phases accumulate"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def dump_profile(self):
+        """Stop profiling and write the stats file; returns its path"""
+        self.profiler.disable()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{self.job_name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{next(profile_counter)}.pstats"
+        path = os.path.abspath(os.path.join(self.profile_dir, name))
+        self.profiler.dump_stats(path)
+        self.profiler = None
+        profile_state.profiler = None
+        return path
+
+    def finish(self, output_path=None, compression=None, **counts):
+        """
+        Stop the clock and return the fields merged into the job result
+        Args:
+            output_path: File written by the job, reported as bytes_written
+            compression: Compression profile the output was saved with
+            counts: Extra counters (shape_count, replacement_count, ...)
+        """
+        total = time.perf_counter() - self.started
+        timing = {f'{name}_ms': round(seconds * 1000, 2) for name, seconds in self.phases.items()}
+        timing['total_ms'] = round(total * 1000, 2)
+        if compression:
+            timing['compression'] = compression
+
+        fields = {'timing': timing}
+        if output_path and os.path.exists(output_path):
+            fields['bytes_written'] = os.path.getsize(output_path)
+        fields.update(counts)
+
+        if self.profiler is not None:
+            fields['profile_path'] = self.dump_profile()
+        return fields
+
+
+def count_shapes(presentation):
+    """Top-level shapes across all slides"""
+    return sum(len(slide.shapes) for slide in presentation.slides)
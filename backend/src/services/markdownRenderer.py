@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Markdown to sanitized HTML for the content documents
+Covers the markdown the BD Bible is written in: ATX headings, paragraphs,
+nested bullet/numbered lists, block quotes, fenced code, pipe tables, rules,
+emphasis, inline code, links and images. Raw HTML is never passed through:
+all text is escaped, only the tags below are generated (plus <br> from
+table cells), and link/image URLs are limited to safe schemes, so the output
+is safe to insert into the page as-is.
+
+Top-level headings get the same IDs as the sections of contentSections, so
+search results, related sections and TOC entries link straight to them.
+"""
+
+import re
+import sys
+import json
+import html
+from urllib.parse import urlparse
+
+from contentSections import CODE_FENCE, HEADING_ANCHOR, MARKDOWN_HEADING, slugify
+
+SAFE_SCHEMES = {'', 'http', 'https', 'mailto'}
+
+RULE = re.compile(r'^ {0,3}([-*_])(?:\s*\1){2,}\s*$')
+LIST_ITEM = re.compile(r'^(\s*)([-*+]|\d{1,9}[.)])\s+(.*)$')
+QUOTE = re.compile(r'^ {0,3}> ?(.*)$')
+TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+EXPLICIT_ANCHOR = re.compile(r'\{#([^}\s]+)\}\s*$')
+
+ESCAPED_CHAR = re.compile(r'\\([\\`*_{}\[\]()#+\-.!|~>])')
+CODE_SPAN = re.compile(r'(`+)(.+?)\1', re.S)
+# URLs may contain one level of balanced parentheses
+URL = r'((?:[^()\s]|\([^()\s]*\))*)'
+IMAGE = re.compile(r'!\[([^\]]*)\]\(\s*' + URL + r'(?:\s+"([^"]*)")?\s*\)')
+LINK = re.compile(r'\[((?:[^\[\]]|\[[^\]]*\])*)\]\(\s*' + URL + r'(?:\s+"([^"]*)")?\s*\)')
+BOLD = re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1', re.S)
+ITALIC = re.compile(r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?!\*)|(?<![\w_])_(?=\S)(.+?)(?<=\S)_(?![\w_])', re.S)
+STRIKE = re.compile(r'~~(?=\S)(.+?)(?<=\S)~~', re.S)
+BREAK_TAG = re.compile(r'&lt;br\s*/?&gt;', re.I)
+HARD_BREAK = re.compile(r'(?: {2,}|\\)\n')
+PLACEHOLDER = re.compile(r'\x00(\d+)\x00')
+
+
+def safe_url(url):
+    """The URL if its scheme is allowed (relative and #fragment links included), else None"""
+    url = url.strip()
+    try:
+        scheme = urlparse(url).scheme.lower()
+    except ValueError:
+        return None
+    return url if scheme in SAFE_SCHEMES else None
+
+
+def render_inline(text, stash=None):
+    """
+    Inline markdown to HTML; everything that is not markup is escaped
+    Args:
+        text: Markdown text, possibly holding placeholders into stash
+        stash: Fragments already rendered by an enclosing call (link labels)
+    """
+    stash = [] if stash is None else stash
+
+    def keep(fragment):
+        stash.append(fragment)
+        return f'\x00{len(stash) - 1}\x00'
+
+    text = CODE_SPAN.sub(lambda m: keep(f'<code>{html.escape(m.group(2).strip())}</code>'), text)
+    text = ESCAPED_CHAR.sub(lambda m: keep(html.escape(m.group(1))), text)
+
+    def image(match):
+        alt, url, title = match.groups()
+        url = safe_url(url)
+        if url is None:
+            return keep(html.escape(alt))
+        title_attr = f' title="{html.escape(title)}"' if title else ''
+        return keep(f'<img src="{html.escape(url)}" alt="{html.escape(alt)}"{title_attr}>')
+
+    def link(match):
+        label, url, title = match.groups()
+        url = safe_url(url)
+        # The label may hold this call's code span and escape placeholders
+        inner = render_inline(label, stash)
+        if url is None:
+            # Unsafe or local-file targets (file:///Users/...) keep only their text
+            return keep(inner)
+        title_attr = f' title="{html.escape(title)}"' if title else ''
+        return keep(f'<a href="{html.escape(url)}"{title_attr}>{inner}</a>')
+
+    text = IMAGE.sub(image, text)
+    text = LINK.sub(link, text)
+
+    text = html.escape(text, quote=False)
+    text = BREAK_TAG.sub('<br>', text)
+    text = HARD_BREAK.sub('<br>\n', text)
+    text = BOLD.sub(lambda m: f'<strong>{m.group(2)}</strong>', text)
+    text = ITALIC.sub(lambda m: f'<em>{m.group(1) or m.group(2)}</em>', text)
+    text = STRIKE.sub(lambda m: f'<del>{m.group(1)}</del>', text)
+
+    # Stashed fragments can contain other placeholders (link labels), so restore until none remain
+    while PLACEHOLDER.search(text):
+        text = PLACEHOLDER.sub(lambda m: stash[int(m.group(1))], text)
+    return text
+
+
+def split_row(line):
+    """Cells of a pipe table row"""
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip() for cell in re.split(r'(?<!\\)\|', line)]
+
+
+class MarkdownRenderer:
+    def __init__(self):
+        """Render one document; tracks heading IDs and where each top-level section starts"""
+        self.seen = {}
+        self.sections = []
+        self.output = []
+        self.length = 0
+
+    def emit(self, fragment):
+        self.output.append(fragment)
+        self.length += len(fragment)
+
+    def heading_id(self, title):
+        """Section ID of a heading, deduplicated like contentSections"""
+        slug = slugify(title)
+        self.seen[slug] = self.seen.get(slug, 0) + 1
+        return slug if self.seen[slug] == 1 else f'{slug}-{self.seen[slug]}'
+
+    def render(self, text):
+        """
+        Render a whole document
+        Returns:
+            (html, sections) where sections are {'id', 'title', 'level', 'start', 'end'}
+            character ranges of the HTML, one per top-level heading, plus a preamble for
+            any text before the first heading (the whole document if it has none)
+        """
+        lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        self.render_blocks(lines, top_level=True)
+        html_text = ''.join(self.output)
+        for idx, section in enumerate(self.sections):
+            section['end'] = self.sections[idx + 1]['start'] if idx + 1 < len(self.sections) else len(html_text)
+        # Text before the first heading, or the whole document if it has none
+        if not self.sections or self.sections[0]['start'] > 0:
+            end = self.sections[0]['start'] if self.sections else len(html_text)
+            self.sections.insert(0, {'id': 'preamble', 'title': '', 'level': 0, 'start': 0, 'end': end})
+        return html_text, self.sections
+
+    def render_blocks(self, lines, top_level=False):
+        idx = 0
+        while idx < len(lines):
+            line = lines[idx]
+            if not line.strip():
+                idx += 1
+                continue
+
+            fence = CODE_FENCE.match(line)
+            if fence:
+                idx = self.code_block(lines, idx, fence.group(1))
+                continue
+
+            heading = MARKDOWN_HEADING.match(line)
+            if heading:
+                self.heading(len(heading.group(1)), heading.group(2), top_level)
+                idx += 1
+                continue
+
+            if RULE.match(line):
+                self.emit('<hr>\n')
+                idx += 1
+                continue
+
+            if QUOTE.match(line):
+                quoted = []
+                while idx < len(lines) and lines[idx].strip() and QUOTE.match(lines[idx]):
+                    quoted.append(QUOTE.match(lines[idx]).group(1))
+                    idx += 1
+                self.emit('<blockquote>\n')
+                self.render_blocks(quoted)
+                self.emit('</blockquote>\n')
+                continue
+
+            if LIST_ITEM.match(line):
+                idx = self.list_block(lines, idx)
+                continue
+
+            if '|' in line and idx + 1 < len(lines) and TABLE_SEPARATOR.match(lines[idx + 1]) \
+                    and '-' in lines[idx + 1]:
+                idx = self.table(lines, idx)
+                continue
+
+            idx = self.paragraph(lines, idx)
+
+    def heading(self, level, raw_title, top_level):
+        title = HEADING_ANCHOR.sub('', raw_title)
+        if not top_level:
+            self.emit(f'<h{level}>{render_inline(title)}</h{level}>\n')
+            return
+
+        section_id = self.heading_id(title)
+        self.sections.append({'id': section_id, 'title': title, 'level': level, 'start': self.length})
+        explicit = EXPLICIT_ANCHOR.search(raw_title)
+        # Keep hand-written {#anchor} targets working alongside the generated ID
+        extra = f'<a id="{html.escape(explicit.group(1))}"></a>' if explicit and explicit.group(1) != section_id \
+            else ''
+        self.emit(
+            f'<h{level} id="{html.escape(section_id)}">{extra}{render_inline(title)}'
+            f'<a class="heading-anchor" href="#{html.escape(section_id)}" aria-hidden="true">#</a>'
+            f'</h{level}>\n'
+        )
+
+    def code_block(self, lines, idx, marker):
+        info = lines[idx].strip()[len(marker):].strip().split(' ')[0]
+        body = []
+        idx += 1
+        while idx < len(lines) and not lines[idx].strip().startswith(marker):
+            body.append(lines[idx])
+            idx += 1
+        language = f' class="language-{html.escape(info)}"' if re.fullmatch(r'[\w+-]+', info or '-') and info \
+            else ''
+        self.emit(f'<pre><code{language}>{html.escape(chr(10).join(body))}\n</code></pre>\n')
+        return idx + 1
+
+    def list_block(self, lines, idx):
+        """
+        Nested lists from item indentation
+        Continuation lines join the item above; a blank line ends the list unless
+        the next line is another item or an indented continuation.
+        """
+        items = []
+        while idx < len(lines):
+            line = lines[idx]
+            match = LIST_ITEM.match(line)
+            if match and not RULE.match(line):
+                indent = len(match.group(1).expandtabs(4))
+                ordered = match.group(2)[0].isdigit()
+                items.append([indent, ordered, [match.group(3)]])
+            elif line.strip() and (line.startswith((' ', '\t')) or not self.starts_block(line)):
+                items[-1][2].append(line.strip())
+            elif not line.strip():
+                following = lines[idx + 1] if idx + 1 < len(lines) else ''
+                if not (LIST_ITEM.match(following) or following.startswith(('  ', '\t'))):
+                    break
+            else:
+                break
+            idx += 1
+
+        stack = []  # (indent, ordered)
+        for indent, ordered, texts in items:
+            while stack and indent < stack[-1][0]:
+                self.emit(f"</li>\n</{'ol' if stack[-1][1] else 'ul'}>\n")
+                stack.pop()
+            if stack and indent == stack[-1][0] and ordered != stack[-1][1]:
+                self.emit(f"</li>\n</{'ol' if stack[-1][1] else 'ul'}>\n")
+                stack.pop()
+            if not stack or indent > stack[-1][0]:
+                self.emit('<ol>\n' if ordered else '<ul>\n')
+                stack.append((indent, ordered))
+            else:
+                self.emit('</li>\n')
+            self.emit('<li>' + render_inline('\n'.join(texts)))
+        while stack:
+            self.emit(f"</li>\n</{'ol' if stack[-1][1] else 'ul'}>\n")
+            stack.pop()
+        return idx
+
+    def table(self, lines, idx):
+        header = split_row(lines[idx])
+        alignments = []
+        for cell in split_row(lines[idx + 1]):
+            if cell.startswith(':') and cell.endswith(':'):
+                alignments.append('center')
+            elif cell.endswith(':'):
+                alignments.append('right')
+            elif cell.startswith(':'):
+                alignments.append('left')
+            else:
+                alignments.append(None)
+
+        def cells(row, tag):
+            parts = []
+            for column, cell in enumerate(row):
+                align = alignments[column] if column < len(alignments) else None
+                style = f' style="text-align: {align}"' if align else ''
+                parts.append(f'<{tag}{style}>{render_inline(cell)}</{tag}>')
+            return '<tr>' + ''.join(parts) + '</tr>\n'
+
+        self.emit('<table>\n<thead>\n' + cells(header, 'th') + '</thead>\n<tbody>\n')
+        idx += 2
+        while idx < len(lines) and lines[idx].strip() and '|' in lines[idx]:
+            row = split_row(lines[idx])
+            self.emit(cells(row + [''] * (len(header) - len(row)), 'td'))
+            idx += 1
+        self.emit('</tbody>\n</table>\n')
+        return idx
+
+    def starts_block(self, line):
+        return bool(
+            MARKDOWN_HEADING.match(line) or CODE_FENCE.match(line) or RULE.match(line)
+            or QUOTE.match(line) or LIST_ITEM.match(line)
+        )
+
+    def paragraph(self, lines, idx):
+        body = [lines[idx]]
+        idx += 1
+        while idx < len(lines) and lines[idx].strip() and not self.starts_block(lines[idx]):
+            body.append(lines[idx])
+            idx += 1
+        # Trailing spaces are kept: two or more mark a hard line break
+        self.emit('<p>' + render_inline('\n'.join(line.lstrip() for line in body).rstrip()) + '</p>\n')
+        return idx
+
+
+def render_markdown(text):
+    """
+    Render a markdown document to sanitized HTML
+    Returns:
+        (html, sections) - see MarkdownRenderer.render
+    """
+    return MarkdownRenderer().render(text)
+
+
+def main():
+    """Main function for command-line execution"""
+    if len(sys.argv) < 2:
+        print("Usage: python markdownRenderer.py <file.md|->")
+        sys.exit(1)
+
+    try:
+        if sys.argv[1] == '-':
+            text = sys.stdin.read()
+        else:
+            with open(sys.argv[1], encoding='utf-8') as f:
+                text = f.read()
+        print(render_markdown(text)[0], end='')
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
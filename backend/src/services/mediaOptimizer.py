@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Media optimization for templates and logos
+Images are downsampled to the largest size they are displayed at (at a target
+DPI), recompressed in their own format and, inside a template, identical media
+parts are merged. Optimized variants are cached by content hash, so the same
+screenshot or logo is only ever processed once.
+
+Runs at template registration and whenever a logo is embedded; renders then
+copy and compress far fewer bytes.
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import zipfile
+import hashlib
+import tempfile
+import posixpath
+from lxml import etree
+from PIL import Image
+
+from pptxZip import RawZipWriter
+from pptxStreamFill import RELS_NS, R_NS, P_NS, rels_part_name, read_rels
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.environ.get(
+    'MEDIA_CACHE_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'media_cache')
+)
+TARGET_DPI = int(os.environ.get('MEDIA_TARGET_DPI', 220))
+JPEG_QUALITY = int(os.environ.get('MEDIA_JPEG_QUALITY', 85))
+OPTIMIZE_ENABLED = os.environ.get('MEDIA_OPTIMIZE_ENABLED', 'true').lower() != 'false'
+
+# Bump when the optimization output changes, so cached variants are rebuilt
+OPTIMIZER_VERSION = 1
+
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+CT_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+CONTENT_TYPES_PART = '[Content_Types].xml'
+IMAGE_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+EMU_PER_INCH = 914400
+
+# Only downsample when it saves a meaningful number of pixels
+RESIZE_MARGIN = 1.1
+
+# Formats recompressed in place; others (EMF, WMF, SVG, GIF, TIFF...) are left alone
+OPTIMIZED_FORMATS = {'PNG', 'JPEG'}
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def target_pixels(display_emu, dpi=TARGET_DPI):
+    """Pixels needed to show display_emu at dpi"""
+    return max(1, math.ceil(display_emu / EMU_PER_INCH * dpi))
+
+
+def optimize_image(data, display_size=None, dpi=TARGET_DPI):
+    """
+    Downsample and recompress one image, keeping its format
+    Args:
+        data: Original image bytes
+        display_size: (width, height) in EMU the image is shown at, or None if unknown
+        dpi: Target resolution
+    Returns:
+        Optimized bytes, or the original bytes when nothing smaller could be produced
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        image_format = image.format
+        if image_format not in OPTIMIZED_FORMATS or getattr(image, 'n_frames', 1) > 1:
+            return data
+        image.load()
+    except Exception:
+        # Not an image Pillow understands; embed it unchanged
+        return data
+
+    if display_size:
+        width, height = image.size
+        target_width = target_pixels(display_size[0], dpi)
+        target_height = target_pixels(display_size[1], dpi)
+        # Keep the aspect ratio; the slide scales the picture to its frame anyway
+        scale = max(target_width / width, target_height / height)
+        if scale * RESIZE_MARGIN < 1:
+            image = image.resize(
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                Image.LANCZOS
+            )
+
+    options = {}
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+
+    output = io.BytesIO()
+    if image_format == 'JPEG':
+        if image.mode not in ('RGB', 'L', 'CMYK'):
+            image = image.convert('RGB')
+        if image.info.get('exif'):
+            options['exif'] = image.info['exif']
+        image.save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True, **options)
+    else:
+        image.save(output, format='PNG', optimize=True, **options)
+
+    optimized = output.getvalue()
+    return optimized if len(optimized) < len(data) else data
+
+
+class MediaCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        """
+        Initialize the cache
+        Args:
+            directory: Where optimized variants are stored
+        """
+        self.directory = os.path.abspath(directory)
+
+    def key(self, data, display_size, dpi):
+        material = json.dumps({
+            'content': content_hash(data),
+            'pixels': [target_pixels(size, dpi) for size in display_size] if display_size else None,
+            'jpeg_quality': JPEG_QUALITY,
+            'version': OPTIMIZER_VERSION
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def optimize(self, data, display_size=None, dpi=TARGET_DPI):
+        """optimize_image with the result cached by content hash and target size"""
+        key = self.key(data, display_size, dpi)
+        path = os.path.join(self.directory, key[:2], key)
+        keep_marker = f'{path}.keep'
+
+        if os.path.exists(keep_marker):
+            return data
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+
+        optimized = optimize_image(data, display_size, dpi)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if optimized is data:
+                # Remember that the original is already the best version
+                open(keep_marker, 'wb').close()
+            else:
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.media_', suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(optimized)
+                os.replace(temp_path, path)
+        except OSError as e:
+            # Caching is an optimization; a read-only or full disk must not fail the render
+            print(f"Warning: Could not cache optimized media: {e}", file=sys.stderr)
+        return optimized
+
+    def optimize_file(self, path, display_size=None, dpi=TARGET_DPI):
+        """Optimized bytes for an image file (e.g. an uploaded logo)"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not OPTIMIZE_ENABLED:
+            return data
+        return self.optimize(data, display_size, dpi)
+
+
+# Shared process-wide cache used by the generator and the render worker
+media_cache = MediaCache()
+
+
+def display_size(blip):
+    """
+    Largest on-slide size (EMU) the image behind an <a:blip> needs, or None if unknown
+    Accounts for cropping (the visible part is stretched over the frame) and for
+    group scaling.
+    """
+    extent = None
+    scale_x = scale_y = 1.0
+    for ancestor in blip.iterancestors():
+        tag = etree.QName(ancestor).localname
+        if extent is None:
+            ext = ancestor.find(f'./{{{P_NS}}}spPr/{{{A_NS}}}xfrm/{{{A_NS}}}ext')
+            if ext is not None:
+                extent = (int(ext.get('cx')), int(ext.get('cy')))
+        elif tag == 'grpSp':
+            xfrm = ancestor.find(f'./{{{P_NS}}}grpSpPr/{{{A_NS}}}xfrm')
+            ext = xfrm.find(f'{{{A_NS}}}ext') if xfrm is not None else None
+            child_ext = xfrm.find(f'{{{A_NS}}}chExt') if xfrm is not None else None
+            if ext is not None and child_ext is not None:
+                scale_x *= int(ext.get('cx')) / max(1, int(child_ext.get('cx')))
+                scale_y *= int(ext.get('cy')) / max(1, int(child_ext.get('cy')))
+    if extent is None:
+        return None
+
+    # srcRect values are thousandths of a percent cropped from each edge
+    src_rect = blip.getparent().find(f'{{{A_NS}}}srcRect')
+    visible_x = visible_y = 1.0
+    if src_rect is not None:
+        visible_x = 1 - (int(src_rect.get('l', 0)) + int(src_rect.get('r', 0))) / 100000
+        visible_y = 1 - (int(src_rect.get('t', 0)) + int(src_rect.get('b', 0))) / 100000
+    if visible_x <= 0 or visible_y <= 0:
+        return None
+
+    return (
+        math.ceil(extent[0] * scale_x / visible_x),
+        math.ceil(extent[1] * scale_y / visible_y)
+    )
+
+
+def media_display_sizes(source):
+    """
+    Map media part name -> largest display size in EMU (None when any use has no known size)
+    Every part with image relationships (slides, layouts, masters) is inspected.
+    """
+    sizes = {}
+    names = set(source.namelist())
+    for part_name in sorted(names):
+        if not part_name.endswith('.xml') or rels_part_name(part_name) not in names:
+            continue
+        images = {rid: target for rid, (rel_type, target) in read_rels(source, part_name).items()
+                  if rel_type == IMAGE_REL}
+        if not images:
+            continue
+
+        root = etree.fromstring(source.read(part_name))
+        used = set()
+        for blip in root.iter(f'{{{A_NS}}}blip'):
+            target = images.get(blip.get(f'{{{R_NS}}}embed'))
+            if target is None:
+                continue
+            used.add(target)
+            size = display_size(blip)
+            if target in sizes and sizes[target] is None:
+                continue
+            if size is None:
+                sizes[target] = None
+            else:
+                previous = sizes.get(target, (0, 0))
+                sizes[target] = (max(previous[0], size[0]), max(previous[1], size[1]))
+
+        # Images referenced some other way (e.g. in VML or charts) keep full resolution
+        for target in set(images.values()) - used:
+            sizes[target] = None
+    return sizes
+
+
+def optimize_template(template_path, output_path=None, dpi=TARGET_DPI, cache=media_cache):
+    """
+    Optimize every image in a .pptx package and merge identical media parts
+    Args:
+        template_path: Source .pptx
+        output_path: Destination (defaults to rewriting template_path in place)
+        dpi: Target resolution for downsampling
+        cache: MediaCache used for optimized variants
+    Returns:
+        Result dict with media counts and package sizes before and after
+    """
+    output_path = output_path or template_path
+    bytes_before = os.path.getsize(template_path)
+
+    with zipfile.ZipFile(template_path) as source:
+        sizes = media_display_sizes(source)
+        names = [info.filename for info in source.infolist()]
+
+        # Identical media (same bytes and extension, so the same content type) share one part
+        canonical = {}
+        by_hash = {}
+        media_names = sorted(name for name in names if name.startswith('ppt/media/'))
+        for name in media_names:
+            digest = (content_hash(source.read(name)), posixpath.splitext(name)[1].lower())
+            if digest not in by_hash:
+                by_hash[digest] = name
+                continue
+            kept = canonical[name] = by_hash[digest]
+            # The surviving part must be sharp enough for every place either was shown
+            if name in sizes and kept in sizes:
+                if sizes[name] is None or sizes[kept] is None:
+                    sizes[kept] = None
+                else:
+                    sizes[kept] = (max(sizes[kept][0], sizes[name][0]), max(sizes[kept][1], sizes[name][1]))
+            else:
+                sizes.pop(kept, None)
+
+        optimized = {}
+        for name in by_hash.values():
+            data = source.read(name)
+            new_data = cache.optimize(data, sizes.get(name), dpi)
+            if new_data is not data:
+                optimized[name] = new_data
+
+        # Point relationships at the surviving copy of duplicated media
+        rewritten = {}
+        for name in names:
+            if not name.endswith('.rels') or not canonical:
+                continue
+            directory = posixpath.dirname(posixpath.dirname(name))
+            root = etree.fromstring(source.read(name))
+            changed = False
+            for rel in root.iter(f'{{{RELS_NS}}}Relationship'):
+                if rel.get('TargetMode') == 'External':
+                    continue
+                target = rel.get('Target')
+                absolute = target.lstrip('/') if target.startswith('/') else \
+                    posixpath.normpath(posixpath.join(directory, target))
+                if absolute in canonical:
+                    rel.set('Target', posixpath.relpath(canonical[absolute], directory or '.'))
+                    changed = True
+            if changed:
+                rewritten[name] = etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+        if canonical and CONTENT_TYPES_PART in names:
+            root = etree.fromstring(source.read(CONTENT_TYPES_PART))
+            for override in list(root.iter(f'{{{CT_NS}}}Override')):
+                if override.get('PartName', '').lstrip('/') in canonical:
+                    root.remove(override)
+            rewritten[CONTENT_TYPES_PART] = etree.tostring(
+                root, xml_declaration=True, encoding='UTF-8', standalone=True
+            )
+
+        if not optimized and not canonical:
+            if output_path != template_path:
+                with open(template_path, 'rb') as src, open(output_path, 'wb') as out:
+                    out.write(src.read())
+        else:
+            output_dir = os.path.dirname(os.path.abspath(output_path))
+            os.makedirs(output_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix='.optimize_', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    writer = RawZipWriter(out)
+                    for info in source.infolist():
+                        if info.filename in canonical:
+                            continue
+                        if info.filename in optimized:
+                            # Already-compressed image data; deflating it again gains nothing
+                            writer.write_bytes(info.filename, optimized[info.filename], 0,
+                                               info.date_time, info.external_attr)
+                        elif info.filename in rewritten:
+                            writer.write_bytes(info.filename, rewritten[info.filename], 6,
+                                               info.date_time, info.external_attr)
+                        else:
+                            writer.copy_raw(source, info)
+                    writer.close()
+                os.replace(temp_path, output_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+
+    return {
+        'success': True,
+        'path': str(output_path),
+        'media_count': len(media_names),
+        'optimized': len(optimized),
+        'deduplicated': len(canonical),
+        'bytes_before': bytes_before,
+        'bytes_after': os.path.getsize(output_path),
+        'dpi': dpi
+    }
+
+
+def main():
+    """Main function for command-line execution"""
+    if len(sys.argv) < 2:
+        print("Usage: python mediaOptimizer.py <template_path> [output_path] [--dpi=N]", file=sys.stderr)
+        sys.exit(1)
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--dpi=')]
+    dpi = next((int(arg[len('--dpi='):]) for arg in sys.argv[1:] if arg.startswith('--dpi=')), TARGET_DPI)
+
+    try:
+        result = optimize_template(args[0], args[1] if len(args) > 1 else None, dpi)
+        print(json.dumps(result))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,39 +5,59 @@
 
 const path = require('path');
 const fs = require('fs').promises;
+const crypto = require('crypto');
+const readline = require('readline');
 const { spawn } = require('child_process');
 const TemplateMapper = require('./templateMapper');
+const renderWorker = require('./renderWorker');
 
 class PPTXGenerator {
     constructor() {
         this.outputDir = path.join(__dirname, '../../../output');
         this.templateDir = path.join(__dirname, '../../templates/powerpoint');
-        this.pythonScript = path.join(__dirname, 'quadChartFiller.py');
         this.templateMapper = new TemplateMapper();
+        this.batchScript = path.join(__dirname, 'batchRender.py');
+        this.previewDir = process.env.PREVIEW_CACHE_DIR || path.join(__dirname, '../../data/previews');
+    }
+
+    /**
+     * Build the template, data and output path for rendering one record
+     */
+    buildRenderJob(quadChartRecord) {
+        // Prepare data for PowerPoint generation
+        const mappedData = this.prepareDataForPowerPoint(quadChartRecord);
+
+        // Get template path
+        const templatePath = path.join(this.templateDir, quadChartRecord.templateName);
+
+        // Generate output filename
+        const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
+        const safeOpportunityName = quadChartRecord.opportunityName.replace(/[^a-zA-Z0-9]/g, '_');
+        // The record ID keeps batch outputs distinct when names and timestamps collide
+        const recordId = quadChartRecord.id !== undefined && quadChartRecord.id !== null
+            ? String(quadChartRecord.id).replace(/[^a-zA-Z0-9-]/g, '_')
+            : crypto.randomBytes(4).toString('hex');
+        const outputFileName = `${safeOpportunityName}_${recordId}_${timestamp}.pptx`;
+        const outputPath = path.join(this.outputDir, outputFileName);
+
+        return { templatePath, mappedData, outputPath };
     }
 
     /**
      * Generate a quad chart PowerPoint from database record
+     * @param {Object} quadChartRecord - Record to render
+     * @param {Object} options - { compression: 'fast' | 'default' | 'archive' } (default 'fast';
+     *                           these files are downloaded right away)
      */
-    async generateQuadChart(quadChartRecord) {
+    async generateQuadChart(quadChartRecord, options = {}) {
         try {
             // Ensure output directory exists
             await fs.mkdir(this.outputDir, { recursive: true });
 
-            // Prepare data for PowerPoint generation
-            const mappedData = this.prepareDataForPowerPoint(quadChartRecord);
-
-            // Get template path
-            const templatePath = path.join(this.templateDir, quadChartRecord.templateName);
-
-            // Generate output filename
-            const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
-            const safeOpportunityName = quadChartRecord.opportunityName.replace(/[^a-zA-Z0-9]/g, '_');
-            const outputFileName = `${safeOpportunityName}_${timestamp}.pptx`;
-            const outputPath = path.join(this.outputDir, outputFileName);
+            const { templatePath, mappedData, outputPath } = this.buildRenderJob(quadChartRecord);
 
             // Generate PowerPoint using Python script
-            await this.executePythonScript(templatePath, mappedData, outputPath);
+            await this.executePythonScript(templatePath, mappedData, outputPath, options.compression || 'fast');
 
             // Update database with generated file path
             if (quadChartRecord.update) {
@@ -53,6 +73,47 @@ class PPTXGenerator {
         }
     }
 
+    /**
+     * Render a quad chart and stream it into a writable stream (e.g. an HTTP response)
+     * The render goes through the persistent worker, so the template and render caches
+     * apply. The worker writes the .pptx to its output pipe (output_path '-') and the
+     * bytes are written to the destination as they arrive; nothing touches the disk.
+     * A render that fails before the first byte leaves the destination untouched; one
+     * that fails later destroys it instead of ending it cleanly.
+     * @param {Object} quadChartRecord - Record to render
+     * @param {stream.Writable} destination - Receives the .pptx bytes
+     * @returns {Promise<Object>} Worker result (timing, bytes_written, ...)
+     */
+    async streamQuadChart(quadChartRecord, destination) {
+        const { templatePath, mappedData } = this.buildRenderJob(quadChartRecord);
+
+        let written = 0;
+        let result;
+        try {
+            result = await renderWorker.submit('fill', {
+                template_path: templatePath,
+                data: mappedData,
+                output_path: '-',
+                stream: process.env.PPTX_STREAM_FILL === 'true',
+                compression: 'fast'
+            }, {
+                onData: (chunk) => {
+                    written += chunk.length;
+                    destination.write(chunk);
+                }
+            });
+        } catch (error) {
+            const failure = new Error(`PowerPoint generation failed: ${error.message}`);
+            if (written > 0) {
+                destination.destroy(failure);
+            }
+            throw failure;
+        }
+
+        destination.end();
+        return result;
+    }
+
     /**
      * Prepare and map data for PowerPoint generation
      */
@@ -240,86 +301,175 @@ class PPTXGenerator {
     }
 
     /**
-     * Execute Python script to generate PowerPoint
+     * Fill the template with data in the persistent Python render worker
      */
-    async executePythonScript(templatePath, data, outputPath) {
-        return new Promise((resolve, reject) => {
-            const python = process.platform === 'win32' ? 'python' : 'python3';
-            const venvPython = path.join(__dirname, '../../../venv/bin/python');
-
-            // Try venv python first, fallback to system python
-            fs.access(venvPython).then(() => venvPython).catch(() => python).then(pyPath => {
-                const args = [
-                    this.pythonScript,
-                    templatePath,
-                    JSON.stringify(data),
-                    outputPath
-                ];
-
-                const process = spawn(pyPath, args);
-
-                let stdout = '';
-                let stderr = '';
-
-                process.stdout.on('data', (data) => {
-                    stdout += data.toString();
-                });
-
-                process.stderr.on('data', (data) => {
-                    stderr += data.toString();
-                });
-
-                process.on('close', (code) => {
-                    if (code !== 0) {
-                        console.error('Python script error:', stderr);
-                        reject(new Error(`PowerPoint generation failed: ${stderr}`));
-                    } else {
-                        console.log('PowerPoint generated successfully:', stdout);
-                        resolve(outputPath);
-                    }
-                });
-
-                process.on('error', (error) => {
-                    reject(new Error(`Failed to start Python process: ${error.message}`));
-                });
-            }).catch(reject);
-        });
+    async executePythonScript(templatePath, data, outputPath, compression) {
+        try {
+            const result = await renderWorker.submit('fill', {
+                template_path: templatePath,
+                data: data,
+                output_path: outputPath,
+                stream: process.env.PPTX_STREAM_FILL === 'true',
+                compression: compression
+            });
+            console.log('PowerPoint generated successfully:', result.path);
+            return outputPath;
+        } catch (error) {
+            console.error('Python script error:', error.message);
+            throw new Error(`PowerPoint generation failed: ${error.message}`);
+        }
     }
 
     /**
      * Generate multiple quad charts in batch
+     * Jobs are spread over a pool of Python worker processes (batchRender.py).
+     * @param {Array} quadChartRecords - Records to render
+     * @param {Object} options - { workers, maxJobsPerWorker, onProgress(event), compression }
+     *                           compression defaults to 'archive': regenerated decks are kept in storage
+     * @returns {Promise<Array>} One { id, success, path | error } entry per record
      */
-    async generateBatch(quadChartRecords) {
-        const results = [];
+    async generateBatch(quadChartRecords, options = {}) {
+        await fs.mkdir(this.outputDir, { recursive: true });
 
-        for (const record of quadChartRecords) {
+        const results = new Map();
+        const jobs = [];
+
+        quadChartRecords.forEach((record, index) => {
             try {
-                const outputPath = await this.generateQuadChart(record);
-                results.push({
-                    id: record.id,
-                    success: true,
-                    path: outputPath
+                const { templatePath, mappedData, outputPath } = this.buildRenderJob(record);
+                jobs.push({
+                    id: index,
+                    type: 'fill',
+                    params: {
+                        template_path: templatePath,
+                        data: mappedData,
+                        output_path: outputPath,
+                        stream: process.env.PPTX_STREAM_FILL === 'true',
+                        compression: options.compression || 'archive'
+                    }
                 });
             } catch (error) {
-                results.push({
-                    id: record.id,
-                    success: false,
-                    error: error.message
-                });
+                results.set(index, { id: record.id, success: false, error: error.message });
+            }
+        });
+
+        let batchError = 'Render worker did not report a result';
+        if (jobs.length > 0) {
+            // A crashed batch still keeps the results reported before it stopped
+            const failure = await this.runBatchRenderer(jobs, options, (event) => {
+                const record = quadChartRecords[event.id];
+                if (!record) {
+                    return;
+                }
+                results.set(event.id, event.success
+                    ? { id: record.id, success: true, path: event.result.path }
+                    : { id: record.id, success: false, error: event.error });
+            });
+            if (failure) {
+                batchError = failure.message;
             }
         }
 
-        return results;
+        // Record generated paths on the database records
+        for (const [index, result] of results) {
+            const record = quadChartRecords[index];
+            if (result.success && record.update) {
+                try {
+                    await record.update({ generatedPptxPath: result.path });
+                } catch (error) {
+                    console.error('Error recording generated path:', error);
+                }
+            }
+        }
+
+        return quadChartRecords.map((record, index) => results.get(index) || {
+            id: record.id,
+            success: false,
+            error: batchError
+        });
+    }
+
+    /**
+     * Run jobs through batchRender.py, passing each progress event to callbacks
+     * Resolves with null on success or an Error if the batch process failed.
+     */
+    runBatchRenderer(jobs, options, onJob) {
+        const args = [this.batchScript, '-'];
+        if (options.workers) {
+            args.push('--workers', String(options.workers));
+        }
+        if (options.maxJobsPerWorker !== undefined) {
+            args.push('--max-jobs-per-worker', String(options.maxJobsPerWorker));
+        }
+
+        return new Promise((resolve) => {
+            const child = spawn(renderWorker.resolvePython(), args);
+            let errorOutput = '';
+
+            readline.createInterface({ input: child.stdout }).on('line', (line) => {
+                let event;
+                try {
+                    event = JSON.parse(line);
+                } catch (error) {
+                    return;
+                }
+                if (event.event === 'job') {
+                    onJob(event);
+                }
+                if (options.onProgress) {
+                    options.onProgress(event);
+                }
+            });
+
+            child.stderr.on('data', (data) => {
+                errorOutput += data.toString();
+            });
+
+            let startError = null;
+            child.on('error', (error) => {
+                startError = new Error(`Failed to start batch renderer: ${error.message}`);
+            });
+
+            child.on('close', (code) => {
+                if (startError) {
+                    resolve(startError);
+                } else if (code !== 0) {
+                    console.error('Batch renderer error:', errorOutput);
+                    resolve(new Error(`Batch renderer exited with code ${code}`));
+                } else {
+                    resolve(null);
+                }
+            });
+
+            child.stdin.on('error', () => {});
+            child.stdin.end(jobs.map(job => JSON.stringify(job)).join('\n') + '\n');
+        });
     }
 
     /**
      * Generate a preview image of the PowerPoint
+     * The filled slide is rasterized in the render worker (slidePreview.py) without
+     * LibreOffice; thumbnails are cached by render hash, so unchanged charts are a lookup.
+     * @param {Object} quadChartRecord - Record to preview
+     * @param {Object} options - { size: 'small' | 'medium' | 'large' (default 'medium'), slide }
+     * @returns {Promise<string>} URL of the PNG thumbnail
      */
-    async generatePreview(quadChartRecord) {
-        // This would use a library like unoconv or LibreOffice to convert
-        // the first slide to an image for preview purposes
-        // For now, return a placeholder
-        return '/api/placeholder/800/600';
+    async generatePreview(quadChartRecord, options = {}) {
+        const size = options.size || 'medium';
+        const { templatePath, mappedData } = this.buildRenderJob(quadChartRecord);
+
+        try {
+            const result = await renderWorker.submit('preview', {
+                template_path: templatePath,
+                data: mappedData,
+                slide: options.slide || 0,
+                sizes: [size]
+            });
+            return `/api/quad-chart-workflow/previews/${path.basename(result.thumbnails[size])}`;
+        } catch (error) {
+            console.error('Preview render error:', error.message);
+            throw new Error(`Preview generation failed: ${error.message}`);
+        }
     }
 
     /**
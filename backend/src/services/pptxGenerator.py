@@ -4,6 +4,7 @@ BD Bible PowerPoint Quad Chart Generator
 Generates professional quad charts with GMU branding
 """
 
+import io
 import json
 import sys
 import os
@@ -13,6 +14,12 @@ from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
 from datetime import datetime
+from templateCache import clone_presentation
+from jobTiming import JobTimer, count_shapes
+from jobIO import pop_option, print_result, read_job_data, save_output
+from pptxZip import compression_profile, save_presentation
+from mediaOptimizer import media_cache
+from textFit import fit_text
 
 # GMU Brand Colors
 GMU_GREEN = RGBColor(0, 102, 51)  # #006633
@@ -22,12 +29,120 @@ WHITE = RGBColor(255, 255, 255)
 BLACK = RGBColor(0, 0, 0)
 GRAY = RGBColor(128, 128, 128)
 
+LOGO_HEIGHT = Inches(0.5)
+
+# Quadrant body text is set at the largest size in this range that fits its box
+QUADRANT_FONT = 'Calibri'
+QUADRANT_MAX_PT = 12
+QUADRANT_MIN_PT = 7
+QUADRANT_SPACE_AFTER_PT = 3
+QUADRANT_HEADER_HEIGHT = Inches(0.35)
+QUADRANT_TEXT_MARGIN = Inches(0.05)
+
+QUADRANTS = [
+    ('Technical Approach', 'technical_approach', GMU_GREEN),
+    ('Management Approach', 'management_approach', GMU_GOLD),
+    ('Past Performance', 'past_performance', GMU_GOLD),
+    ('Cost/Schedule', 'cost_schedule', GMU_GREEN)
+]
+
+def new_presentation():
+    """Blank presentation sized for quad charts"""
+    prs = Presentation()
+    # Set slide size to standard (16:9)
+    prs.slide_width = Inches(10)
+    prs.slide_height = Inches(5.625)
+    return prs
+
+def quadrant_layout(slide_width, slide_height):
+    """
+    Position of each quadrant on a slide
+    Returns:
+        (quadrant width, quadrant height, [(title, data field, header color, left, top), ...])
+    """
+    margin = Inches(0.3)
+    gap = Inches(0.15)
+
+    # Accounting for title space
+    top_offset = Inches(1.0)
+    available_height = slide_height - top_offset - (margin * 2)
+    available_width = slide_width - (margin * 2)
+
+    quad_width = (available_width - gap) / 2
+    quad_height = (available_height - gap) / 2
+
+    positions = [
+        (margin, top_offset),
+        (margin + quad_width + gap, top_offset),
+        (margin, top_offset + quad_height + gap),
+        (margin + quad_width + gap, top_offset + quad_height + gap)
+    ]
+    quadrants = [
+        (title, field, color, left, top)
+        for (title, field, color), (left, top) in zip(QUADRANTS, positions)
+    ]
+    return quad_width, quad_height, quadrants
+
+def content_lines(content):
+    """Quadrant content (text or list) as the lines placed in its paragraphs"""
+    if isinstance(content, str):
+        lines = content.strip().split('\n') if content else []
+    elif isinstance(content, list):
+        lines = content
+    else:
+        lines = []
+
+    result = []
+    for line in lines:
+        line = str(line).strip()
+        # Bullet markers become paragraph levels rather than text
+        if line.startswith('•') or line.startswith('-'):
+            line = line[1:].strip()
+        result.append(line)
+    return result
+
+def fit_quadrant_text(lines, width, height):
+    """Largest quadrant font size for the lines; see textFit.fit_text for the result"""
+    # The content box is inset 0.1" in the quadrant and has 0.05" margins on every side
+    text_width = width - Inches(0.2) - 2 * QUADRANT_TEXT_MARGIN
+    text_height = height - QUADRANT_HEADER_HEIGHT - Inches(0.1) - 2 * QUADRANT_TEXT_MARGIN
+    return fit_text(
+        lines, text_width, text_height,
+        family=QUADRANT_FONT,
+        max_size=QUADRANT_MAX_PT,
+        min_size=QUADRANT_MIN_PT,
+        space_after=QUADRANT_SPACE_AFTER_PT
+    )
+
+def check_text_fit(data, slide_width=Inches(10), slide_height=Inches(5.625)):
+    """
+    Check whether each quadrant's content fits without rendering the chart
+    Returns:
+        {'success', 'fits', 'quadrants': {field: fit_text result}}
+    """
+    quad_width, quad_height, quadrants = quadrant_layout(slide_width, slide_height)
+    fits = {
+        field: fit_quadrant_text(content_lines(data.get(field, '')), quad_width, quad_height)
+        for _, field, _, _, _ in quadrants
+    }
+    return {
+        'success': True,
+        'fits': all(fit['fits'] for fit in fits.values()),
+        'quadrants': fits
+    }
+
 class QuadChartGenerator:
-    def __init__(self):
-        self.prs = Presentation()
-        # Set slide size to standard (16:9)
-        self.prs.slide_width = Inches(10)
-        self.prs.slide_height = Inches(5.625)
+    def __init__(self, prs=None, image_cache=None):
+        """
+        Initialize the generator
+        Args:
+            prs: Presentation to add slides to (defaults to a new blank one)
+            image_cache: Shared dict of logo path -> bytes, so batches read each logo once
+        """
+        self.prs = prs if prs is not None else new_presentation()
+        self.image_cache = image_cache if image_cache is not None else {}
+        # Titles of quadrants whose content overflowed on the last slide created
+        self.overflow = []
 
     def create_quad_chart(self, data):
         """Create a quad chart slide with the provided data"""
@@ -40,61 +155,13 @@ class QuadChartGenerator:
         # Add client/subtitle
         self.add_subtitle(slide, data.get('client', ''))
 
-        # Calculate quadrant dimensions
-        margin = Inches(0.3)
-        gap = Inches(0.15)
-
-        # Accounting for title space
-        top_offset = Inches(1.0)
-        available_height = self.prs.slide_height - top_offset - (margin * 2)
-        available_width = self.prs.slide_width - (margin * 2)
-
-        quad_width = (available_width - gap) / 2
-        quad_height = (available_height - gap) / 2
-
         # Create quadrants
-        quadrants = [
-            {
-                'title': 'Technical Approach',
-                'content': data.get('technical_approach', ''),
-                'left': margin,
-                'top': top_offset,
-                'color': GMU_GREEN
-            },
-            {
-                'title': 'Management Approach',
-                'content': data.get('management_approach', ''),
-                'left': margin + quad_width + gap,
-                'top': top_offset,
-                'color': GMU_GOLD
-            },
-            {
-                'title': 'Past Performance',
-                'content': data.get('past_performance', ''),
-                'left': margin,
-                'top': top_offset + quad_height + gap,
-                'color': GMU_GOLD
-            },
-            {
-                'title': 'Cost/Schedule',
-                'content': data.get('cost_schedule', ''),
-                'left': margin + quad_width + gap,
-                'top': top_offset + quad_height + gap,
-                'color': GMU_GREEN
-            }
-        ]
-
-        for quad in quadrants:
-            self.add_quadrant(
-                slide,
-                quad['title'],
-                quad['content'],
-                quad['left'],
-                quad['top'],
-                quad_width,
-                quad_height,
-                quad['color']
-            )
+        quad_width, quad_height, quadrants = quadrant_layout(self.prs.slide_width, self.prs.slide_height)
+        self.overflow = []
+        for title, field, color, left, top in quadrants:
+            fit = self.add_quadrant(slide, title, data.get(field, ''), left, top, quad_width, quad_height, color)
+            if not fit['fits']:
+                self.overflow.append(title)
 
         # Add logo placeholder if provided
         if data.get('logo_path'):
@@ -138,7 +205,7 @@ class QuadChartGenerator:
             p.alignment = PP_ALIGN.CENTER
 
     def add_quadrant(self, slide, title, content, left, top, width, height, header_color):
-        """Add a quadrant with header and content"""
+        """Add a quadrant with header and content; returns the text fit of the content"""
         # Create quadrant container (border)
         border = slide.shapes.add_shape(
             MSO_SHAPE.RECTANGLE,
@@ -150,7 +217,7 @@ class QuadChartGenerator:
         border.line.width = Pt(0.5)
 
         # Add header bar
-        header_height = Inches(0.35)
+        header_height = QUADRANT_HEADER_HEIGHT
         header = slide.shapes.add_shape(
             MSO_SHAPE.RECTANGLE,
             left, top, width, header_height
@@ -190,55 +257,42 @@ class QuadChartGenerator:
 
         text_frame = content_box.text_frame
         text_frame.clear()
-        text_frame.margin_left = Inches(0.05)
-        text_frame.margin_right = Inches(0.05)
-        text_frame.margin_top = Inches(0.05)
-        text_frame.margin_bottom = Inches(0.05)
+        text_frame.margin_left = QUADRANT_TEXT_MARGIN
+        text_frame.margin_right = QUADRANT_TEXT_MARGIN
+        text_frame.margin_top = QUADRANT_TEXT_MARGIN
+        text_frame.margin_bottom = QUADRANT_TEXT_MARGIN
         text_frame.word_wrap = True
 
-        # Process content (support bullet points)
-        if isinstance(content, str):
-            lines = content.strip().split('\n') if content else []
-        elif isinstance(content, list):
-            lines = content
-        else:
-            lines = []
+        # Process content (bullet markers are stripped) and size it to the box
+        lines = content_lines(content)
+        fit = fit_quadrant_text(lines, width, height)
 
         for i, line in enumerate(lines):
-            p = text_frame.add_paragraph()
-            line = line.strip()
-
-            # Check if line should be a bullet point
-            if line.startswith('•') or line.startswith('-'):
-                p.text = line[1:].strip()
-                p.level = 0
-                p.font.size = Pt(10)
-            else:
-                p.text = line
-                p.font.size = Pt(10)
-
-            p.font.name = 'Calibri'
+            # clear() leaves one empty paragraph; use it for the first line
+            p = text_frame.paragraphs[0] if i == 0 else text_frame.add_paragraph()
+            p.text = line
+            p.font.size = Pt(fit['size'])
+            p.font.name = QUADRANT_FONT
             p.font.color.rgb = BLACK
-            p.space_after = Pt(3)
+            p.space_after = Pt(QUADRANT_SPACE_AFTER_PT)
 
-            # Remove extra spacing from first paragraph
-            if i == 0 and text_frame.paragraphs[0].text == '':
-                text_frame.paragraphs[0].text = p.text
-                text_frame.paragraphs[0].font.name = p.font.name
-                text_frame.paragraphs[0].font.size = p.font.size
-                text_frame.paragraphs[0].font.color.rgb = p.font.color.rgb
-                text_frame.paragraphs.pop()
+        return fit
 
     def add_logo(self, slide, logo_path):
         """Add company logo to the slide"""
         if os.path.exists(logo_path):
             try:
+                image = self.image_cache.get(logo_path)
+                if image is None:
+                    # Downsampled to the displayed height; cached by content hash
+                    image = self.image_cache[logo_path] = media_cache.optimize_file(logo_path, (0, LOGO_HEIGHT))
+
                 # Add logo in top-right corner
                 slide.shapes.add_picture(
-                    logo_path,
+                    io.BytesIO(image),
                     self.prs.slide_width - Inches(1.5),
                     Inches(0.1),
-                    height=Inches(0.5)
+                    height=LOGO_HEIGHT
                 )
             except Exception as e:
                 print(f"Warning: Could not add logo: {e}", file=sys.stderr)
@@ -263,40 +317,206 @@ class QuadChartGenerator:
         p.font.color.rgb = GRAY
         p.alignment = PP_ALIGN.CENTER
 
-    def save(self, output_path):
-        """Save the presentation to file"""
-        self.prs.save(output_path)
+    def save(self, output_path, compression=None):
+        """Save the presentation to a file path or binary stream with a compression profile"""
+        save_presentation(self.prs, output_path, compression)
         return output_path
 
+def generate_quad_chart(data, output_path=None, compression=None):
+    """Generate a single quad chart and return the result dict printed by the CLI"""
+    compression = compression_profile(compression)[0]
+
+    # Determine output path
+    if not output_path:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_path = f"/tmp/quad_chart_{timestamp}.pptx"
+
+    timer = JobTimer('quad_chart')
+
+    # Generate the quad chart
+    with timer.phase('load'):
+        generator = QuadChartGenerator()
+    with timer.phase('fill'):
+        generator.create_quad_chart(data)
+    with timer.phase('save'):
+        saved_path, bytes_written = save_output(lambda target: generator.save(target, compression), output_path)
+
+    result = {
+        'success': True,
+        'path': saved_path,
+        'message': 'Quad chart generated successfully',
+        'overflow': generator.overflow
+    }
+    result.update(timer.finish(
+        compression=compression,
+        shape_count=count_shapes(generator.prs),
+        bytes_written=bytes_written
+    ))
+    return result
+
+def remove_slide(prs, index):
+    """Drop a slide (e.g. one left half-built by a failed record) from a presentation"""
+    slide_ids = prs.slides._sldIdLst
+    slide_id = slide_ids[index]
+    prs.part.drop_rel(slide_id.rId)
+    slide_ids.remove(slide_id)
+
+def read_records(source):
+    """
+    Yield chart records from a JSON array or JSONL (one record per line)
+    Args:
+        source: Readable text stream
+    """
+    first = source.read(1)
+    while first and first.isspace():
+        first = source.read(1)
+
+    if first == '[':
+        yield from json.loads(first + source.read())
+        return
+
+    pending = first
+    for line_number, line in enumerate(source, 1):
+        line = (pending + line).strip()
+        pending = ''
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'Invalid JSON on line {line_number}: {e}')
+    if pending.strip():
+        yield json.loads(pending)
+
+def generate_quad_chart_batch(records, output_path=None, output_dir=None, combined=True, compression=None):
+    """
+    Generate many quad charts in one process from one loaded presentation
+    Args:
+        records: Iterable of chart data dicts (same fields as generate_quad_chart)
+        output_path: Deck path when combined (defaults to a timestamped file in /tmp)
+        output_dir: Directory for per-chart files when not combined
+        combined: True for one deck with a slide per record, False for one file per record
+        compression: Compression profile for the saved files
+    Returns:
+        Result dict with per-record results; a failing record does not stop the batch
+    """
+    compression = compression_profile(compression)[0]
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    timer = JobTimer('quad_chart_batch')
+    with timer.phase('load'):
+        base = new_presentation()
+    image_cache = {}
+    results = []
+    shape_count = 0
+    bytes_written = 0
+
+    if combined:
+        if not output_path:
+            output_path = f"/tmp/quad_chart_deck_{timestamp}.pptx"
+        generator = QuadChartGenerator(base, image_cache)
+    else:
+        output_dir = output_dir or f"/tmp/quad_charts_{timestamp}"
+        os.makedirs(output_dir, exist_ok=True)
+
+    for index, data in enumerate(records):
+        record_id = data.get('id', index) if isinstance(data, dict) else index
+        try:
+            if not isinstance(data, dict):
+                raise ValueError('Chart record must be a JSON object')
+
+            if combined:
+                slide_count = len(generator.prs.slides)
+                try:
+                    with timer.phase('fill'):
+                        slide = generator.create_quad_chart(data)
+                    shape_count += len(slide.shapes)
+                except Exception:
+                    # Keep the deck clean: drop the partly built slide
+                    if len(generator.prs.slides) > slide_count:
+                        remove_slide(generator.prs, -1)
+                    raise
+                results.append({'id': record_id, 'success': True, 'slide': len(generator.prs.slides) - 1,
+                                'overflow': generator.overflow})
+            else:
+                # Each file starts from a copy of the already-loaded blank deck
+                with timer.phase('fill'):
+                    chart = QuadChartGenerator(clone_presentation(base), image_cache)
+                    slide = chart.create_quad_chart(data)
+                shape_count += len(slide.shapes)
+                path = data.get('output_path') or os.path.join(output_dir, f"quad_chart_{record_id}.pptx")
+                with timer.phase('save'):
+                    path = chart.save(path, compression)
+                bytes_written += os.path.getsize(path)
+                results.append({'id': record_id, 'success': True, 'path': path, 'overflow': chart.overflow})
+        except Exception as e:
+            results.append({'id': record_id, 'success': False, 'error': str(e)})
+
+    generated = sum(1 for r in results if r['success'])
+    result = {
+        'success': generated > 0 or not results,
+        'combined': combined,
+        'generated': generated,
+        'failed': len(results) - generated,
+        'results': results,
+        'message': f'{generated} of {len(results)} quad charts generated'
+    }
+
+    if combined:
+        with timer.phase('save'):
+            result['path'] = generator.save(output_path, compression)
+        result.update(timer.finish(result['path'], compression, shape_count=shape_count))
+    else:
+        result['output_dir'] = output_dir
+        result.update(timer.finish(compression=compression, shape_count=shape_count, bytes_written=bytes_written))
+    return result
+
+def main_batch(args, compression=None):
+    """
+    Batch mode: python pptxGenerator.py --batch <records.json|records.jsonl|-> [output] [--files]
+    Without --files, output is the combined deck path; with it, the directory for per-chart files.
+    """
+    combined = '--files' not in args
+    args = [arg for arg in args if arg != '--files']
+    if not args:
+        print("Usage: python pptxGenerator.py --batch <records.json|records.jsonl|-> [output] [--files]",
+              file=sys.stderr)
+        sys.exit(1)
+
+    source, output = args[0], (args[1] if len(args) > 1 else None)
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        records = read_records(stream)
+        if combined:
+            result = generate_quad_chart_batch(records, output_path=output, compression=compression)
+        else:
+            result = generate_quad_chart_batch(records, output_dir=output, combined=False,
+                                               compression=compression)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(json.dumps(result))
+
 def main():
     """Main function to handle command-line execution"""
+    compression = pop_option(sys.argv, 'compression')
     if len(sys.argv) < 2:
-        print("Usage: python pptxGenerator.py <json_data> [output_path]", file=sys.stderr)
+        print("Usage: python pptxGenerator.py <json_data|-|fd:N> [output_path|-] [--compression=fast|default|archive]",
+              file=sys.stderr)
+        print("       python pptxGenerator.py --batch <records.json|records.jsonl|-> [output] [--files]",
+              file=sys.stderr)
         sys.exit(1)
 
     try:
-        # Parse input JSON
-        json_data = json.loads(sys.argv[1])
+        if sys.argv[1] == '--batch':
+            main_batch(sys.argv[2:], compression)
+            return
 
-        # Determine output path
-        if len(sys.argv) > 2:
-            output_path = sys.argv[2]
-        else:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_path = f"/tmp/quad_chart_{timestamp}.pptx"
+        # Parse input JSON (inline, '-' for stdin or 'fd:N')
+        json_data = read_job_data(sys.argv[1])
+        output_path = sys.argv[2] if len(sys.argv) > 2 else None
 
-        # Generate the quad chart
-        generator = QuadChartGenerator()
-        generator.create_quad_chart(json_data)
-        saved_path = generator.save(output_path)
-
-        # Return the path as JSON
-        result = {
-            'success': True,
-            'path': saved_path,
-            'message': 'Quad chart generated successfully'
-        }
-        print(json.dumps(result))
+        # Return the path as JSON ('-' writes the file to stdout and the JSON to stderr)
+        result = generate_quad_chart(json_data, output_path, compression)
+        print_result(result, output_path)
 
     except json.JSONDecodeError as e:
         error = {
@@ -1,13 +1,9 @@
-const { spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
+const renderWorker = require('./renderWorker');
 
 class PPTXService {
   constructor() {
-    // Path to Python virtual environment
-    this.pythonPath = path.join(__dirname, '../../venv/bin/python');
-    // Path to the Python PPTX generator script
-    this.scriptPath = path.join(__dirname, './pptxGenerator.py');
     // Output directory for generated files
     this.outputDir = path.join(__dirname, '../../data/generated_pptx');
 
@@ -21,91 +17,127 @@ class PPTXService {
     }
   }
 
+  /**
+   * Map stored chart fields to the generator's input
+   * @param {Object} chartData - The quad chart data
+   * @returns {Object} Data for the Python generator
+   */
+  buildChartData(chartData) {
+    return {
+      title: chartData.title || 'Quad Chart',
+      client: chartData.client || '',
+      technical_approach: chartData.technical_approach || '',
+      management_approach: chartData.management_approach || '',
+      past_performance: chartData.past_performance || '',
+      cost_schedule: chartData.cost_schedule || '',
+      footer: `${chartData.client || 'BD Bible'} - Generated ${new Date().toLocaleDateString()}`,
+      logo_path: chartData.logo_path || null
+    };
+  }
+
   /**
    * Generate a PPTX quad chart
    * @param {Object} chartData - The quad chart data
    * @returns {Promise<Object>} Result with file path
    */
-  generateQuadChart(chartData) {
-    return new Promise((resolve, reject) => {
-      // Generate unique filename
-      const timestamp = Date.now();
-      const filename = `quad_chart_${chartData.id || timestamp}.pptx`;
-      const outputPath = path.join(this.outputDir, filename);
-
-      // Prepare data for Python script
-      const jsonData = JSON.stringify({
-        title: chartData.title || 'Quad Chart',
-        client: chartData.client || '',
-        technical_approach: chartData.technical_approach || '',
-        management_approach: chartData.management_approach || '',
-        past_performance: chartData.past_performance || '',
-        cost_schedule: chartData.cost_schedule || '',
-        footer: `${chartData.client || 'BD Bible'} - Generated ${new Date().toLocaleDateString()}`,
-        logo_path: chartData.logo_path || null
+  async generateQuadChart(chartData) {
+    // Generate unique filename
+    const timestamp = Date.now();
+    const filename = `quad_chart_${chartData.id || timestamp}.pptx`;
+    const outputPath = path.join(this.outputDir, filename);
+
+    // Prepare data for Python script
+    const data = this.buildChartData(chartData);
+
+    let result;
+    try {
+      // Render in the persistent Python worker
+      result = await renderWorker.submit('quad_chart', {
+        data: data,
+        output_path: outputPath
       });
+    } catch (error) {
+      console.error('Python process error:', error.message);
+      throw new Error(`PPTX generation failed: ${error.message}`);
+    }
 
-      // Spawn Python process
-      const pythonProcess = spawn(this.pythonPath, [
-        this.scriptPath,
-        jsonData,
-        outputPath
-      ]);
+    if (!result.success) {
+      throw new Error(result.error || 'PPTX generation failed');
+    }
 
-      let stdout = '';
-      let stderr = '';
+    return {
+      success: true,
+      path: result.path,
+      filename: filename,
+      url: `/api/quad-charts/download/${filename}`,
+      overflow: result.overflow || []
+    };
+  }
 
-      // Capture stdout
-      pythonProcess.stdout.on('data', (data) => {
-        stdout += data.toString();
+  /**
+   * Check whether each quadrant's content fits its box, without rendering
+   * Cheap enough to call from the editor as the user types.
+   * @param {Object} chartData - The quad chart data
+   * @returns {Promise<Object>} { fits, quadrants: { field: { size, fits, lines, overflow, ... } } }
+   */
+  async checkTextFit(chartData) {
+    try {
+      const result = await renderWorker.submit('text_fit', {
+        data: this.buildChartData(chartData)
       });
+      return { fits: result.fits, quadrants: result.quadrants };
+    } catch (error) {
+      console.error('Python process error:', error.message);
+      throw new Error(`Text fit check failed: ${error.message}`);
+    }
+  }
 
-      // Capture stderr
-      pythonProcess.stderr.on('data', (data) => {
-        stderr += data.toString();
-      });
+  /**
+   * Generate many quad charts in one worker job
+   * @param {Array} charts - Quad chart data records
+   * @param {Object} options - { combined: true } for one deck with a slide per chart,
+   *                           false for one file per chart
+   * @returns {Promise<Object>} Batch result with per-chart results
+   */
+  async generateQuadChartBatch(charts, { combined = true } = {}) {
+    const timestamp = Date.now();
+    const records = charts.map((chart, index) => {
+      const record = { ...this.buildChartData(chart), id: chart.id || index };
+      if (!combined) {
+        record.output_path = path.join(this.outputDir, `quad_chart_${chart.id || `${timestamp}_${index}`}.pptx`);
+      }
+      return record;
+    });
 
-      // Handle process completion
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          console.error('Python process error:', stderr);
-          reject(new Error(`PPTX generation failed: ${stderr}`));
-        } else {
-          try {
-            // Parse Python output
-            const result = JSON.parse(stdout);
-            if (result.success) {
-              resolve({
-                success: true,
-                path: result.path,
-                filename: filename,
-                url: `/api/quad-charts/download/${filename}`
-              });
-            } else {
-              reject(new Error(result.error || 'PPTX generation failed'));
-            }
-          } catch (parseError) {
-            // If output isn't JSON, still try to check if file was created
-            if (fs.existsSync(outputPath)) {
-              resolve({
-                success: true,
-                path: outputPath,
-                filename: filename,
-                url: `/api/quad-charts/download/${filename}`
-              });
-            } else {
-              reject(new Error('Failed to parse Python output: ' + stdout));
-            }
-          }
-        }
-      });
+    const filename = `quad_chart_deck_${timestamp}.pptx`;
 
-      // Handle process errors
-      pythonProcess.on('error', (error) => {
-        console.error('Failed to start Python process:', error);
-        reject(new Error(`Failed to start Python process: ${error.message}`));
+    let result;
+    try {
+      result = await renderWorker.submit('quad_chart_batch', {
+        records: records,
+        combined: combined,
+        output_path: combined ? path.join(this.outputDir, filename) : null,
+        output_dir: this.outputDir
       });
-    });
+    } catch (error) {
+      console.error('Python process error:', error.message);
+      throw new Error(`PPTX batch generation failed: ${error.message}`);
+    }
+
+    if (!result.success) {
+      throw new Error(result.error || 'PPTX batch generation failed');
+    }
+
+    const withUrl = (filePath) => `/api/quad-charts/download/${path.basename(filePath)}`;
+    return {
+      success: true,
+      generated: result.generated,
+      failed: result.failed,
+      results: result.results.map(item => (
+        item.path ? { ...item, filename: path.basename(item.path), url: withUrl(item.path) } : item
+      )),
+      ...(combined && { path: result.path, filename: filename, url: withUrl(result.path) })
+    };
   }
 
   /**
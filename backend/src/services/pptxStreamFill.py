@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Streaming template fill on the raw package
+Fast path for high-volume fills: only slide XML parts are parsed and
+rewritten; every other zip member (media, layouts, masters, theme) is copied
+into the output byte-for-byte without being decompressed or recompressed.
+Text replacement uses the same engine as QuadChartFiller/TemplateReplicator,
+so the filled content matches the python-pptx object-model path.
+"""
+
+import os
+import sys
+import posixpath
+import json
+import zipfile
+from contextlib import nullcontext
+from datetime import datetime
+from lxml import etree
+
+from fillPlan import REPLICATOR_PATTERN
+from pptxZip import RawZipWriter, compression_profile
+from textReplace import A_NS, literal_replacer, replace_in_paragraph
+from quadChartFiller import QuadChartFiller
+from jobTiming import JobTimer
+from jobIO import is_stdout, is_stream, pop_option, print_result, read_job_data
+
+PACKAGE_RELS_PART = '_rels/.rels'
+RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+P_NS = 'http://schemas.openxmlformats.org/presentationml/2006/main'
+OFFICE_DOCUMENT_REL = f'{R_NS}/officeDocument'
+P_TAG = f'{{{A_NS}}}p'
+
+
+def rels_part_name(part_name):
+    """Name of the relationships part belonging to part_name"""
+    directory, _, filename = part_name.rpartition('/')
+    return posixpath.join(directory, '_rels', f'{filename}.rels')
+
+
+def read_rels(source, part_name):
+    """Map relationship id -> (type, absolute target part name) for a part"""
+    root = etree.fromstring(source.read(rels_part_name(part_name)))
+    base = posixpath.dirname(part_name)
+    rels = {}
+    for rel in root.iter(f'{{{RELS_NS}}}Relationship'):
+        if rel.get('TargetMode') == 'External':
+            continue
+        target = rel.get('Target')
+        if target.startswith('/'):
+            target = target.lstrip('/')
+        else:
+            target = posixpath.normpath(posixpath.join(base, target))
+        rels[rel.get('Id')] = (rel.get('Type'), target)
+    return rels
+
+
+def presentation_part_name(source):
+    """Name of the main presentation part, found through the package relationships"""
+    package_rels = etree.fromstring(source.read(PACKAGE_RELS_PART))
+    for rel in package_rels.iter(f'{{{RELS_NS}}}Relationship'):
+        if rel.get('Type') == OFFICE_DOCUMENT_REL:
+            return rel.get('Target').lstrip('/')
+    raise ValueError('Package has no presentation part')
+
+
+def slide_order(source):
+    """
+    Map slide part name -> slide index, in presentation order
+    Follows the package relationships to the presentation part and reads its
+    slide id list, the same slides python-pptx exposes as presentation.slides.
+    """
+    presentation_part = presentation_part_name(source)
+    rels = read_rels(source, presentation_part)
+    presentation = etree.fromstring(source.read(presentation_part))
+    order = {}
+    for slide_id in presentation.iter(f'{{{P_NS}}}sldId'):
+        _, target = rels[slide_id.get(f'{{{R_NS}}}id')]
+        order[target] = len(order)
+    return order
+
+
+def fill_slide_xml(stream, pattern, substitute):
+    """
+    Stream-parse one slide part and replace placeholders paragraph by paragraph
+    Returns (serialized XML, replacement count); XML is None when nothing changed.
+    """
+    count = 0
+    context = etree.iterparse(stream, events=('end',), tag=P_TAG)
+    for _, paragraph in context:
+        count += replace_in_paragraph(paragraph, pattern, substitute)
+
+    if not count:
+        return None, 0
+
+    xml = etree.tostring(context.root, xml_declaration=True, encoding='UTF-8', standalone=True)
+    return xml, count
+
+
+def build_replacer(data, mode):
+    """
+    Return (pattern, substitute, values) for filler ('fill') or replicator ('replicate') data
+    substitute returns None for {{NAME}} placeholders that have no data, leaving them in place.
+    """
+    if mode == 'replicate':
+        values = {}
+        for placeholder, value in data.items():
+            # Multi-line values arrive as lists
+            if isinstance(value, list):
+                value = '\n'.join(value)
+            values[placeholder] = value
+
+        def substitute(match):
+            name = match.group(1)
+            return str(values[name]) if name in values else None
+
+        return REPLICATOR_PATTERN, substitute, values
+
+    values = {placeholder: QuadChartFiller.format_value(value) for placeholder, value in data.items()}
+    pattern, substitute = literal_replacer(values)
+    return pattern, substitute, values
+
+
+def stream_fill(template_path, data, output_path=None, mode='fill', compression=None):
+    """
+    Fill a template without loading it into the python-pptx object model
+    Args:
+        template_path: Source .pptx
+        data: Placeholder mapping (literal keys for 'fill', {{NAME}} names for 'replicate')
+        output_path: Destination .pptx path (defaults to a timestamped file in /tmp;
+                     '-' streams the package to stdout as it is written, and a
+                     writable binary stream receives it the same way)
+        mode: 'fill' (QuadChartFiller semantics) or 'replicate' (TemplateReplicator semantics)
+        compression: Compression profile for rewritten slide parts; other members
+                     are copied raw and keep their original compression
+    Returns:
+        Result dict with the output path and the replacements made
+    """
+    if mode not in ('fill', 'replicate'):
+        raise ValueError(f"Unknown fill mode: {mode}")
+    if not os.path.exists(template_path):
+        raise FileNotFoundError(f"Template not found: {template_path}")
+
+    if not output_path:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_path = f"/tmp/generated_{timestamp}.pptx"
+
+    compression, settings = compression_profile(compression)
+    timer = JobTimer(f'stream_{mode}')
+    pattern, substitute, values = build_replacer(data, mode)
+
+    to_stream = is_stdout(output_path) or is_stream(output_path)
+    output_dir = None if to_stream else os.path.dirname(str(output_path))
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    replacement_count = 0
+    replacements_made = []
+    slides_rewritten = 0
+    members_copied = 0
+
+    if is_stream(output_path):
+        output = nullcontext(output_path)
+    else:
+        output = nullcontext(sys.stdout.buffer) if to_stream else open(output_path, 'wb')
+    with zipfile.ZipFile(template_path) as source, output as out:
+        with timer.phase('load'):
+            slides = slide_order(source)
+        writer = RawZipWriter(out)
+
+        for info in source.infolist():
+            slide_idx = slides.get(info.filename)
+            if slide_idx is not None:
+                names = []
+
+                def record(match):
+                    replacement = substitute(match)
+                    if replacement is not None:
+                        names.append(match.group(match.lastindex or 0))
+                    return replacement
+
+                with timer.phase('fill'), source.open(info) as stream:
+                    xml, count = fill_slide_xml(stream, pattern, record)
+
+                if xml is not None:
+                    with timer.phase('save'):
+                        writer.write_bytes(info.filename, xml, settings['level'],
+                                           info.date_time, info.external_attr)
+                    replacement_count += count
+                    slides_rewritten += 1
+                    for name in dict.fromkeys(names):
+                        replacements_made.append({
+                            'slide': slide_idx,
+                            'placeholder': name,
+                            'replaced_with': values[name]
+                        })
+                    continue
+
+            with timer.phase('save'):
+                writer.copy_raw(source, info)
+            members_copied += 1
+
+        with timer.phase('save'):
+            writer.close()
+            out.flush()
+
+    result = {
+        'success': True,
+        'path': None if to_stream else str(output_path),
+        'mode': mode,
+        'stream': True,
+        'replacement_count': replacement_count,
+        'replacements_made': replacements_made,
+        'slides_rewritten': slides_rewritten,
+        'members_copied': members_copied,
+        'message': f'Template filled by streaming. {replacement_count} replacements made.'
+    }
+    result.update(timer.finish(compression=compression, bytes_written=writer.offset))
+    return result
+
+
+def main():
+    """Main function for command-line execution"""
+    compression = pop_option(sys.argv, 'compression')
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    mode = 'replicate' if '--replicate' in sys.argv else 'fill'
+
+    if len(args) < 2:
+        print("Usage: python pptxStreamFill.py <template_path> <json_data|-|fd:N> [output_path|-] [--replicate]",
+              file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        data = read_job_data(args[1])
+        output_path = args[2] if len(args) > 2 else None
+
+        result = stream_fill(args[0], data, output_path, mode, compression)
+        print_result(result, output_path)
+
+    except json.JSONDecodeError as e:
+        print(json.dumps({'success': False, 'error': f'Invalid JSON data: {str(e)}'}), file=sys.stderr)
+        sys.exit(1)
+
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
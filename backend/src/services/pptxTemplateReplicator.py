@@ -14,6 +14,12 @@ from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
 from datetime import datetime
 import traceback
+from templateCache import template_cache
+from fillPlan import REPLICATOR_PATTERN, get_fill_plan
+from textReplace import literal_replacer, replace_in_paragraph
+from jobTiming import JobTimer, count_shapes
+from jobIO import pop_option, print_result, read_job_data, save_output
+from pptxZip import compression_profile, save_presentation
 
 class TemplateReplicator:
     def __init__(self, template_path):
@@ -27,11 +33,12 @@ class TemplateReplicator:
 
         self.template_path = template_path
         self.presentation = None
+        self.template_hash = None
         self.placeholders_found = []
 
     def load_template(self):
-        """Load the PowerPoint template"""
-        self.presentation = Presentation(self.template_path)
+        """Load the PowerPoint template (a private copy from the template cache)"""
+        self.template_hash, self.presentation = template_cache.load_with_hash(self.template_path)
         return self
 
     def find_placeholders(self):
@@ -40,137 +47,35 @@ class TemplateReplicator:
         Looks for patterns like {{PLACEHOLDER_NAME}}
         """
         self.placeholders_found = []
-        placeholder_pattern = re.compile(r'\{\{([A-Z_0-9]+)\}\}')
 
         for slide_idx, slide in enumerate(self.presentation.slides):
-            # Check all shapes in the slide
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    matches = placeholder_pattern.findall(shape.text)
-                    for match in matches:
-                        self.placeholders_found.append({
-                            'slide': slide_idx,
-                            'shape': shape.name,
-                            'placeholder': match,
-                            'full_pattern': f'{{{{{match}}}}}'
-                        })
-
-                # Check table cells if shape is a table
-                if shape.has_table:
-                    for row in shape.table.rows:
-                        for cell in row.cells:
-                            matches = placeholder_pattern.findall(cell.text)
-                            for match in matches:
-                                self.placeholders_found.append({
-                                    'slide': slide_idx,
-                                    'shape': shape.name,
-                                    'placeholder': match,
-                                    'full_pattern': f'{{{{{match}}}}}',
-                                    'is_table': True
-                                })
+            self.placeholders_found.extend(find_slide_placeholders(slide, slide_idx))
 
         return self.placeholders_found
 
     def replace_text_preserve_format(self, shape, old_text, new_text):
         """
         Replace text while preserving all formatting
-        This maintains font, size, color, bold, italic, etc.
+        Placeholders may span several runs; each run keeps its own formatting.
         """
-        if not hasattr(shape, 'text_frame'):
+        if not getattr(shape, 'has_text_frame', False):
             return False
 
-        text_frame = shape.text_frame
-
-        # Process each paragraph
-        for paragraph in text_frame.paragraphs:
-            # Check if this paragraph contains our placeholder
-            if old_text in paragraph.text:
-                # Store original formatting from first run
-                original_format = None
-                if paragraph.runs:
-                    first_run = paragraph.runs[0]
-                    original_format = {
-                        'font_name': first_run.font.name,
-                        'font_size': first_run.font.size,
-                        'bold': first_run.font.bold,
-                        'italic': first_run.font.italic,
-                        'underline': first_run.font.underline,
-                        'color': first_run.font.color.rgb if first_run.font.color.type == 1 else None
-                    }
-
-                # Replace the text
-                full_text = paragraph.text
-                new_full_text = full_text.replace(old_text, new_text)
-
-                # Clear runs and recreate with formatting
-                paragraph.clear()
-                run = paragraph.add_run()
-                run.text = new_full_text
-
-                # Restore formatting if we had it
-                if original_format:
-                    if original_format['font_name']:
-                        run.font.name = original_format['font_name']
-                    if original_format['font_size']:
-                        run.font.size = original_format['font_size']
-                    if original_format['bold'] is not None:
-                        run.font.bold = original_format['bold']
-                    if original_format['italic'] is not None:
-                        run.font.italic = original_format['italic']
-                    if original_format['underline'] is not None:
-                        run.font.underline = original_format['underline']
-                    if original_format['color']:
-                        run.font.color.rgb = original_format['color']
-
-                return True
-
-        return False
+        pattern, substitute = literal_replacer({old_text: new_text})
+        replaced = False
+        for paragraph in shape.text_frame.paragraphs:
+            if replace_in_paragraph(paragraph._p, pattern, substitute):
+                replaced = True
+
+        return replaced
 
     def replace_in_table(self, table, old_text, new_text):
         """Replace text in table cells while preserving formatting"""
+        pattern, substitute = literal_replacer({old_text: new_text})
         for row in table.rows:
             for cell in row.cells:
-                if old_text in cell.text:
-                    # Store the original formatting
-                    text_frame = cell.text_frame
-                    for paragraph in text_frame.paragraphs:
-                        if old_text in paragraph.text:
-                            # Preserve paragraph alignment
-                            alignment = paragraph.alignment
-
-                            # Store run formatting
-                            original_format = None
-                            if paragraph.runs:
-                                first_run = paragraph.runs[0]
-                                original_format = {
-                                    'font_name': first_run.font.name,
-                                    'font_size': first_run.font.size,
-                                    'bold': first_run.font.bold,
-                                    'italic': first_run.font.italic,
-                                    'color': first_run.font.color.rgb if first_run.font.color.type == 1 else None
-                                }
-
-                            # Replace text
-                            new_paragraph_text = paragraph.text.replace(old_text, new_text)
-                            paragraph.clear()
-                            run = paragraph.add_run()
-                            run.text = new_paragraph_text
-
-                            # Restore formatting
-                            if original_format:
-                                if original_format['font_name']:
-                                    run.font.name = original_format['font_name']
-                                if original_format['font_size']:
-                                    run.font.size = original_format['font_size']
-                                if original_format['bold'] is not None:
-                                    run.font.bold = original_format['bold']
-                                if original_format['italic'] is not None:
-                                    run.font.italic = original_format['italic']
-                                if original_format['color']:
-                                    run.font.color.rgb = original_format['color']
-
-                            # Restore alignment
-                            paragraph.alignment = alignment
+                for paragraph in cell.text_frame.paragraphs:
+                    replace_in_paragraph(paragraph._p, pattern, substitute)
 
     def replace_placeholders(self, data_dict):
         """
@@ -182,51 +87,46 @@ class TemplateReplicator:
         if not self.presentation:
             self.load_template()
 
-        replacements_made = []
+        values = {}
+        for placeholder, value in data_dict.items():
+            # Handle multi-line values (convert \n to actual line breaks)
+            if isinstance(value, list):
+                value = '\n'.join(value)
+            values[placeholder] = value
 
-        for slide_idx, slide in enumerate(self.presentation.slides):
-            # Process all shapes
-            for shape in slide.shapes:
-                # Handle text in shapes
-                if hasattr(shape, "text"):
-                    for placeholder, value in data_dict.items():
-                        full_placeholder = f'{{{{{placeholder}}}}}'
-                        if full_placeholder in shape.text:
-                            # Handle multi-line values (convert \n to actual line breaks)
-                            if isinstance(value, list):
-                                value = '\n'.join(value)
-
-                            success = self.replace_text_preserve_format(
-                                shape, full_placeholder, str(value)
-                            )
-                            if success:
-                                replacements_made.append({
-                                    'slide': slide_idx,
-                                    'placeholder': placeholder,
-                                    'replaced_with': value
-                                })
-
-                # Handle tables
-                if shape.has_table:
-                    for placeholder, value in data_dict.items():
-                        full_placeholder = f'{{{{{placeholder}}}}}'
-                        # Check if placeholder exists in table
-                        table_text = ''
-                        for row in shape.table.rows:
-                            for cell in row.cells:
-                                table_text += cell.text
-
-                        if full_placeholder in table_text:
-                            if isinstance(value, list):
-                                value = '\n'.join(value)
-
-                            self.replace_in_table(shape.table, full_placeholder, str(value))
-                            replacements_made.append({
-                                'slide': slide_idx,
-                                'placeholder': placeholder,
-                                'replaced_with': value,
-                                'in_table': True
-                            })
+        def substitute(match):
+            name = match.group(1)
+            # Leave placeholders without data in place
+            return str(values[name]) if name in values else None
+
+        # Only the paragraphs recorded in the template's fill plan can contain placeholders
+        plan = get_fill_plan(self.template_hash, self.presentation, REPLICATOR_PATTERN)
+
+        replacements_made = []
+        reported = set()
+
+        for entry, _, paragraph in plan.locate(self.presentation):
+            names = [m.group(1) for m in REPLICATOR_PATTERN.finditer(paragraph.text) if m.group(1) in values]
+            if not names:
+                continue
+
+            replace_in_paragraph(paragraph._p, REPLICATOR_PATTERN, substitute)
+
+            # Report each placeholder once per shape
+            for name in dict.fromkeys(names):
+                report_key = (entry.slide, entry.shape_path, name)
+                if report_key in reported:
+                    continue
+                reported.add(report_key)
+
+                replacement = {
+                    'slide': entry.slide,
+                    'placeholder': name,
+                    'replaced_with': values[name]
+                }
+                if entry.cell:
+                    replacement['in_table'] = True
+                replacements_made.append(replacement)
 
         return replacements_made
 
@@ -242,101 +142,156 @@ class TemplateReplicator:
             processed.append(line)
         return '\n'.join(processed)
 
-    def save(self, output_path):
+    def save(self, output_path, compression=None):
         """
         Save the modified presentation
         Args:
-            output_path: Where to save the new PPTX file
+            output_path: Where to save the new PPTX file (a path or binary stream)
+            compression: Compression profile name (fast, default or archive)
         """
         if not self.presentation:
             raise ValueError("No presentation loaded")
 
+        if hasattr(output_path, 'write'):
+            save_presentation(self.presentation, output_path, compression)
+            return output_path
+
         # Ensure output directory exists
         output_dir = os.path.dirname(output_path)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
 
-        self.presentation.save(output_path)
+        save_presentation(self.presentation, output_path, compression)
         return output_path
 
     def get_template_info(self):
-        """Get information about the template"""
-        if not self.presentation:
-            self.load_template()
+        """
+        Get information about the template
+        Served from the analysis cache; only slides whose XML changed since a
+        previous analysis are inspected again.
+        """
+        from analysisCache import analysis_cache
 
-        info = {
-            'slide_count': len(self.presentation.slides),
-            'slide_width': self.presentation.slide_width,
-            'slide_height': self.presentation.slide_height,
-            'placeholders': self.find_placeholders(),
-            'slides': []
-        }
+        info = analysis_cache.template_info(self.template_path)
+        self.placeholders_found = info['placeholders']
+        return info
 
-        for idx, slide in enumerate(self.presentation.slides):
-            slide_info = {
-                'index': idx,
-                'layout_name': slide.slide_layout.name,
-                'shapes': []
-            }
-
-            for shape in slide.shapes:
-                shape_info = {
-                    'name': shape.name,
-                    'type': shape.shape_type,
-                    'has_text': hasattr(shape, 'text'),
-                    'has_table': shape.has_table
-                }
-                if hasattr(shape, 'text'):
-                    shape_info['text_preview'] = shape.text[:100] if shape.text else ''
 
-                slide_info['shapes'].append(shape_info)
+def find_slide_placeholders(slide, slide_idx):
+    """Find {{PLACEHOLDER_NAME}} markers in one slide's shapes and table cells"""
+    placeholders = []
+
+    for shape in slide.shapes:
+        if hasattr(shape, "text"):
+            matches = REPLICATOR_PATTERN.findall(shape.text)
+            for match in matches:
+                placeholders.append({
+                    'slide': slide_idx,
+                    'shape': shape.name,
+                    'placeholder': match,
+                    'full_pattern': f'{{{{{match}}}}}'
+                })
+
+        # Check table cells if shape is a table
+        if shape.has_table:
+            for row in shape.table.rows:
+                for cell in row.cells:
+                    matches = REPLICATOR_PATTERN.findall(cell.text)
+                    for match in matches:
+                        placeholders.append({
+                            'slide': slide_idx,
+                            'shape': shape.name,
+                            'placeholder': match,
+                            'full_pattern': f'{{{{{match}}}}}',
+                            'is_table': True
+                        })
 
-            info['slides'].append(slide_info)
+    return placeholders
 
-        return info
 
+def describe_slide(slide, slide_idx):
+    """Summary of one slide's layout and shapes for get_template_info"""
+    slide_info = {
+        'index': slide_idx,
+        'layout_name': slide.slide_layout.name,
+        'shapes': []
+    }
 
-def main():
-    """Main function for command-line execution"""
-    if len(sys.argv) < 3:
-        print("Usage: python pptxTemplateReplicator.py <template_path> <json_data> [output_path]")
-        sys.exit(1)
+    for shape in slide.shapes:
+        shape_info = {
+            'name': shape.name,
+            'type': shape.shape_type,
+            'has_text': hasattr(shape, 'text'),
+            'has_table': shape.has_table
+        }
+        if hasattr(shape, 'text'):
+            shape_info['text_preview'] = shape.text[:100] if shape.text else ''
 
-    template_path = sys.argv[1]
+        slide_info['shapes'].append(shape_info)
 
-    try:
-        # Parse JSON data
-        json_data = json.loads(sys.argv[2])
+    return slide_info
+
+
+def process_template(template_path, data, output_path=None, compression=None):
+    """Fill a template with data and return the result dict printed by the CLI"""
+    compression = compression_profile(compression)[0]
+
+    # Determine output path
+    if not output_path:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_path = f"/tmp/generated_{timestamp}.pptx"
 
-        # Determine output path
-        if len(sys.argv) > 3:
-            output_path = sys.argv[3]
-        else:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_path = f"/tmp/generated_{timestamp}.pptx"
+    timer = JobTimer('replicate')
 
-        # Create replicator
+    # Create replicator
+    with timer.phase('load'):
         replicator = TemplateReplicator(template_path)
         replicator.load_template()
 
+    with timer.phase('fill'):
         # Find placeholders (for info)
         placeholders = replicator.find_placeholders()
 
         # Replace placeholders with data
-        replacements = replicator.replace_placeholders(json_data)
-
-        # Save the result
-        saved_path = replicator.save(output_path)
-
-        # Return result as JSON
-        result = {
-            'success': True,
-            'path': saved_path,
-            'placeholders_found': placeholders,
-            'replacements_made': replacements,
-            'message': f'Template processed successfully. {len(replacements)} replacements made.'
-        }
-        print(json.dumps(result))
+        replacements = replicator.replace_placeholders(data)
+
+    # Save the result
+    with timer.phase('save'):
+        saved_path, bytes_written = save_output(lambda target: replicator.save(target, compression), output_path)
+
+    result = {
+        'success': True,
+        'path': saved_path,
+        'placeholders_found': placeholders,
+        'replacements_made': replacements,
+        'message': f'Template processed successfully. {len(replacements)} replacements made.'
+    }
+    result.update(timer.finish(
+        compression=compression,
+        shape_count=count_shapes(replicator.presentation),
+        replacement_count=len(replacements),
+        bytes_written=bytes_written
+    ))
+    return result
+
+
+def main():
+    """Main function for command-line execution"""
+    compression = pop_option(sys.argv, 'compression')
+    if len(sys.argv) < 3:
+        print("Usage: python pptxTemplateReplicator.py <template_path> <json_data|-|fd:N> [output_path|-]")
+        sys.exit(1)
+
+    template_path = sys.argv[1]
+
+    try:
+        # Parse JSON data (inline, '-' for stdin or 'fd:N')
+        json_data = read_job_data(sys.argv[2])
+        output_path = sys.argv[3] if len(sys.argv) > 3 else None
+
+        # Return result as JSON ('-' writes the file to stdout and the JSON to stderr)
+        result = process_template(template_path, json_data, output_path, compression)
+        print_result(result, output_path)
 
     except FileNotFoundError as e:
         error = {
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Minimal zip writer for PowerPoint packages
+Copies unchanged members from a source package byte-for-byte (no inflate or
+deflate) and writes new or modified members with a chosen compression level.
+Output is written strictly sequentially, so it also works on pipes.
+
+Also provides named compression profiles for saving python-pptx presentations:
+    default  zlib level 6 for every member (python-pptx's own behaviour)
+    fast     zlib level 1; already-compressed media is stored as-is
+    archive  zlib level 9 for every member
+"""
+
+import os
+import time
+import zlib
+import struct
+import posixpath
+import zipfile
+from pptx.opc.serialized import PackageWriter
+
+LOCAL_HEADER = struct.Struct(zipfile.structFileHeader)
+CENTRAL_HEADER = struct.Struct(zipfile.structCentralDir)
+END_RECORD = struct.Struct(zipfile.structEndArchive)
+
+LOCAL_SIGNATURE = zipfile.stringFileHeader
+CENTRAL_SIGNATURE = zipfile.stringCentralDir
+END_SIGNATURE = zipfile.stringEndArchive
+
+# Indexes into the unpacked local file header
+LOCAL_NAME_LENGTH = 10
+LOCAL_EXTRA_LENGTH = 11
+
+DATA_DESCRIPTOR_FLAG = 0x08
+UTF8_FLAG = 0x800
+ZIP32_LIMIT = 0xFFFFFFFF
+MAX_ENTRIES = 0xFFFF
+VERSION_DEFLATE = 20
+
+
+COMPRESSION_PROFILES = {
+    'default': {'level': 6, 'store_media': False},
+    'fast': {'level': 1, 'store_media': True},
+    'archive': {'level': 9, 'store_media': False}
+}
+DEFAULT_COMPRESSION = os.environ.get('PPTX_COMPRESSION_PROFILE', 'default')
+
+# Media that is already compressed; deflating it again costs time for almost no gain
+PRECOMPRESSED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.jfif', '.gif', '.webp', '.wdp',
+    '.mp3', '.m4a', '.mp4', '.m4v', '.mov', '.wmv', '.avi', '.wma'
+}
+
+
+def compression_profile(name=None):
+    """
+    Return (profile name, settings) for a profile name, falling back to the configured default
+    Raises ValueError for unknown names so a typo in a job is not silently ignored.
+    """
+    name = name or DEFAULT_COMPRESSION
+    if name not in COMPRESSION_PROFILES:
+        raise ValueError(f"Unknown compression profile: {name} (expected one of {', '.join(COMPRESSION_PROFILES)})")
+    return name, COMPRESSION_PROFILES[name]
+
+
+def is_precompressed(name):
+    return posixpath.splitext(name)[1].lower() in PRECOMPRESSED_EXTENSIONS
+
+
+def dos_datetime(date_time):
+    """Pack a (Y, M, D, h, m, s) tuple into DOS (time, date) words"""
+    year, month, day, hour, minute, second = date_time
+    year = max(year, 1980)
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | (second // 2)
+    return dos_time, dos_date
+
+
+def seek_member_data(source, info):
+    """
+    Position an open zipfile.ZipFile's file at a member's compressed data
+    Returns:
+        The underlying binary stream; read info.compress_size bytes from it
+    """
+    if info.flag_bits & 0x01:
+        raise ValueError(f'Encrypted zip member {info.filename} cannot be copied')
+
+    source_fp = source.fp
+    source_fp.seek(info.header_offset)
+    header = LOCAL_HEADER.unpack(source_fp.read(LOCAL_HEADER.size))
+    if header[0] != LOCAL_SIGNATURE:
+        raise zipfile.BadZipFile(f'Bad local header for {info.filename}')
+    source_fp.seek(header[LOCAL_NAME_LENGTH] + header[LOCAL_EXTRA_LENGTH], 1)
+    return source_fp
+
+
+class RawZipWriter:
+    def __init__(self, fileobj):
+        """
+        Initialize a writer on a binary file object
+        Args:
+            fileobj: Writable binary stream; it does not need to be seekable
+        """
+        self.fileobj = fileobj
+        self.offset = 0
+        self.entries = []
+        self.names = set()
+        self.closed = False
+
+    def _write(self, data):
+        self.fileobj.write(data)
+        self.offset += len(data)
+
+    def _add_entry(self, name, flag_bits, compress_type, date_time, crc, compress_size,
+                   file_size, external_attr=0):
+        if name in self.names:
+            raise ValueError(f'Duplicate zip member: {name}')
+        if len(self.entries) >= MAX_ENTRIES:
+            raise ValueError('Too many zip members for a non-zip64 archive')
+        if max(compress_size, file_size, self.offset) >= ZIP32_LIMIT:
+            raise ValueError(f'Zip member {name} needs zip64, which is not supported')
+
+        encoded_name = name.encode('utf-8')
+        if not name.isascii():
+            flag_bits |= UTF8_FLAG
+        flag_bits &= ~DATA_DESCRIPTOR_FLAG
+        dos_time, dos_date = dos_datetime(date_time)
+
+        entry = {
+            'name': encoded_name,
+            'flag_bits': flag_bits,
+            'compress_type': compress_type,
+            'dos_time': dos_time,
+            'dos_date': dos_date,
+            'crc': crc,
+            'compress_size': compress_size,
+            'file_size': file_size,
+            'external_attr': external_attr,
+            'header_offset': self.offset
+        }
+        self.names.add(name)
+        self.entries.append(entry)
+
+        self._write(LOCAL_HEADER.pack(
+            LOCAL_SIGNATURE, VERSION_DEFLATE, 0, flag_bits, compress_type,
+            dos_time, dos_date, crc, compress_size, file_size,
+            len(encoded_name), 0
+        ))
+        self._write(encoded_name)
+
+    def copy_raw(self, source, info):
+        """
+        Copy a member from an open zipfile.ZipFile without recompressing it
+        Args:
+            source: Open zipfile.ZipFile the member belongs to
+            info: ZipInfo of the member
+        """
+        self.copy_stream(
+            info.filename, seek_member_data(source, info), info.compress_size, info.compress_type,
+            info.CRC, info.file_size, info.date_time, info.flag_bits, info.external_attr
+        )
+
+    def copy_stream(self, name, stream, compress_size, compress_type, crc, file_size, date_time,
+                    flag_bits=0, external_attr=0):
+        """
+        Write a member whose already-compressed data is read from a stream
+        Args:
+            name: Member name
+            stream: Binary stream positioned at the member's compressed data
+            compress_size: Bytes of compressed data to copy
+            compress_type, crc, file_size: As recorded for the member in its source archive
+            date_time: Modification time tuple
+        """
+        self._add_entry(name, flag_bits, compress_type, date_time, crc, compress_size, file_size, external_attr)
+
+        remaining = compress_size
+        while remaining:
+            chunk = stream.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                raise zipfile.BadZipFile(f'Truncated data for {name}')
+            self._write(chunk)
+            remaining -= len(chunk)
+
+    def write_bytes(self, name, data, compress_level=6, date_time=None, external_attr=0):
+        """
+        Write a member from bytes
+        Args:
+            name: Member name
+            data: Uncompressed content
+            compress_level: zlib level 0-9; 0 stores the member uncompressed
+            date_time: Modification time tuple, defaults to now
+        """
+        if date_time is None:
+            date_time = time.localtime(time.time())[:6]
+        crc = zlib.crc32(data) & 0xFFFFFFFF
+
+        if compress_level:
+            compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+            payload = compressor.compress(data) + compressor.flush()
+            compress_type = zipfile.ZIP_DEFLATED
+        else:
+            payload = data
+            compress_type = zipfile.ZIP_STORED
+
+        self._add_entry(name, 0, compress_type, date_time, crc, len(payload), len(data), external_attr)
+        self._write(payload)
+
+    def close(self):
+        """Write the central directory and end record"""
+        if self.closed:
+            return
+        self.closed = True
+
+        directory_offset = self.offset
+        for entry in self.entries:
+            self._write(CENTRAL_HEADER.pack(
+                CENTRAL_SIGNATURE, VERSION_DEFLATE, 0, VERSION_DEFLATE, 0,
+                entry['flag_bits'], entry['compress_type'],
+                entry['dos_time'], entry['dos_date'], entry['crc'],
+                entry['compress_size'], entry['file_size'],
+                len(entry['name']), 0, 0, 0, 0,
+                entry['external_attr'], entry['header_offset']
+            ))
+            self._write(entry['name'])
+        directory_size = self.offset - directory_offset
+
+        self._write(END_RECORD.pack(
+            END_SIGNATURE, 0, 0, len(self.entries), len(self.entries),
+            directory_size, directory_offset, 0
+        ))
+        self.fileobj.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+class ProfileZipPkgWriter:
+    def __init__(self, pkg_file, settings):
+        """
+        Physical package writer for python-pptx's PackageWriter with per-member compression
+        Args:
+            pkg_file: Path or writable binary stream
+            settings: Compression profile settings
+        """
+        self.settings = settings
+        self.zipf = zipfile.ZipFile(pkg_file, 'w', compression=zipfile.ZIP_DEFLATED, strict_timestamps=False)
+
+    def write(self, pack_uri, blob):
+        name = pack_uri.membername
+        if self.settings['store_media'] and is_precompressed(name):
+            self.zipf.writestr(name, blob, compress_type=zipfile.ZIP_STORED)
+        else:
+            self.zipf.writestr(name, blob, compress_type=zipfile.ZIP_DEFLATED,
+                               compresslevel=self.settings['level'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.zipf.close()
+
+
+class ProfilePackageWriter(PackageWriter):
+    """
+    python-pptx PackageWriter that compresses according to a profile
+    Relies on PackageWriter's private _write_* methods; python-pptx is pinned to 1.0.x
+    in install-python-packages.sh and scripts/test_compression_profiles.py checks them.
+    """
+
+    def __init__(self, pkg_file, pkg_rels, parts, settings):
+        super().__init__(pkg_file, pkg_rels, parts)
+        self.settings = settings
+
+    def _write(self):
+        with ProfileZipPkgWriter(self._pkg_file, self.settings) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+
+
+def save_presentation(presentation, output, compression=None):
+    """
+    Save a python-pptx Presentation like Presentation.save, using a compression profile
+    Args:
+        presentation: Presentation to save
+        output: Path or writable binary stream
+        compression: Profile name (see COMPRESSION_PROFILES); None uses the configured default
+    Returns:
+        The profile name used
+    """
+    name, settings = compression_profile(compression)
+    package = presentation.part.package
+    ProfilePackageWriter(output, package._rels, tuple(package.iter_parts()), settings)._write()
+    return name
@@ -12,6 +12,12 @@ from copy import deepcopy
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
+from templateCache import template_cache
+from fillPlan import get_fill_plan
+from textReplace import literal_replacer, replace_in_paragraph, set_paragraph_text, copy_run_format
+from jobTiming import JobTimer, count_shapes
+from jobIO import pop_option, print_result, read_job_data, save_output
+from pptxZip import compression_profile, save_presentation
 
 class QuadChartFiller:
     def __init__(self, template_path):
@@ -22,123 +28,43 @@ class QuadChartFiller:
 
         # Load template as base
         self.presentation = None
+        self.template_hash = None
         self.load_template()
 
     def load_template(self):
-        """Load the template presentation"""
-        self.presentation = Presentation(self.template_path)
+        """Load the template presentation (a private copy from the template cache)"""
+        self.template_hash, self.presentation = template_cache.load_with_hash(self.template_path)
 
     def preserve_formatting(self, source_paragraph, target_paragraph, new_text):
-        """Preserve formatting from source to target paragraph with new text"""
-        # Clear existing runs
-        for run in target_paragraph.runs:
-            run.text = ''
+        """Set target paragraph to new_text, formatted like the first run of source"""
+        run = set_paragraph_text(target_paragraph._p, new_text)
 
-        # If source has runs, copy their formatting
+        # Copy the source run's formatting element as a whole
         if source_paragraph.runs:
-            source_run = source_paragraph.runs[0]
-            new_run = target_paragraph.runs[0] if target_paragraph.runs else target_paragraph.add_run()
-
-            # Set text
-            new_run.text = new_text
-
-            # Copy font properties
-            if source_run.font.name:
-                new_run.font.name = source_run.font.name
-            if source_run.font.size:
-                new_run.font.size = source_run.font.size
-            if source_run.font.bold is not None:
-                new_run.font.bold = source_run.font.bold
-            if source_run.font.italic is not None:
-                new_run.font.italic = source_run.font.italic
-            if source_run.font.underline is not None:
-                new_run.font.underline = source_run.font.underline
-
-            # Copy color if exists
-            if hasattr(source_run.font, 'color') and source_run.font.color:
-                if hasattr(source_run.font.color, 'rgb') and source_run.font.color.rgb:
-                    new_run.font.color.rgb = source_run.font.color.rgb
-        else:
-            # No runs in source, just set text
-            if target_paragraph.runs:
-                target_paragraph.runs[0].text = new_text
-            else:
-                target_paragraph.add_run().text = new_text
+            copy_run_format(source_paragraph.runs[0]._r, run)
 
     def replace_text_in_shape(self, shape, placeholder_text, replacement_text):
         """Replace placeholder text with new text while preserving formatting"""
         if not shape.has_text_frame:
             return False
 
-        text_frame = shape.text_frame
+        pattern, substitute = literal_replacer({placeholder_text: replacement_text})
         replaced = False
-
-        for paragraph_idx, paragraph in enumerate(text_frame.paragraphs):
-            if placeholder_text.lower() in paragraph.text.lower():
-                # Store original formatting
-                original_alignment = paragraph.alignment
-                original_level = paragraph.level
-
-                # Replace text while preserving run formatting
-                for run in paragraph.runs:
-                    if placeholder_text.lower() in run.text.lower():
-                        # Store original font properties
-                        orig_font_name = run.font.name
-                        orig_font_size = run.font.size
-                        orig_font_bold = run.font.bold
-                        orig_font_italic = run.font.italic
-                        orig_font_underline = run.font.underline
-                        orig_font_color = None
-                        if hasattr(run.font, 'color') and run.font.color:
-                            if hasattr(run.font.color, 'rgb') and run.font.color.rgb:
-                                orig_font_color = run.font.color.rgb
-
-                        # Replace text
-                        run.text = run.text.replace(placeholder_text, replacement_text)
-
-                        # Restore font properties
-                        if orig_font_name:
-                            run.font.name = orig_font_name
-                        if orig_font_size:
-                            run.font.size = orig_font_size
-                        if orig_font_bold is not None:
-                            run.font.bold = orig_font_bold
-                        if orig_font_italic is not None:
-                            run.font.italic = orig_font_italic
-                        if orig_font_underline is not None:
-                            run.font.underline = orig_font_underline
-                        if orig_font_color:
-                            run.font.color.rgb = orig_font_color
-
-                        replaced = True
-
-                # Restore paragraph properties
-                paragraph.alignment = original_alignment
-                paragraph.level = original_level
+        for paragraph in shape.text_frame.paragraphs:
+            if replace_in_paragraph(paragraph._p, pattern, substitute):
+                replaced = True
 
         return replaced
 
     def replace_text_in_table(self, table, placeholder_text, replacement_text):
         """Replace text in table cells while preserving formatting"""
+        pattern, substitute = literal_replacer({placeholder_text: replacement_text})
         replaced = False
         for row in table.rows:
             for cell in row.cells:
-                if cell.text_frame:
-                    for paragraph in cell.text_frame.paragraphs:
-                        if placeholder_text.lower() in paragraph.text.lower():
-                            # Store original formatting
-                            original_text = paragraph.text
-                            original_alignment = paragraph.alignment
-
-                            # Replace in runs to preserve formatting
-                            for run in paragraph.runs:
-                                if placeholder_text.lower() in run.text.lower():
-                                    run.text = run.text.replace(placeholder_text, replacement_text)
-                                    replaced = True
-
-                            # Restore alignment
-                            if original_alignment:
-                                paragraph.alignment = original_alignment
+                for paragraph in cell.text_frame.paragraphs:
+                    if replace_in_paragraph(paragraph._p, pattern, substitute):
+                        replaced = True
 
         return replaced
 
@@ -161,49 +87,76 @@ class QuadChartFiller:
         if not self.presentation:
             self.load_template()
 
-        # Process each slide
-        for slide in self.presentation.slides:
-            # Process all shapes
-            for shape in slide.shapes:
-                # Handle regular text shapes
-                if shape.has_text_frame:
-                    for placeholder, replacement in data_mapping.items():
-                        self.replace_text_in_shape(shape, placeholder, replacement)
-
-                # Handle tables
-                if shape.has_table:
-                    for placeholder, replacement in data_mapping.items():
-                        self.replace_text_in_table(shape.table, placeholder, replacement)
-
-                # Handle grouped shapes
-                if hasattr(shape, 'shapes'):
-                    for sub_shape in shape.shapes:
-                        if sub_shape.has_text_frame:
-                            for placeholder, replacement in data_mapping.items():
-                                self.replace_text_in_shape(sub_shape, placeholder, replacement)
-
-    def save(self, output_path):
-        """Save the filled presentation"""
+        values = {placeholder: self.format_value(value) for placeholder, value in data_mapping.items()}
+        pattern, substitute = literal_replacer(values)
+
+        # Only the paragraphs recorded in the template's fill plan can contain placeholders
+        plan = get_fill_plan(self.template_hash, self.presentation, pattern)
+
+        replaced = 0
+        for _, _, paragraph in plan.locate(self.presentation):
+            replaced += replace_in_paragraph(paragraph._p, pattern, substitute)
+
+        return replaced
+
+    @staticmethod
+    def format_value(value):
+        """Convert a mapping value to the text placed in the slide"""
+        if value is None:
+            return ''
+        if isinstance(value, list):
+            return '\n'.join(str(item) for item in value)
+        return str(value)
+
+    def save(self, output_path, compression=None):
+        """Save the filled presentation to a file path or binary stream with a compression profile"""
+        if hasattr(output_path, 'write'):
+            save_presentation(self.presentation, output_path, compression)
+            return output_path
+
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        self.presentation.save(str(output_path))
+        save_presentation(self.presentation, str(output_path), compression)
         return str(output_path)
 
+def fill_template(template_path, data, output_path, compression=None):
+    """Fill a template and return the result dict printed by the CLI"""
+    compression = compression_profile(compression)[0]
+    timer = JobTimer('fill')
+
+    with timer.phase('load'):
+        filler = QuadChartFiller(template_path)
+
+    # Fill the template
+    with timer.phase('fill'):
+        replaced = filler.fill_quad_chart(data)
+
+    # Save the result
+    with timer.phase('save'):
+        saved_path, bytes_written = save_output(lambda target: filler.save(target, compression), output_path)
+
+    result = {
+        'success': True,
+        'path': saved_path,
+        'message': f'Template filled successfully. {replaced} replacements made.'
+    }
+    result.update(timer.finish(
+        compression=compression,
+        shape_count=count_shapes(filler.presentation),
+        replacement_count=replaced,
+        bytes_written=bytes_written
+    ))
+    return result
+
 def fill_template_from_json(template_path, data_json, output_path):
     """Convenience function to fill template from JSON data"""
-    filler = QuadChartFiller(template_path)
-
     # Parse JSON if string
     if isinstance(data_json, str):
         data = json.loads(data_json)
     else:
         data = data_json
 
-    # Fill the template
-    filler.fill_quad_chart(data)
-
-    # Save the result
-    return filler.save(output_path)
+    return fill_template(template_path, data, output_path)['path']
 
 def main():
     """Example usage"""
@@ -244,18 +197,23 @@ def main():
 
 if __name__ == "__main__":
     # Check if running with arguments
+    compression = pop_option(sys.argv, 'compression')
     if len(sys.argv) > 1:
-        # Expected: script.py template_path data_json output_path
+        # Expected: script.py template_path data_json output_path [--compression=fast|default|archive]
+        # data_json may be '-' (stdin) or 'fd:N'; output_path '-' writes the file to stdout
         if len(sys.argv) != 4:
-            print("Usage: python quadChartFiller.py <template_path> <data_json> <output_path>")
+            print("Usage: python quadChartFiller.py <template_path> <data_json|-|fd:N> <output_path|->")
             sys.exit(1)
 
-        template = sys.argv[1]
-        data = json.loads(sys.argv[2])
-        output = sys.argv[3]
-
-        result = fill_template_from_json(template, data, output)
-        print(f"Success: {result}")
+        try:
+            result = fill_template(sys.argv[1], read_job_data(sys.argv[2]), sys.argv[3], compression)
+            print_result(result, sys.argv[3])
+        except json.JSONDecodeError as e:
+            print(json.dumps({'success': False, 'error': f'Invalid JSON data: {str(e)}'}), file=sys.stderr)
+            sys.exit(1)
+        except Exception as e:
+            print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+            sys.exit(1)
     else:
         # Run example
         main()
\ No newline at end of file
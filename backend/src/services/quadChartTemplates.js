@@ -7,6 +7,7 @@ const fs = require('fs').promises;
 const path = require('path');
 const { spawn } = require('child_process');
 const sharp = require('sharp');
+const renderWorker = require('./renderWorker');
 
 class QuadChartTemplateService {
     constructor() {
@@ -246,8 +247,18 @@ class QuadChartTemplateService {
         const templatePath = path.join(this.templatesDir, filename);
         const previewPath = path.join(this.previewsDir, filename.replace('.pptx', '.png'));
 
-        // For now, create a placeholder preview
-        // In production, you'd use a library to convert PPTX first slide to image
+        // Rasterize the first slide in the render worker; fall back to a placeholder card
+        try {
+            const result = await renderWorker.submit('preview', {
+                template_path: templatePath,
+                sizes: ['medium']
+            });
+            await fs.copyFile(result.thumbnails.medium, previewPath);
+            return;
+        } catch (error) {
+            console.error(`Failed to render preview for ${filename}:`, error.message);
+        }
+
         try {
             // Create a placeholder image with template info
             const svg = `
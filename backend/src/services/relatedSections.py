@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Precomputed "related sections" for the BD Bible viewer
+The corpus is chunked into the same sections the search index uses, each
+section becomes an L2-normalized TF-IDF vector, and the top-k cosine
+neighbours of every section are stored as two fixed-width arrays
+(neighbour row numbers and float16 scores). A lookup is a row read from the
+memory-mapped arrays; nothing is compared at request time.
+
+Builds are incremental: sections of unchanged files keep their vectors and
+rows. Only rows of changed files are recomputed against the whole corpus,
+and the other rows just merge in the new sections as candidates (rows that
+pointed at a removed section are recomputed). The vocabulary and IDF weights
+are those of the last full build, which is redone once enough of the corpus
+has changed since.
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+
+import numpy as np
+
+from contentSections import DEFAULT_CONTENT_ROOT, content_files, file_hash, read_sections
+from contentSearch import tokenize
+from jobTiming import JobTimer
+from jobIO import pop_option
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_RELATED_DIR = os.environ.get(
+    'RELATED_SECTIONS_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'related_sections')
+)
+
+# Format of the stored arrays; bump to force a full rebuild
+RELATED_VERSION = 1
+TOP_K = int(os.environ.get('RELATED_TOP_K', 10))
+# Full rebuild (fresh vocabulary and IDF) once this share of the sections changed since the last one
+REBASE_FRACTION = 0.25
+# Copies of the same section (the master document repeats its opening) are not "related"
+DUPLICATE_SIMILARITY = 0.98
+# Rows compared per block, bounding the (rows x non-zeros) temporary
+BLOCK_ROWS = 64
+
+MANIFEST_FILE = 'sections.json'
+ARRAY_FILES = ('neighbours.npy', 'scores.npy', 'vectors.npz')
+
+
+class SparseRows:
+    def __init__(self, indptr, indices, data):
+        """
+        L2-normalized TF-IDF vectors in CSR form
+        Args:
+            indptr: Row boundaries (n + 1)
+            indices: Vocabulary column of each non-zero
+            data: Weight of each non-zero
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from a list of (indices, weights) pairs"""
+        lengths = np.array([len(indices) for indices, _ in rows], dtype=np.int64)
+        indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        if rows:
+            indices = np.concatenate([indices for indices, _ in rows]).astype(np.int32)
+            data = np.concatenate([weights for _, weights in rows]).astype(np.float32)
+        else:
+            indices, data = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return cls(indptr, indices, data)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def row(self, idx):
+        start, end = self.indptr[idx], self.indptr[idx + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def take(self, rows):
+        """Subset of rows, in the given order"""
+        return SparseRows.from_rows([self.row(idx) for idx in rows])
+
+    def concat(self, other):
+        return SparseRows(
+            np.concatenate((self.indptr, other.indptr[1:] + self.indptr[-1])),
+            np.concatenate((self.indices, other.indices)),
+            np.concatenate((self.data, other.data))
+        )
+
+    def dense(self, rows, width):
+        """Dense (len(rows) x width) block of some rows"""
+        block = np.zeros((len(rows), width), dtype=np.float32)
+        for out, idx in enumerate(rows):
+            indices, weights = self.row(idx)
+            block[out, indices] = weights
+        return block
+
+    def similarities(self, block):
+        """
+        Cosine similarities of dense query rows against every row
+        Each stored row's dot products are the sums of the query weights at its
+        non-zeros, computed for all rows at once with np.add.reduceat.
+        """
+        sims = np.zeros((block.shape[0], len(self)), dtype=np.float32)
+        starts = self.indptr[:-1]
+        filled = starts < self.indptr[1:]
+        if not len(self.data) or not filled.any():
+            return sims
+        products = block[:, self.indices] * self.data
+        # reduceat needs in-range, non-empty segments; empty rows stay zero
+        sums = np.add.reduceat(products, starts[filled], axis=1)
+        sims[:, filled] = sums
+        return sims
+
+
+def tfidf_rows(token_lists, vocabulary, idf):
+    """Sparse L2-normalized TF-IDF (1 + log tf) vectors; words outside the vocabulary are ignored"""
+    rows = []
+    for tokens in token_lists:
+        counts = {}
+        for token in tokens:
+            column = vocabulary.get(token)
+            if column is not None:
+                counts[column] = counts.get(column, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+        weights = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * idf[indices]
+        norm = float(np.linalg.norm(weights))
+        order = np.argsort(indices)
+        rows.append((indices[order], (weights[order] / norm) if norm else weights[order]))
+    return rows
+
+
+def top_neighbours(sims, rows, k):
+    """
+    Top-k columns of each similarity row, best first
+    Args:
+        sims: (len(rows) x n) similarities; modified in place
+        rows: Row number of each similarity row (its own column is skipped)
+        k: Neighbours per row
+    Returns:
+        (neighbours int32, scores float16), padded with -1 / 0
+    """
+    sims[np.arange(len(rows)), rows] = 0
+    sims[sims >= DUPLICATE_SIMILARITY] = 0
+    return select_top(sims, np.broadcast_to(np.arange(sims.shape[1], dtype=np.int32), sims.shape), k)
+
+
+def select_top(scores, columns, k):
+    """Best k (score, column) pairs per row; non-positive scores become padding"""
+    count, width = scores.shape
+    neighbours = np.full((count, k), -1, dtype=np.int32)
+    best = np.zeros((count, k), dtype=np.float16)
+    if not count or not width:
+        return neighbours, best
+    take = min(k, width)
+    if width > take:
+        part = np.argpartition(-scores, take - 1, axis=1)[:, :take]
+    else:
+        part = np.tile(np.arange(width), (count, 1))
+    top_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    part = np.take_along_axis(part, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    top_columns = np.take_along_axis(columns, part, axis=1)
+    valid = top_scores > 0
+    neighbours[:, :take] = np.where(valid, top_columns, -1)
+    best[:, :take] = np.where(valid, top_scores, 0)
+    return neighbours, best
+
+
+class RelatedSections:
+    def __init__(self, root=DEFAULT_CONTENT_ROOT, directory=DEFAULT_RELATED_DIR, k=TOP_K):
+        """
+        Initialize the neighbour store
+        Args:
+            root: Content root the corpus paths are relative to
+            directory: Where the manifest and arrays are stored
+            k: Neighbours kept per section
+        """
+        self.root = os.path.abspath(root)
+        self.directory = os.path.abspath(directory)
+        self.k = k
+        # Re-entrant: a lookup builds the arrays on first use
+        self.lock = threading.RLock()
+        self.manifest = None
+        self.rows = {}
+        self.neighbours = None
+        self.scores = None
+        self.lookups = 0
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load_manifest(self):
+        try:
+            with open(self.path(MANIFEST_FILE), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != RELATED_VERSION or manifest.get('k') != self.k:
+            return None
+        if not all(os.path.exists(self.path(name)) for name in ARRAY_FILES):
+            return None
+        return manifest
+
+    def open(self):
+        """Memory-map the stored neighbour arrays for lookups"""
+        manifest = self.load_manifest()
+        if manifest is None:
+            return False
+        self.manifest = manifest
+        self.rows = {key: row for row, key in enumerate(manifest['keys'])}
+        self.neighbours = np.load(self.path('neighbours.npy'), mmap_mode='r')
+        self.scores = np.load(self.path('scores.npy'), mmap_mode='r')
+        return True
+
+    def write_array(self, name, writer):
+        """Write one stored file atomically so concurrent readers never see a partial file"""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.related_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer(f)
+            os.replace(temp_path, self.path(name))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def save(self, manifest, vectors, idf, neighbours, scores):
+        os.makedirs(self.directory, exist_ok=True)
+        self.write_array('vectors.npz', lambda f: np.savez(
+            f, indptr=vectors.indptr, indices=vectors.indices, data=vectors.data, idf=idf))
+        self.write_array('neighbours.npy', lambda f: np.save(f, neighbours))
+        self.write_array('scores.npy', lambda f: np.save(f, scores))
+        # The manifest goes last: it is what makes a new set of arrays current
+        self.write_array(MANIFEST_FILE, lambda f: f.write(
+            json.dumps(manifest, separators=(',', ':')).encode('utf-8')))
+
+    def scan(self, previous):
+        """
+        Compare the content files with the last build
+        Returns:
+            (file records, changed files, removed files)
+        """
+        records = {}
+        changed = []
+        for relative in content_files(self.root):
+            stat = os.stat(os.path.join(self.root, relative))
+            record = previous.get(relative)
+            if not (record and record['size'] == stat.st_size and record['mtime'] == stat.st_mtime_ns):
+                digest = file_hash(os.path.join(self.root, relative))
+                if not (record and record['hash'] == digest):
+                    changed.append(relative)
+                record = {'hash': digest, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+            records[relative] = record
+        removed = sorted(set(previous) - set(records))
+        return records, changed, removed
+
+    def read_files(self, files):
+        """Sections of some files as (keys, titles, token lists)"""
+        keys, titles, tokens = [], [], []
+        for relative in files:
+            for section in read_sections(os.path.join(self.root, relative), relative):
+                keys.append(f"{relative}#{section['id']}")
+                titles.append(section['title'])
+                tokens.append(tokenize(section['text']))
+        return keys, titles, tokens
+
+    def build(self, rebuild=False):
+        """
+        Bring the neighbour arrays up to date with the content files
+        Args:
+            rebuild: Recompute everything with a fresh vocabulary
+        Returns:
+            Result dict with the files and rows recomputed and timing
+        """
+        timer = JobTimer('related_sections')
+        with self.lock:
+            with timer.phase('scan'):
+                manifest = None if rebuild else self.load_manifest()
+                previous = manifest['files'] if manifest else {}
+                records, changed, removed = self.scan(previous)
+
+            if manifest is not None and not changed and not removed:
+                if records != previous:
+                    manifest['files'] = records
+                    self.write_array(MANIFEST_FILE, lambda f: f.write(
+                        json.dumps(manifest, separators=(',', ':')).encode('utf-8')))
+                self.open()
+                result = {'success': True, 'full': False, 'files': [], 'removed': [], 'rows_computed': 0,
+                          'sections': len(self.rows)}
+                result.update(timer.finish())
+                return result
+
+            with timer.phase('chunk'):
+                keys, titles, tokens = self.read_files(changed if manifest else sorted(records))
+
+            full = manifest is None
+            if not full:
+                dropped = {key for key in manifest['keys'] if key.split('#', 1)[0] in set(changed) | set(removed)}
+                since = manifest['changed_since_rebase'] + len(dropped) + len(keys)
+                full = since > REBASE_FRACTION * max(len(manifest['keys']), 1)
+                if full:
+                    keys, titles, tokens = self.read_files(sorted(records))
+
+            if full:
+                with timer.phase('vectorize'):
+                    state = self.full_build(keys, titles, tokens, records)
+            else:
+                with timer.phase('vectorize'):
+                    state = self.incremental_build(manifest, keys, titles, tokens, records, changed, removed)
+
+            with timer.phase('write'):
+                self.save(*state[:5])
+            self.open()
+
+        result = {
+            'success': True,
+            'full': full,
+            'files': sorted(records) if full else changed,
+            'removed': removed,
+            'rows_computed': state[5],
+            'sections': len(self.rows)
+        }
+        result.update(timer.finish())
+        return result
+
+    def full_build(self, keys, titles, tokens, records):
+        """Vocabulary, IDF, vectors and neighbours of the whole corpus"""
+        vocabulary = {}
+        frequencies = []
+        for section_tokens in tokens:
+            for token in set(section_tokens):
+                column = vocabulary.setdefault(token, len(vocabulary))
+                if column == len(frequencies):
+                    frequencies.append(0)
+                frequencies[column] += 1
+        # Smoothed IDF, as in scikit-learn's TfidfVectorizer
+        idf = (np.log((1 + len(keys)) / (1 + np.array(frequencies, dtype=np.float32))) + 1).astype(np.float32)
+
+        vectors = SparseRows.from_rows(tfidf_rows(tokens, vocabulary, idf))
+        neighbours, scores = self.compute_rows(vectors, len(vocabulary), np.arange(len(keys)))
+        manifest = {
+            'version': RELATED_VERSION,
+            'k': self.k,
+            'files': records,
+            'keys': keys,
+            'titles': titles,
+            'vocabulary': sorted(vocabulary, key=vocabulary.get),
+            'changed_since_rebase': 0
+        }
+        return manifest, vectors, idf, neighbours, scores, len(keys)
+
+    def incremental_build(self, manifest, keys, titles, tokens, records, changed, removed):
+        """Recompute only the rows of changed files, and merge them into the other rows"""
+        stale = set(changed) | set(removed)
+        old_keys = manifest['keys']
+        kept = [row for row, key in enumerate(old_keys) if key.split('#', 1)[0] not in stale]
+
+        stored = np.load(self.path('vectors.npz'))
+        old_vectors = SparseRows(stored['indptr'], stored['indices'], stored['data'])
+        idf = stored['idf']
+        vocabulary = {word: column for column, word in enumerate(manifest['vocabulary'])}
+
+        vectors = old_vectors.take(kept).concat(SparseRows.from_rows(tfidf_rows(tokens, vocabulary, idf)))
+        width = len(vocabulary)
+        total = len(kept) + len(keys)
+        new_rows = np.arange(len(kept), total)
+
+        # Old row numbers -> new ones (-1 for dropped rows)
+        remap = np.full(len(old_keys) + 1, -1, dtype=np.int32)
+        remap[kept] = np.arange(len(kept), dtype=np.int32)
+        old_neighbours = np.load(self.path('neighbours.npy'))[kept]
+        old_scores = np.load(self.path('scores.npy'))[kept]
+        kept_neighbours = remap[old_neighbours]
+        # Padding (-1) indexes remap's extra last entry, so it stays -1
+        lost = ((kept_neighbours < 0) & (old_neighbours >= 0)).any(axis=1)
+
+        new_neighbours, new_scores = self.compute_rows(vectors, width, new_rows)
+
+        # Kept rows: merge the new sections into their lists, or recompute rows that lost a neighbour
+        neighbours = np.full((total, self.k), -1, dtype=np.int32)
+        scores = np.zeros((total, self.k), dtype=np.float16)
+        neighbours[new_rows], scores[new_rows] = new_neighbours, new_scores
+
+        recompute = np.flatnonzero(lost)
+        merge = np.flatnonzero(~lost)
+        candidates = vectors.dense(new_rows, width)
+        for start in range(0, len(merge), BLOCK_ROWS):
+            rows = merge[start:start + BLOCK_ROWS]
+            sims = vectors.dense(rows, width) @ candidates.T
+            sims[sims >= DUPLICATE_SIMILARITY] = 0
+            merged_scores = np.concatenate((old_scores[rows].astype(np.float32), sims), axis=1)
+            merged_columns = np.concatenate(
+                (kept_neighbours[rows], np.broadcast_to(new_rows.astype(np.int32), sims.shape)), axis=1)
+            merged_scores[merged_columns < 0] = 0
+            neighbours[rows], scores[rows] = select_top(merged_scores, merged_columns, self.k)
+        if len(recompute):
+            neighbours[recompute], scores[recompute] = self.compute_rows(vectors, width, recompute)
+
+        manifest = dict(manifest)
+        manifest.update({
+            'files': records,
+            'keys': [old_keys[row] for row in kept] + keys,
+            'titles': [manifest['titles'][row] for row in kept] + titles,
+            'changed_since_rebase': manifest['changed_since_rebase'] + len(old_keys) - len(kept) + len(keys)
+        })
+        return manifest, vectors, idf, neighbours, scores, len(keys) + len(recompute)
+
+    def compute_rows(self, vectors, width, rows):
+        """Top-k neighbours of some rows against every row, in blocks"""
+        neighbours = np.full((len(rows), self.k), -1, dtype=np.int32)
+        scores = np.zeros((len(rows), self.k), dtype=np.float16)
+        for start in range(0, len(rows), BLOCK_ROWS):
+            block = rows[start:start + BLOCK_ROWS]
+            sims = vectors.similarities(vectors.dense(block, width))
+            neighbours[start:start + len(block)], scores[start:start + len(block)] = \
+                top_neighbours(sims, block, self.k)
+        return neighbours, scores
+
+    def refresh(self):
+        """
+        Open the arrays, rebuilding them first if any content file changed since they were built
+        Files are only stat'ed (and re-hashed when their size or mtime changed), so this is cheap
+        when nothing changed.
+        """
+        with self.lock:
+            if self.manifest is None and not self.open():
+                self.build()
+                return
+            records, _, _ = self.scan(self.manifest['files'])
+            if records != self.manifest['files']:
+                self.build()
+
+    def resolve_file(self, document):
+        """Corpus path of a document given by path or file name (data/documents first)"""
+        files = self.manifest['files']
+        if document in files:
+            return document
+        matches = [relative for relative in files if os.path.basename(relative) == document]
+        matches.sort(key=lambda relative: (not relative.startswith('data/documents/'), relative))
+        return matches[0] if matches else None
+
+    def related(self, document, section=None, limit=None, refresh=False):
+        """
+        Sections related to one section, or to any section of a document
+        Args:
+            document: Corpus path or file name, e.g. BD_SWIM_LANE_PROCESS.md
+            section: Section ID; omitted to combine all of the document's sections
+            limit: Maximum results (defaults to k)
+            refresh: Rebuild for changed files first (the render worker refreshes on a
+                timer instead, so lookups never wait on a corpus scan)
+        Returns:
+            Result dict with the related sections, best first
+        """
+        with self.lock:
+            if refresh or self.manifest is None:
+                self.refresh()
+            relative = self.resolve_file(document)
+            if relative is None:
+                raise ValueError(f'Unknown document: {document}')
+            if section:
+                row = self.rows.get(f'{relative}#{section}')
+                if row is None:
+                    raise ValueError(f'Unknown section: {relative}#{section}')
+                rows = [row]
+            else:
+                prefix = f'{relative}#'
+                rows = [row for key, row in self.rows.items() if key.startswith(prefix)]
+
+            # Best score per target; a whole document only links out to other documents
+            best = {}
+            for row in rows:
+                for neighbour, score in zip(self.neighbours[row].tolist(), self.scores[row].tolist()):
+                    if neighbour < 0:
+                        break
+                    if not section and self.manifest['keys'][neighbour].startswith(prefix):
+                        continue
+                    if score > best.get(neighbour, 0):
+                        best[neighbour] = score
+            self.lookups += 1
+
+            ranked = sorted(best, key=lambda neighbour: -best[neighbour])[:limit or self.k]
+            results = []
+            for neighbour in ranked:
+                file, section_id = self.manifest['keys'][neighbour].split('#', 1)
+                results.append({
+                    'file': file,
+                    'document': os.path.basename(file),
+                    'section': section_id,
+                    'title': self.manifest['titles'][neighbour],
+                    'score': round(best[neighbour], 3)
+                })
+        return {'success': True, 'file': relative, 'section': section, 'related': results}
+
+    def stats(self):
+        return {
+            'sections': len(self.rows),
+            'k': self.k,
+            'lookups': self.lookups
+        }
+
+
+# Process-wide store shared by the render worker's jobs
+related_sections = RelatedSections()
+
+
+def main():
+    """Main function for command-line execution"""
+    args = sys.argv[1:]
+    section = pop_option(args, 'section')
+    limit = pop_option(args, 'limit')
+    rebuild = '--rebuild' in args
+    args = [arg for arg in args if arg != '--rebuild']
+
+    if not args or args[0] not in ('build', 'related') or (args[0] == 'related' and len(args) < 2):
+        print("Usage: python relatedSections.py build [--rebuild]")
+        print("       python relatedSections.py related <document> [--section=ID] [--limit=N]")
+        sys.exit(1)
+
+    try:
+        if args[0] == 'build':
+            result = related_sections.build(rebuild=rebuild)
+        else:
+            result = related_sections.related(args[1], section=section, limit=int(limit) if limit else None,
+                                              refresh=True)
+        print(json.dumps(result, indent=2))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
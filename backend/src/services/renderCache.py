@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Content-addressed render cache for generated PowerPoint files
+A render is keyed by (job type, template content hash, normalized data,
+generator version); a repeat render of the same key copies the cached file
+to the requested output path instead of rendering it again. The copy is a
+reflink where the filesystem supports it. Jobs that set link_output promise
+to only ever replace their output, never write it in place, and get a hard
+link instead. Cache entries are read-only (0444), so an in-place write
+through such a link fails instead of corrupting the entry.
+
+A job may also render into a binary stream (the worker's data frames)
+instead of a file: a hit copies the entry into the stream, and a miss keeps
+a copy of the bytes it writes so they can be stored.
+
+Entries are written to a temp file and renamed into place, so concurrent
+writers of the same key never expose a partial file. Least recently used
+entries (by file mtime, touched on every hit) are evicted once the cache
+exceeds its size limit.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from templateCache import template_cache
+from jobIO import is_stream
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.environ.get(
+    'RENDER_CACHE_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'generated_pptx', '.render_cache')
+)
+DEFAULT_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_MB', 512)) * 1024 * 1024
+CACHE_ENABLED = os.environ.get('RENDER_CACHE_ENABLED', 'true').lower() != 'false'
+
+# Source files whose behaviour determines render output; editing any of them
+# changes the generator version and so invalidates every cached render
+GENERATOR_SOURCES = [
+    'pptxGenerator.py',
+    'quadChartFiller.py',
+    'pptxTemplateReplicator.py',
+    'pptxStreamFill.py',
+    'pptxZip.py',
+    'textReplace.py',
+    'fillPlan.py',
+    'mediaOptimizer.py',
+    'textFit.py'
+]
+
+# Params that do not affect the rendered content
+IGNORED_PARAMS = ('output_path', 'output_dir', 'template_path', 'cache', 'link_output')
+
+# Linux ioctl that makes target share source's blocks copy-on-write (btrfs, XFS)
+FICLONE = 0x40049409
+
+# Mode of cache entries
+ENTRY_MODE = 0o444
+
+
+def generator_version():
+    """Hash of the generator source files"""
+    digest = hashlib.sha256()
+    for name in GENERATOR_SOURCES:
+        path = os.path.join(SERVICES_DIR, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:16]
+
+
+GENERATOR_VERSION = generator_version()
+
+
+def normalize(value):
+    """Canonical JSON text for a data mapping (sorted keys, no insignificant whitespace)"""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def clone_file(source, target):
+    """Copy source to target, as a reflink where the filesystem supports one"""
+    with open(source, 'rb') as src, open(target, 'wb') as dst:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                return
+            except OSError:
+                pass
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def place_file(source, target, link=False, mode=None):
+    """
+    Atomically put a copy of source at target (replacing target)
+    Args:
+        link: Hard link instead of copying when both are on one filesystem
+        mode: Permissions of the new file (ignored for links, which share source's)
+    """
+    target_dir = os.path.dirname(os.path.abspath(target))
+    os.makedirs(target_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=target_dir, prefix='.render_', suffix='.tmp')
+    os.close(fd)
+    os.unlink(temp_path)
+    try:
+        linked = False
+        if link:
+            try:
+                os.link(source, temp_path)
+                linked = True
+            except OSError:
+                # Across filesystems
+                pass
+        if not linked:
+            clone_file(source, temp_path)
+            if mode is not None:
+                os.chmod(temp_path, mode)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class TeeOutput:
+    """Binary stream that passes writes on to another stream and keeps a copy of them"""
+
+    def __init__(self, output):
+        self.output = output
+        self.data = bytearray()
+
+    def write(self, data):
+        self.output.write(data)
+        self.data += data
+        return len(data)
+
+    def tell(self):
+        return len(self.data)
+
+    def flush(self):
+        self.output.flush()
+
+
+class RenderCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=CACHE_ENABLED):
+        """
+        Initialize the cache
+        Args:
+            directory: Where cached renders are kept
+            max_bytes: Total size of cached files before LRU eviction starts
+            enabled: False turns every lookup into a plain render
+        """
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def key(self, job_type, params):
+        """Cache key for a render job"""
+        content = {name: value for name, value in params.items() if name not in IGNORED_PARAMS}
+        files = {}
+
+        template_path = params.get('template_path')
+        if template_path:
+            files['template'] = template_cache.content_hash(template_path)
+
+        # A logo changes the output just like the template does
+        data = params.get('data')
+        logo_path = data.get('logo_path') if isinstance(data, dict) else None
+        if logo_path and os.path.exists(logo_path):
+            files['logo'] = template_cache.content_hash(logo_path)
+
+        material = normalize({
+            'job': job_type,
+            'params': content,
+            'files': files,
+            'version': GENERATOR_VERSION
+        })
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def entry_paths(self, key):
+        return (
+            os.path.join(self.directory, f'{key}.pptx'),
+            os.path.join(self.directory, f'{key}.json')
+        )
+
+    def fetch(self, key, output_path, link=False):
+        """
+        Copy a cached render to output_path and return its stored result, or None on a miss
+        Args:
+            output_path: Destination path, or a binary stream to copy the entry into
+            link: Hard link the (read-only) entry instead; only for outputs that are
+                replaced, never written in place
+        """
+        started = time.perf_counter()
+        pptx_path, result_path = self.entry_paths(key)
+        entry = None
+        try:
+            with open(result_path, encoding='utf-8') as f:
+                result = json.load(f)
+            if is_stream(output_path):
+                entry = open(pptx_path, 'rb')
+            else:
+                place_file(pptx_path, output_path, link=link)
+            # Mark as recently used for eviction
+            os.utime(pptx_path)
+            os.utime(result_path)
+        except (OSError, ValueError):
+            # Missing, evicted mid-read or half-written by a crashed writer
+            if entry is not None:
+                entry.close()
+            return None
+
+        if is_stream(output_path):
+            # The open entry stays readable even if it is evicted meanwhile; once bytes
+            # have gone out a failure must propagate, not turn into a re-render
+            with entry:
+                shutil.copyfileobj(entry, output_path, 1024 * 1024)
+            result['path'] = None
+        else:
+            result['path'] = str(output_path)
+        result['cached'] = True
+        # The stored timing describes the original render, not this lookup
+        result['render_timing'] = result.pop('timing', None)
+        result['timing'] = {'total_ms': round((time.perf_counter() - started) * 1000, 2)}
+        result.pop('profile_path', None)
+        return result
+
+    def store(self, key, output_path, result, data=None):
+        """Add a finished render to the cache, from output_path or from the bytes of a streamed one"""
+        os.makedirs(self.directory, exist_ok=True)
+        pptx_path, result_path = self.entry_paths(key)
+
+        stored = {name: value for name, value in result.items() if name not in ('path', 'profile_path')}
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.result_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(stored, f, default=str)
+            # Same key means same content, so racing writers can safely replace each other.
+            # Always a copy: the caller still owns output_path and may write to it
+            if data is None:
+                place_file(output_path, pptx_path, mode=ENTRY_MODE)
+            else:
+                self.write_entry(pptx_path, data)
+            os.replace(temp_path, result_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        self.evict()
+
+    def write_entry(self, pptx_path, data):
+        """Atomically write a streamed render's bytes as a read-only entry"""
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.render_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(temp_path, ENTRY_MODE)
+            os.replace(temp_path, pptx_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = {}
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for item in it:
+                    if item.name.startswith('.') or not item.is_file():
+                        continue
+                    stat = item.stat()
+                    key = item.name.rsplit('.', 1)[0]
+                    size, mtime = entries.get(key, (0, 0))
+                    entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+                    total += stat.st_size
+        except FileNotFoundError:
+            return
+
+        if total <= self.max_bytes:
+            return
+
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            for path in self.entry_paths(key):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def render(self, job_type, params, render):
+        """
+        Return a cached render for the job, or run render(params) and cache its result
+        Args:
+            job_type: Render worker job type
+            params: Job params; output_path (a path or binary stream) is required for
+                caching, and link_output allows a hit to be hard-linked (see the module docstring)
+            render: Callable producing the result dict (with 'path') for params
+        """
+        output_path = params.get('output_path')
+        if not self.enabled or params.get('cache') is False or not output_path:
+            return render(params)
+
+        key = self.key(job_type, params)
+        result = self.fetch(key, output_path, link=params.get('link_output') is True)
+        with self.lock:
+            if result is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if result is not None:
+            return result
+
+        if is_stream(output_path):
+            output = TeeOutput(output_path)
+            result = render(dict(params, output_path=output))
+            stored_path, data = None, output.data
+        else:
+            # The old output may be a hard link to a (read-only) cache entry; renderers
+            # write in place, so detach it first
+            if os.path.lexists(output_path):
+                os.unlink(output_path)
+            result = render(params)
+            stored_path, data = result.get('path'), None
+
+        if result.get('success', True) and (stored_path or data):
+            try:
+                self.store(key, stored_path, result, data)
+            except OSError as e:
+                # Caching is an optimization; a full disk must not fail the render
+                print(f"Warning: Could not cache render: {e}", file=sys.stderr)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'directory': self.directory,
+                'max_bytes': self.max_bytes,
+                'generator_version': GENERATOR_VERSION,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Shared process-wide cache used by the render worker
+render_cache = RenderCache()
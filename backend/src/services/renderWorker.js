@@ -0,0 +1,189 @@
+/**
+ * Render Worker Client
+ * Keeps one long-lived renderWorker.py process and multiplexes PowerPoint jobs
+ * over its stdin/stdout so requests no longer pay Python startup per chart.
+ */
+
+const { spawn } = require('child_process');
+const path = require('path');
+const fs = require('fs');
+const crypto = require('crypto');
+
+const HEADER_SIZE = 4;
+// Length flag of a data frame: part of a job's .pptx, sent ahead of its result
+const DATA_FRAME = 0x80000000;
+
+class RenderWorkerClient {
+    constructor() {
+        this.scriptPath = path.join(__dirname, 'renderWorker.py');
+        this.concurrency = parseInt(process.env.RENDER_WORKER_CONCURRENCY || '4', 10);
+        this.process = null;
+        this.buffer = Buffer.alloc(0);
+        this.pending = new Map();
+    }
+
+    /**
+     * Resolve the Python interpreter: backend venv, repo venv, then system python
+     */
+    resolvePython() {
+        const candidates = [
+            path.join(__dirname, '../../venv/bin/python'),
+            path.join(__dirname, '../../../venv/bin/python')
+        ];
+        const venvPython = candidates.find(candidate => fs.existsSync(candidate));
+        if (venvPython) {
+            return venvPython;
+        }
+        return process.platform === 'win32' ? 'python' : 'python3';
+    }
+
+    /**
+     * Start the worker process if it is not already running
+     */
+    start() {
+        if (this.process) {
+            return this.process;
+        }
+
+        const worker = spawn(this.resolvePython(), [
+            this.scriptPath,
+            '--concurrency',
+            String(this.concurrency)
+        ]);
+
+        worker.stdout.on('data', (chunk) => this.handleData(chunk));
+
+        worker.stderr.on('data', (data) => {
+            console.error('Render worker:', data.toString().trim());
+        });
+
+        worker.on('error', (error) => {
+            console.error('Failed to start render worker:', error);
+            this.handleExit(worker, new Error(`Failed to start Python process: ${error.message}`));
+        });
+
+        worker.on('close', (code) => {
+            this.handleExit(worker, new Error(`Render worker exited with code ${code}`));
+        });
+
+        this.process = worker;
+        this.buffer = Buffer.alloc(0);
+        return worker;
+    }
+
+    /**
+     * Split incoming bytes into length-prefixed JSON and data frames
+     */
+    handleData(chunk) {
+        this.buffer = Buffer.concat([this.buffer, chunk]);
+
+        while (this.buffer.length >= HEADER_SIZE) {
+            const header = this.buffer.readUInt32BE(0);
+            const length = (header & ~DATA_FRAME) >>> 0;
+            if (this.buffer.length < HEADER_SIZE + length) {
+                break;
+            }
+
+            const payload = this.buffer.subarray(HEADER_SIZE, HEADER_SIZE + length);
+            this.buffer = this.buffer.subarray(HEADER_SIZE + length);
+
+            if (header & DATA_FRAME) {
+                this.handleDataFrame(payload);
+                continue;
+            }
+
+            let message;
+            try {
+                message = JSON.parse(payload.toString('utf8'));
+            } catch (error) {
+                console.error('Render worker sent invalid JSON:', error);
+                continue;
+            }
+
+            this.handleMessage(message);
+        }
+    }
+
+    /**
+     * Hand part of a job's .pptx (output_path '-') to its onData callback
+     */
+    handleDataFrame(payload) {
+        const idLength = payload[0];
+        const job = this.pending.get(payload.toString('utf8', 1, 1 + idLength));
+        if (job && job.onData) {
+            // Copied so a queued chunk does not pin the whole receive buffer
+            job.onData(Buffer.from(payload.subarray(1 + idLength)));
+        }
+    }
+
+    handleMessage(message) {
+        const job = this.pending.get(message.id);
+        if (!job) {
+            if (message.error) {
+                console.error('Render worker error:', message.error);
+            }
+            return;
+        }
+
+        this.pending.delete(message.id);
+        if (message.success) {
+            job.resolve(message.result);
+        } else {
+            if (message.traceback) {
+                console.error('Render worker traceback:', message.traceback);
+            }
+            job.reject(new Error(message.error || 'Render job failed'));
+        }
+    }
+
+    /**
+     * Fail in-flight jobs when the worker dies; the next job respawns it
+     */
+    handleExit(worker, error) {
+        if (this.process !== worker) {
+            return;
+        }
+        this.process = null;
+        this.pending.forEach(job => job.reject(error));
+        this.pending.clear();
+    }
+
+    /**
+     * Submit a job to the worker
+     * @param {string} type - Job type (quad_chart, fill, replicate, template_info)
+     * @param {Object} params - Job parameters
+     * @param {Object} options - { onData(chunk) }: receives the .pptx bytes of a render job
+     *                           with output_path '-' as they are written; if the job then
+     *                           fails, the bytes already received are not a valid file
+     * @returns {Promise<Object>} Job result
+     */
+    submit(type, params, options = {}) {
+        return new Promise((resolve, reject) => {
+            const worker = this.start();
+            const id = crypto.randomBytes(8).toString('hex');
+            const payload = Buffer.from(JSON.stringify({ id, type, params }), 'utf8');
+            const header = Buffer.alloc(HEADER_SIZE);
+            header.writeUInt32BE(payload.length, 0);
+
+            this.pending.set(id, { resolve, reject, onData: options.onData });
+            worker.stdin.write(Buffer.concat([header, payload]), (error) => {
+                if (error && this.pending.has(id)) {
+                    this.pending.delete(id);
+                    reject(new Error(`Failed to send render job: ${error.message}`));
+                }
+            });
+        });
+    }
+
+    /**
+     * Stop the worker once in-flight jobs have answered
+     */
+    stop() {
+        if (this.process) {
+            this.process.stdin.end();
+        }
+    }
+}
+
+// Export singleton instance
+module.exports = new RenderWorkerClient();
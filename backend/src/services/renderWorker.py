@@ -0,0 +1,460 @@
+#!/usr/bin/env python3
+"""
+Persistent PowerPoint render worker
+Serves quad chart, template fill and template replication jobs from one
+long-lived process so python-pptx/lxml are imported once instead of per request.
+
+Wire format (stdin/stdout or Unix socket): every frame is a 4-byte big-endian
+length followed by that many bytes of UTF-8 JSON.
+
+Request:  {"id": "...", "type": "quad_chart", "params": {...}}
+Response: {"id": "...", "success": true, "result": {...}}
+          {"id": "...", "success": false, "error": "...", "traceback": "..."}
+
+A render job (quad_chart, fill, replicate) with "output_path": "-" sends the
+.pptx itself back instead of writing a file: as it is written, its bytes go
+out in data frames, whose length has the top bit set and whose payload is a
+1-byte job ID length, the job ID and the data. The job's response frame
+follows its last data frame; a failed job's data must be discarded.
+"""
+
+import os
+import sys
+import json
+import socket
+import struct
+import argparse
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Allow importing sibling service scripts regardless of the working directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pptxGenerator import generate_quad_chart, generate_quad_chart_batch, check_text_fit
+from quadChartFiller import fill_template
+from pptxTemplateReplicator import TemplateReplicator, process_template
+from templateCache import template_cache
+from fillPlan import REPLICATOR_PATTERN, get_fill_plan
+from pptxStreamFill import stream_fill
+from renderCache import render_cache
+from analysisCache import analysis_cache
+from mediaOptimizer import OPTIMIZE_ENABLED, optimize_template
+from slidePreview import render_preview
+from submissionStats import get_statistics, submission_snapshot
+from contentSearch import DEFAULT_LIMIT as SEARCH_LIMIT, content_index
+from relatedSections import related_sections
+from sectionIndex import DEFAULT_PAGE_SIZE, section_index
+from contentHtmlCache import content_html
+from templateStore import template_store
+from jobTiming import profile_guard
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024  # 64MB
+# Length flag of a data frame, and the most .pptx bytes sent per frame
+DATA_FRAME = 0x80000000
+DATA_CHUNK_SIZE = 256 * 1024
+# Jobs that can send their .pptx back as data frames
+STREAMED_JOBS = ('quad_chart', 'fill', 'replicate')
+# Seconds between re-index passes over the content files (0 disables them)
+INDEX_REFRESH_SECONDS = float(os.environ.get('INDEX_REFRESH_SECONDS', 60))
+
+
+def read_exact(stream, size):
+    """Read exactly size bytes, returning None on a clean EOF"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise EOFError('Connection closed in the middle of a frame')
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_frame(stream):
+    """Read one length-prefixed JSON frame, or None at end of stream"""
+    header = read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f'Frame of {length} bytes exceeds limit of {MAX_FRAME_SIZE}')
+    payload = read_exact(stream, length)
+    if payload is None:
+        raise EOFError('Connection closed before frame payload')
+    return json.loads(payload.decode('utf-8'))
+
+
+def write_frame(stream, message):
+    """Write one length-prefixed JSON frame"""
+    payload = json.dumps(message, default=str).encode('utf-8')
+    stream.write(HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def write_data_frame(stream, job_id, data):
+    """Write one data frame carrying part of a job's .pptx"""
+    tag = job_id.encode('utf-8')
+    stream.write(HEADER.pack(DATA_FRAME | (1 + len(tag) + len(data))) + bytes([len(tag)]) + tag + data)
+    stream.flush()
+
+
+class DataFrameOutput:
+    """Binary stream a job renders into when its output_path is '-'; sent as data frames"""
+
+    def __init__(self, send):
+        self.send = send
+        self.pending = bytearray()
+        self.position = 0
+
+    def write(self, data):
+        self.pending += data
+        self.position += len(data)
+        if len(self.pending) >= DATA_CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        if self.pending:
+            self.send(bytes(self.pending))
+            self.pending.clear()
+
+
+# Job handlers - each takes the request params and returns a JSON-able result
+
+def render_quad_chart(params):
+    return generate_quad_chart(params['data'], params.get('output_path'), params.get('compression'))
+
+
+def handle_quad_chart(params):
+    return render_cache.render('quad_chart', params, render_quad_chart)
+
+
+def handle_quad_chart_batch(params):
+    return generate_quad_chart_batch(
+        params['records'],
+        output_path=params.get('output_path'),
+        output_dir=params.get('output_dir'),
+        combined=params.get('combined', True),
+        compression=params.get('compression')
+    )
+
+
+def render_fill(params):
+    if params.get('stream'):
+        return stream_fill(params['template_path'], params['data'], params['output_path'], 'fill',
+                           params.get('compression'))
+    return fill_template(params['template_path'], params['data'], params['output_path'], params.get('compression'))
+
+
+def handle_fill(params):
+    return render_cache.render('fill', params, render_fill)
+
+
+def render_replicate(params):
+    if params.get('stream'):
+        return stream_fill(params['template_path'], params['data'], params.get('output_path'), 'replicate',
+                           params.get('compression'))
+    return process_template(params['template_path'], params['data'], params.get('output_path'),
+                            params.get('compression'))
+
+
+def handle_replicate(params):
+    return render_cache.render('replicate', params, render_replicate)
+
+
+def handle_template_info(params):
+    replicator = TemplateReplicator(params['template_path'])
+    # Served from the analysis cache; only new or edited slides are analyzed
+    info = replicator.get_template_info()
+    # Registration compiles the data-independent {{KEY}} fill plan into the template cache,
+    # so the first replicate job skips it (filler plans depend on the data keys; see fillPlan)
+    replicator.load_template()
+    get_fill_plan(replicator.template_hash, replicator.presentation, REPLICATOR_PATTERN)
+    return info
+
+
+def handle_optimize_media(params):
+    if not OPTIMIZE_ENABLED:
+        return {'success': True, 'path': params['template_path'], 'skipped': True}
+    return optimize_template(params['template_path'], params.get('output_path'))
+
+
+def handle_preview(params):
+    return render_preview(
+        params['template_path'],
+        data=params.get('data'),
+        slide_index=params.get('slide', 0),
+        sizes=params.get('sizes')
+    )
+
+
+def handle_text_fit(params):
+    return check_text_fit(params['data'])
+
+
+def handle_statistics(params):
+    return get_statistics(params.get('filters'))
+
+
+def handle_search(params):
+    return content_index.search(params['query'], limit=params.get('limit', SEARCH_LIMIT))
+
+
+def handle_related(params):
+    return related_sections.related(params['document'], section=params.get('section'), limit=params.get('limit'))
+
+
+def handle_related_build(params):
+    return related_sections.build(rebuild=params.get('rebuild', False))
+
+
+def handle_document_toc(params):
+    return section_index.toc(params['path'])
+
+
+def handle_document_read(params):
+    if params.get('section'):
+        return section_index.section(params['path'], params['section'])
+    return section_index.page(params['path'], params.get('page', 0), params.get('page_size', DEFAULT_PAGE_SIZE))
+
+
+def handle_rendered_html(params):
+    return content_html.get(params['document'])
+
+
+def handle_template_store(params):
+    return template_store.put(params['template_id'], params['template_path'], parent=params.get('parent_id'))
+
+
+def handle_template_clone(params):
+    return template_store.clone(params['source_id'], params['template_id'])
+
+
+def handle_template_checkout(params):
+    return template_store.checkout(params['template_id'])
+
+
+def handle_template_diff(params):
+    return {
+        'success': True,
+        'diffs': [template_store.diff(old_id, new_id) for old_id, new_id in params['pairs']]
+    }
+
+
+def handle_template_remove(params):
+    return template_store.remove(params['template_id'])
+
+
+def handle_ping(params):
+    return {
+        'success': True,
+        'pid': os.getpid(),
+        'template_cache': template_cache.stats(),
+        'render_cache': render_cache.stats(),
+        'analysis_cache': analysis_cache.stats(),
+        'submission_snapshot': submission_snapshot.stats(),
+        'content_index': content_index.stats(),
+        'related_sections': related_sections.stats(),
+        'section_index': section_index.stats(),
+        'content_html': content_html.stats(),
+        'template_store': template_store.stats()
+    }
+
+
+JOB_HANDLERS = {
+    'quad_chart': handle_quad_chart,
+    'quad_chart_batch': handle_quad_chart_batch,
+    'fill': handle_fill,
+    'replicate': handle_replicate,
+    'template_info': handle_template_info,
+    'optimize_media': handle_optimize_media,
+    'preview': handle_preview,
+    'text_fit': handle_text_fit,
+    'statistics': handle_statistics,
+    'search': handle_search,
+    'related': handle_related,
+    'related_build': handle_related_build,
+    'document_toc': handle_document_toc,
+    'document_read': handle_document_read,
+    'rendered_html': handle_rendered_html,
+    'template_store': handle_template_store,
+    'template_clone': handle_template_clone,
+    'template_checkout': handle_template_checkout,
+    'template_diff': handle_template_diff,
+    'template_remove': handle_template_remove,
+    'ping': handle_ping
+}
+
+
+def run_job(request, send_data=None):
+    """
+    Execute a single job and build its response frame
+    Args:
+        request: Request frame
+        send_data: Callable(job_id, bytes) writing a data frame, for output_path '-'
+    """
+    job_id = request.get('id')
+    job_type = request.get('type')
+    handler = JOB_HANDLERS.get(job_type)
+    params = request.get('params') or {}
+
+    if handler is None:
+        return {
+            'id': job_id,
+            'success': False,
+            'error': f'Unknown job type: {job_type}'
+        }
+
+    try:
+        # Profiled jobs run one at a time so each profile covers exactly one job
+        output = None
+        if send_data is not None and job_type in STREAMED_JOBS and params.get('output_path') == '-':
+            output = DataFrameOutput(lambda data: send_data(job_id, data))
+            params = dict(params, output_path=output)
+        with profile_guard():
+            result = handler(params)
+        if output is not None:
+            output.flush()
+        return {'id': job_id, 'success': True, 'result': result}
+    except Exception as e:
+        return {
+            'id': job_id,
+            'success': False,
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        }
+
+
+class RenderWorker:
+    def __init__(self, concurrency=4, index_refresh=INDEX_REFRESH_SECONDS):
+        """
+        Create a worker that runs up to `concurrency` jobs at once
+        Args:
+            concurrency: Maximum number of jobs run at once
+            index_refresh: Seconds between content index refreshes (0 disables them)
+        """
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.stopped = threading.Event()
+        if index_refresh > 0:
+            threading.Thread(target=self.refresh_indexes, args=(index_refresh,), daemon=True).start()
+
+    def refresh_indexes(self, interval):
+        """Re-index changed content files every interval seconds, off the request path"""
+        while not self.stopped.wait(interval):
+            for name, refresh in (('content index', content_index.refresh),
+                                  ('related sections', related_sections.refresh)):
+                try:
+                    refresh()
+                except Exception as e:
+                    print(f"Warning: Could not refresh the {name}: {e}", file=sys.stderr)
+
+    def serve_stream(self, reader, writer):
+        """Serve frames from reader until EOF, replying on writer"""
+        write_lock = threading.Lock()
+        # Jobs whose reply frame has not been written yet; signalled as each reply lands
+        outstanding = [0]
+        replied = threading.Condition()
+
+        def send_data(job_id, data):
+            with write_lock:
+                write_data_frame(writer, job_id, data)
+
+        def reply(future):
+            try:
+                with write_lock:
+                    write_frame(writer, future.result())
+            finally:
+                with replied:
+                    outstanding[0] -= 1
+                    replied.notify_all()
+
+        while True:
+            try:
+                request = read_frame(reader)
+            except (ValueError, EOFError) as e:
+                # A malformed frame leaves the stream out of sync; stop serving it
+                with write_lock:
+                    write_frame(writer, {'id': None, 'success': False, 'error': str(e)})
+                break
+
+            if request is None:
+                break
+
+            with replied:
+                outstanding[0] += 1
+            self.executor.submit(run_job, request, send_data).add_done_callback(reply)
+
+        # Let in-flight jobs write their replies before the stream is closed
+        with replied:
+            replied.wait_for(lambda: outstanding[0] == 0)
+
+    def serve_stdio(self):
+        """Serve jobs over stdin/stdout"""
+        reader = sys.stdin.buffer
+        writer = sys.stdout.buffer
+        # Anything the render code prints must not corrupt the frame stream
+        sys.stdout = sys.stderr
+        self.serve_stream(reader, writer)
+
+    def serve_socket(self, socket_path):
+        """Serve jobs over a Unix domain socket, one thread per connection"""
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen()
+        sys.stdout = sys.stderr
+        print(f"Render worker listening on {socket_path}", file=sys.stderr)
+
+        def handle_connection(conn):
+            with conn, conn.makefile('rb') as reader, conn.makefile('wb') as writer:
+                self.serve_stream(reader, writer)
+
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=handle_connection, args=(conn,), daemon=True).start()
+        finally:
+            server.close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    def shutdown(self):
+        self.stopped.set()
+        self.executor.shutdown(wait=True)
+
+
+def main():
+    """Main function for command-line execution"""
+    parser = argparse.ArgumentParser(description='Persistent PowerPoint render worker')
+    parser.add_argument('--socket', help='Listen on this Unix socket path instead of stdin/stdout')
+    parser.add_argument('--concurrency', type=int,
+                        default=int(os.environ.get('RENDER_WORKER_CONCURRENCY', 4)),
+                        help='Maximum number of jobs rendered at once')
+    parser.add_argument('--index-refresh', type=float, default=INDEX_REFRESH_SECONDS,
+                        help='Seconds between content index refreshes (0 disables them)')
+    args = parser.parse_args()
+
+    worker = RenderWorker(concurrency=args.concurrency, index_refresh=args.index_refresh)
+    try:
+        if args.socket:
+            worker.serve_socket(args.socket)
+        else:
+            worker.serve_stdio()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.shutdown()
+
+
+if __name__ == "__main__":
+    main()
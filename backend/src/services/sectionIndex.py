@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Byte-offset section index for content documents
+Each markdown/text document gets a stored index of its sections (heading path,
+byte offset and length) plus a nested table of contents. Readers memory-map the
+document and copy out only the byte range of the section or page of sections
+asked for, so serving part of a large document never reads the rest of it.
+
+An index is checked against the file on every read: a changed size or mtime
+makes it re-hash the file, and a changed hash rebuilds the index.
+"""
+
+import os
+import sys
+import json
+import mmap
+import tempfile
+import threading
+
+from contentSections import DEFAULT_CONTENT_ROOT, content_files, file_hash, read_sections, read_text
+from jobIO import pop_option
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SECTION_INDEX_DIR = os.environ.get(
+    'SECTION_INDEX_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'section_index')
+)
+
+# Format of the stored indexes; bump to rebuild them all
+SECTION_INDEX_VERSION = 2
+DEFAULT_PAGE_SIZE = 20
+
+
+def byte_ranges(path, sections):
+    """
+    Convert the sections' character offsets to byte offsets
+    Returns:
+        [(offset, length)] in bytes, in section order
+    """
+    text = read_text(path)
+    ranges = []
+    char_position = byte_position = 0
+    for section in sections:
+        byte_position += len(text[char_position:section['start']].encode('utf-8', errors='surrogateescape'))
+        length = len(text[section['start']:section['end']].encode('utf-8', errors='surrogateescape'))
+        ranges.append((byte_position, length))
+        char_position = section['end']
+        byte_position += length
+    return ranges
+
+
+def build_toc(sections):
+    """Nested table of contents from flat sections with heading levels"""
+    toc = []
+    stack = []
+    for section in sections:
+        node = {'id': section['id'], 'title': section['title'], 'level': section['level'], 'children': []}
+        while stack and stack[-1]['level'] >= section['level']:
+            stack.pop()
+        (stack[-1]['children'] if stack else toc).append(node)
+        stack.append(node)
+    return toc
+
+
+class SectionIndex:
+    def __init__(self, root=DEFAULT_CONTENT_ROOT, directory=DEFAULT_SECTION_INDEX_DIR):
+        """
+        Initialize the index store
+        Args:
+            root: Content root the document paths are relative to
+            directory: Where the per-document indexes are stored
+        """
+        self.root = os.path.abspath(root)
+        self.directory = os.path.abspath(directory)
+        self.lock = threading.Lock()
+        self.indexes = {}
+        self.builds = 0
+        self.reads = 0
+
+    def relative_path(self, document):
+        """Corpus-relative path of a document given by relative or absolute path"""
+        path = os.path.abspath(os.path.join(self.root, document))
+        relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+        if relative.startswith('../') or not os.path.isfile(path):
+            raise FileNotFoundError(f'Document not found: {document}')
+        if not relative.endswith(('.md', '.txt')):
+            raise ValueError(f'Not a content document: {document}')
+        return relative
+
+    def index_path(self, relative):
+        return os.path.join(self.directory, relative.replace('/', '__') + '.json')
+
+    def read_stored(self, relative):
+        try:
+            with open(self.index_path(relative), encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return index if index.get('version') == SECTION_INDEX_VERSION else None
+
+    def write_stored(self, relative, index):
+        """Write an index atomically so concurrent readers never see a partial file"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.sections_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(index, f, separators=(',', ':'))
+            os.replace(temp_path, self.index_path(relative))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def build(self, relative, stat, digest):
+        """Section offsets and TOC of one document"""
+        path = os.path.join(self.root, relative)
+        sections = read_sections(path, relative)
+        ranges = byte_ranges(path, sections)
+
+        # Heading path: titles of the enclosing sections, outermost first
+        entries = []
+        stack = []
+        for section, (offset, length) in zip(sections, ranges):
+            while stack and stack[-1]['level'] >= section['level']:
+                stack.pop()
+            entries.append({
+                'id': section['id'],
+                'title': section['title'],
+                'level': section['level'],
+                'path': [parent['title'] for parent in stack] + [section['title']],
+                'line': section['line'],
+                'offset': offset,
+                'length': length
+            })
+            stack.append(section)
+
+        self.builds += 1
+        return {
+            'version': SECTION_INDEX_VERSION,
+            'file': relative,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': digest,
+            'sections': entries,
+            'toc': build_toc(sections)
+        }
+
+    def get(self, document):
+        """
+        Current index of a document, rebuilding it if the file changed
+        Returns:
+            Index dict with 'sections' (heading path, offset, length) and 'toc'
+        """
+        relative = self.relative_path(document)
+        stat = os.stat(os.path.join(self.root, relative))
+        with self.lock:
+            index = self.indexes.get(relative) or self.read_stored(relative)
+            if index and index['size'] == stat.st_size and index['mtime'] == stat.st_mtime_ns:
+                self.indexes[relative] = index
+                return index
+
+            digest = file_hash(os.path.join(self.root, relative))
+            if not (index and index['hash'] == digest):
+                index = self.build(relative, stat, digest)
+            index['size'], index['mtime'] = stat.st_size, stat.st_mtime_ns
+            self.write_stored(relative, index)
+            self.indexes[relative] = index
+            return index
+
+    def read_range(self, relative, offset, length):
+        """Bytes [offset, offset + length) of a document through mmap"""
+        if length <= 0:
+            return ''
+        with open(os.path.join(self.root, relative), 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                data = mapped[offset:offset + length]
+        self.reads += 1
+        return data.decode('utf-8', errors='replace')
+
+    def toc(self, document):
+        """Table of contents and section count of a document"""
+        index = self.get(document)
+        return {
+            'success': True,
+            'file': index['file'],
+            'hash': index['hash'],
+            'size': index['size'],
+            'sections': len(index['sections']),
+            'toc': index['toc']
+        }
+
+    def section(self, document, section_id):
+        """One section's text, with its heading path"""
+        index = self.get(document)
+        entry = next((entry for entry in index['sections'] if entry['id'] == section_id), None)
+        if entry is None:
+            raise LookupError(f"Section not found: {index['file']}#{section_id}")
+        return {
+            'success': True,
+            'file': index['file'],
+            'hash': index['hash'],
+            'section': {key: entry[key] for key in ('id', 'title', 'level', 'path', 'line')},
+            'content': self.read_range(index['file'], entry['offset'], entry['length'])
+        }
+
+    def page(self, document, page=0, page_size=DEFAULT_PAGE_SIZE):
+        """
+        A run of consecutive sections, read as one byte range
+        Args:
+            document: Document path
+            page: Zero-based page number
+            page_size: Sections per page
+        """
+        index = self.get(document)
+        entries = index['sections'][page * page_size:(page + 1) * page_size]
+        content = ''
+        if entries:
+            start = entries[0]['offset']
+            content = self.read_range(index['file'], start, entries[-1]['offset'] + entries[-1]['length'] - start)
+        return {
+            'success': True,
+            'file': index['file'],
+            'hash': index['hash'],
+            'page': page,
+            'page_size': page_size,
+            'total_sections': len(index['sections']),
+            'has_more': (page + 1) * page_size < len(index['sections']),
+            'sections': [{key: entry[key] for key in ('id', 'title', 'level')} for entry in entries],
+            'content': content
+        }
+
+    def build_all(self):
+        """Bring the index of every content document up to date"""
+        builds = self.builds
+        files = content_files(self.root)
+        for relative in files:
+            self.get(relative)
+        return {'success': True, 'documents': len(files), 'rebuilt': self.builds - builds}
+
+    def stats(self):
+        return {
+            'documents': len(self.indexes),
+            'builds': self.builds,
+            'reads': self.reads
+        }
+
+
+# Process-wide index shared by the render worker's jobs
+section_index = SectionIndex()
+
+
+def main():
+    """Main function for command-line execution"""
+    args = sys.argv[1:]
+    page_size = pop_option(args, 'page-size')
+
+    commands = {'build': 1, 'toc': 2, 'section': 3, 'page': 3}
+    if not args or args[0] not in commands or len(args) < commands[args[0]]:
+        print("Usage: python sectionIndex.py build")
+        print("       python sectionIndex.py toc <document>")
+        print("       python sectionIndex.py section <document> <section_id>")
+        print("       python sectionIndex.py page <document> <page> [--page-size=N]")
+        sys.exit(1)
+
+    try:
+        command = args[0]
+        if command == 'build':
+            result = section_index.build_all()
+        elif command == 'toc':
+            result = section_index.toc(args[1])
+        elif command == 'section':
+            result = section_index.section(args[1], args[2])
+        else:
+            result = section_index.page(args[1], int(args[2]), int(page_size) if page_size else DEFAULT_PAGE_SIZE)
+        print(json.dumps(result, indent=2))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
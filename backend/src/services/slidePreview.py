@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Slide thumbnail renderer
+Rasterizes a slide with Pillow from the shape data analyzeTemplate.analyze_shape
+already extracts (geometry, fills, lines, text, tables, pictures), so previews
+need neither LibreOffice nor a headless browser. It is an approximation of
+PowerPoint's rendering, good enough for picking a template or checking a
+filled chart at a glance.
+
+Thumbnails are cached as PNGs under a render hash covering the template
+content, the fill data, the slide and the renderer version; a repeat request
+for the same chart is a file lookup.
+"""
+
+import io
+import os
+import sys
+import json
+import hashlib
+import tempfile
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from templateCache import template_cache
+from analysisCache import analysis_cache
+from renderCache import GENERATOR_VERSION, normalize
+from jobTiming import JobTimer
+from jobIO import pop_option, read_job_data
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PREVIEW_DIR = os.environ.get(
+    'PREVIEW_CACHE_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'previews')
+)
+
+# Thumbnail widths in pixels; the height follows the slide's aspect ratio
+THUMBNAIL_SIZES = {'small': 320, 'medium': 800, 'large': 1600}
+DEFAULT_SIZES = ('small', 'medium')
+# Bounds for explicit pixel widths; the canvas is allocated in the shared worker
+MIN_THUMBNAIL_WIDTH = 16
+MAX_THUMBNAIL_WIDTH = max(THUMBNAIL_SIZES.values())
+
+EMU_PER_POINT = 12700
+DEFAULT_FONT_PT = 18
+TITLE_FONT_PT = 40
+LINE_SPACING = 1.2
+LEVEL_INDENT = 342900  # 0.375" per outline level
+
+# Default text frame insets (0.1" left/right, 0.05" top/bottom)
+DEFAULT_MARGIN_X = 91440
+DEFAULT_MARGIN_Y = 45720
+
+PICTURE_PLACEHOLDER = (220, 220, 220)
+TABLE_BORDER = (160, 160, 160)
+TEXT_COLOR = (0, 0, 0)
+
+FONT_CANDIDATES = {
+    False: [
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+        '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+        '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+        '/Library/Fonts/Arial.ttf',
+        'C:\\Windows\\Fonts\\arial.ttf'
+    ],
+    True: [
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+        '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf',
+        '/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf',
+        '/Library/Fonts/Arial Bold.ttf',
+        'C:\\Windows\\Fonts\\arialbd.ttf'
+    ]
+}
+
+# Renderer code; editing any of these invalidates cached thumbnails
+PREVIEW_SOURCES = ['slidePreview.py', 'analyzeTemplate.py']
+
+
+def preview_version():
+    """Hash of the renderer sources and the generator version (fills change what is drawn)"""
+    digest = hashlib.sha256(GENERATOR_VERSION.encode('utf-8'))
+    for name in PREVIEW_SOURCES:
+        path = os.path.join(SERVICES_DIR, name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(name.encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()[:16]
+
+
+PREVIEW_VERSION = preview_version()
+
+
+def font_path(bold):
+    """First installed font file for the weight (PREVIEW_FONT / PREVIEW_FONT_BOLD override the search)"""
+    override = os.environ.get('PREVIEW_FONT_BOLD' if bold else 'PREVIEW_FONT')
+    candidates = ([override] if override else []) + FONT_CANDIDATES[bold]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@lru_cache(maxsize=128)
+def load_font(size_px, bold):
+    """
+    Return (font, synthetic_bold) for a pixel size
+    Without an installed bold face, bold text is drawn with a stroke instead.
+    """
+    path = font_path(bold)
+    if path:
+        return ImageFont.truetype(path, size_px), False
+    regular = font_path(False)
+    if regular:
+        return ImageFont.truetype(regular, size_px), bold
+    return ImageFont.load_default(size_px), bold
+
+
+def parse_color(value, default=None):
+    """'RRGGBB' string from the analysis to an RGB tuple"""
+    if not value or len(value) != 6:
+        return default
+    try:
+        return tuple(int(value[idx:idx + 2], 16) for idx in (0, 2, 4))
+    except ValueError:
+        return default
+
+
+def scaled_box(shape, scale, offset=(0, 0)):
+    """Pixel box (x0, y0, x1, y1) for a shape, or None when its geometry is unknown"""
+    left, top, width, height = (shape.get(name) for name in ('left', 'top', 'width', 'height'))
+    if None in (left, top, width, height):
+        return None
+    x0 = (left + offset[0]) * scale
+    y0 = (top + offset[1]) * scale
+    return (x0, y0, x0 + width * scale, y0 + height * scale)
+
+
+def paragraph_style(paragraph, default_size):
+    """Font size (pt), bold and color for a paragraph, taken from its first run"""
+    style = {'size': default_size, 'bold': False, 'color': None}
+    fonts = [paragraph.get('font')] + [run.get('font') for run in paragraph.get('runs', [])[:1]]
+    for font in fonts:
+        if not font:
+            continue
+        style['size'] = font.get('size', style['size'])
+        style['bold'] = font.get('bold', style['bold'])
+        style['color'] = font.get('color', style['color'])
+    return style
+
+
+def wrap_text(text, font, max_width):
+    """Greedy word wrap of one paragraph into lines no wider than max_width"""
+    lines = []
+    for segment in text.split('\n'):
+        line = ''
+        for word in segment.split(' '):
+            candidate = f'{line} {word}' if line else word
+            if not line or font.getlength(candidate) <= max_width:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+    return lines
+
+
+def draw_text_frame(draw, text_frame, box, scale, default_size):
+    """Draw a text frame's paragraphs top-down inside box"""
+    if not text_frame or not text_frame.get('text'):
+        return
+
+    margin_x = text_frame.get('margin_left')
+    margin_x = DEFAULT_MARGIN_X if margin_x is None else margin_x
+    margin_right = text_frame.get('margin_right')
+    margin_right = DEFAULT_MARGIN_X if margin_right is None else margin_right
+    margin_top = text_frame.get('margin_top')
+    margin_top = DEFAULT_MARGIN_Y if margin_top is None else margin_top
+
+    x0 = box[0] + margin_x * scale
+    x1 = box[2] - margin_right * scale
+    y = box[1] + margin_top * scale
+    wrap = text_frame.get('word_wrap') is not False
+
+    for paragraph in text_frame.get('paragraphs', []):
+        style = paragraph_style(paragraph, default_size)
+        size_px = max(1, round(style['size'] * EMU_PER_POINT * scale))
+        line_height = size_px * LINE_SPACING
+        text = paragraph.get('text', '')
+        if not text:
+            y += line_height
+            continue
+
+        font, synthetic_bold = load_font(size_px, bool(style['bold']))
+        indent = (paragraph.get('level') or 0) * LEVEL_INDENT * scale
+        left = x0 + indent
+        width = max(1, x1 - left)
+        alignment = paragraph.get('alignment') or ''
+        color = parse_color(style['color'], TEXT_COLOR)
+
+        for line in (wrap_text(text, font, width) if wrap else text.split('\n')):
+            if alignment.startswith('CENTER'):
+                x = left + (width - font.getlength(line)) / 2
+            elif alignment.startswith('RIGHT'):
+                x = left + width - font.getlength(line)
+            else:
+                x = left
+            draw.text((x, y), line, font=font, fill=color,
+                      stroke_width=1 if synthetic_bold and size_px >= 10 else 0, stroke_fill=color)
+            y += line_height
+
+
+def draw_table(draw, table, box, scale):
+    """Draw a table as an even grid with its cell text"""
+    rows, columns = table.get('rows') or 0, table.get('columns') or 0
+    if not rows or not columns:
+        return
+
+    cell_width = (box[2] - box[0]) / columns
+    cell_height = (box[3] - box[1]) / rows
+    for cell in table.get('cells', []):
+        cell_box = (
+            box[0] + cell['col'] * cell_width,
+            box[1] + cell['row'] * cell_height,
+            box[0] + (cell['col'] + 1) * cell_width,
+            box[1] + (cell['row'] + 1) * cell_height
+        )
+        draw.rectangle(cell_box, outline=TABLE_BORDER)
+        draw_text_frame(draw, cell.get('text_frame'), cell_box, scale, DEFAULT_FONT_PT)
+
+
+def draw_picture(image, draw, box, blob):
+    """Paste the picture scaled to its box, or a grey placeholder if it cannot be decoded"""
+    size = (max(1, round(box[2] - box[0])), max(1, round(box[3] - box[1])))
+    try:
+        picture = Image.open(io.BytesIO(blob))
+        # Let JPEG decode at a reduced scale when the box is much smaller than the image
+        picture.draft('RGB', size)
+        picture = picture.convert('RGBA').resize(size, Image.Resampling.BILINEAR)
+        image.paste(picture, (round(box[0]), round(box[1])), picture)
+    except Exception:
+        draw.rectangle(box, fill=PICTURE_PLACEHOLDER)
+
+
+def is_title(shape):
+    return str(shape.get('shape_type', '')).startswith('PLACEHOLDER') and 'Title' in (shape.get('name') or '')
+
+
+def draw_shape(image, draw, shape, scale, images, key=''):
+    """Draw one analyzed shape (and the children of a group)"""
+    key = f"{key}{shape.get('index')}"
+
+    if shape.get('is_group'):
+        for child in shape.get('shapes', []):
+            draw_shape(image, draw, child, scale, images, f'{key}.')
+        return
+
+    box = scaled_box(shape, scale)
+    if box is None or box[2] <= box[0] or box[3] <= box[1]:
+        return
+
+    fill = shape.get('fill') or {}
+    fill_color = parse_color(fill.get('fore_color')) if str(fill.get('type', '')).startswith('SOLID') else None
+    line = shape.get('line') or {}
+    line_color = parse_color(line.get('color'))
+    line_width = max(1, round((line.get('width') or EMU_PER_POINT) * scale)) if line_color else 0
+
+    if shape.get('is_picture'):
+        blob = images.get(key)
+        if blob:
+            draw_picture(image, draw, box, blob)
+        else:
+            draw.rectangle(box, fill=PICTURE_PLACEHOLDER)
+    elif fill_color or line_color:
+        draw.rectangle(box, fill=fill_color, outline=line_color, width=line_width)
+
+    if shape.get('is_table'):
+        draw_table(draw, shape['table'], box, scale)
+    else:
+        draw_text_frame(draw, shape.get('text_frame'), box, scale, TITLE_FONT_PT if is_title(shape) else DEFAULT_FONT_PT)
+
+
+def render_slide(shapes, slide_width, slide_height, width, images=None):
+    """
+    Rasterize analyzed shapes into an RGB image
+    Args:
+        shapes: analyze_shape dicts for the slide, in z-order
+        slide_width, slide_height: Slide size in EMU
+        width: Image width in pixels
+        images: Picture bytes keyed by shape index path ('3', or '2.0' inside a group)
+    """
+    scale = width / slide_width
+    image = Image.new('RGB', (width, max(1, round(slide_height * scale))), 'white')
+    draw = ImageDraw.Draw(image)
+    for shape in shapes:
+        draw_shape(image, draw, shape, scale, images or {})
+    return image
+
+
+def picture_blobs(shapes, key=''):
+    """Picture bytes keyed like draw_shape keys them"""
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+    blobs = {}
+    for idx, shape in enumerate(shapes):
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            blobs.update(picture_blobs(shape.shapes, f'{key}{idx}.'))
+        elif shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+            try:
+                blobs[f'{key}{idx}'] = shape.image.blob
+            except Exception:
+                pass
+    return blobs
+
+
+def has_pictures(shapes):
+    return any(shape.get('is_picture') or has_pictures(shape.get('shapes', [])) for shape in shapes)
+
+
+def resolve_sizes(sizes):
+    """Size names or pixel widths to {label: width}"""
+    resolved = {}
+    for size in sizes or DEFAULT_SIZES:
+        if isinstance(size, int) or str(size).isdigit():
+            width = int(size)
+            if not MIN_THUMBNAIL_WIDTH <= width <= MAX_THUMBNAIL_WIDTH:
+                raise ValueError(
+                    f'Thumbnail width {width} out of range ({MIN_THUMBNAIL_WIDTH}-{MAX_THUMBNAIL_WIDTH})'
+                )
+            resolved[str(size)] = width
+        elif size in THUMBNAIL_SIZES:
+            resolved[size] = THUMBNAIL_SIZES[size]
+        else:
+            raise ValueError(f"Unknown thumbnail size '{size}' (expected {', '.join(THUMBNAIL_SIZES)} or a width)")
+    return resolved
+
+
+def preview_key(template_path, data, slide_index):
+    """Render hash for a slide of a (possibly filled) template"""
+    material = normalize({
+        'template': template_cache.content_hash(template_path),
+        'data': data,
+        'slide': slide_index,
+        'version': PREVIEW_VERSION
+    })
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def slide_shapes(template_path, data, slide_index):
+    """
+    Return (shapes, slide size, picture loader) for the slide to draw
+    An unfilled template is drawn from the analysis cache and only loaded if it
+    has pictures; a filled chart is filled in memory and analyzed directly.
+    """
+    from analyzeTemplate import analyze_shape
+
+    if not data:
+        analysis = analysis_cache.analysis(template_path)
+        shapes = analysis['slides'][slide_index]['shapes']
+        size = (analysis['slide_width'], analysis['slide_height'])
+
+        def images():
+            return picture_blobs(template_cache.load(template_path).slides[slide_index].shapes)
+        return shapes, size, images
+
+    from quadChartFiller import QuadChartFiller
+
+    filler = QuadChartFiller(template_path)
+    filler.fill_quad_chart(data)
+    presentation = filler.presentation
+    slide = presentation.slides[slide_index]
+    shapes = [analyze_shape(shape, idx) for idx, shape in enumerate(slide.shapes)]
+    return shapes, (presentation.slide_width, presentation.slide_height), lambda: picture_blobs(slide.shapes)
+
+
+def write_png(image, path):
+    """Write a PNG atomically so concurrent requests never serve a partial file"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.preview_', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, 'PNG', optimize=False, compress_level=1)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def render_preview(template_path, data=None, slide_index=0, sizes=None, output_dir=DEFAULT_PREVIEW_DIR):
+    """
+    Render (or fetch cached) PNG thumbnails of one slide
+    Args:
+        template_path: Template .pptx
+        data: Placeholder mapping to fill first (as for quadChartFiller), or None for the bare template
+        slide_index: Zero-based slide to draw
+        sizes: Size names ('small', 'medium', 'large') or pixel widths
+        output_dir: Thumbnail cache directory
+    Returns:
+        {'success', 'hash', 'cached', 'thumbnails': {size: path}, 'timing'}
+    """
+    timer = JobTimer('preview')
+    widths = resolve_sizes(sizes)
+    output_dir = os.path.abspath(output_dir)
+    key = preview_key(template_path, data, slide_index)
+    paths = {label: os.path.join(output_dir, f'{key}_{width}.png') for label, width in widths.items()}
+
+    cached = all(os.path.exists(path) for path in paths.values())
+    if not cached:
+        with timer.phase('load'):
+            shapes, (slide_width, slide_height), load_images = slide_shapes(template_path, data, slide_index)
+            images = load_images() if has_pictures(shapes) else {}
+
+        # Draw once at the largest size; smaller thumbnails are downsampled from it
+        with timer.phase('draw'):
+            largest = render_slide(shapes, slide_width, slide_height, max(widths.values()), images)
+
+        with timer.phase('save'):
+            os.makedirs(output_dir, exist_ok=True)
+            for label, width in widths.items():
+                if os.path.exists(paths[label]):
+                    continue
+                if width == largest.width:
+                    thumbnail = largest
+                else:
+                    height = max(1, round(largest.height * width / largest.width))
+                    thumbnail = largest.resize((width, height), Image.Resampling.LANCZOS)
+                write_png(thumbnail, paths[label])
+
+    result = {
+        'success': True,
+        'hash': key,
+        'slide': slide_index,
+        'cached': cached,
+        'thumbnails': paths
+    }
+    result.update(timer.finish())
+    return result
+
+
+def main():
+    """Main function for command-line execution"""
+    args = sys.argv[1:]
+    slide = pop_option(args, 'slide')
+    sizes = pop_option(args, 'sizes')
+    output_dir = pop_option(args, 'output-dir')
+
+    if len(args) < 1:
+        print("Usage: python slidePreview.py <template_path> [data_json|-|fd:N] "
+              "[--slide=N] [--sizes=small,medium,large] [--output-dir=DIR]")
+        sys.exit(1)
+
+    try:
+        result = render_preview(
+            args[0],
+            data=read_job_data(args[1]) if len(args) > 1 else None,
+            slide_index=int(slide or 0),
+            sizes=sizes.split(',') if sizes else None,
+            output_dir=output_dir or DEFAULT_PREVIEW_DIR
+        )
+        print(json.dumps(result))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Streaming Excel export of quad chart submissions
+Rows are read from the SQLite database in batches and written straight into
+an xlsxwriter workbook in constant_memory mode, so memory use stays flat no
+matter how many submissions are exported. Filters match
+DataAggregator.buildWhereClause (startDate/endDate, status, userId,
+companyName) and the default columns match DataAggregator.exportAllSubmissions.
+"""
+
+import os
+import sys
+import json
+import sqlite3
+from datetime import datetime, timezone
+
+import xlsxwriter
+
+from jobTiming import JobTimer
+from jobIO import is_stdout, pop_option, print_result, read_job_data
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE = os.environ.get(
+    'SUBMISSIONS_DATABASE',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'database.sqlite')
+)
+DEFAULT_REPORTS_DIR = os.path.join(SERVICES_DIR, '..', '..', '..', 'reports')
+BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+HEADER_FORMAT = {'bold': True, 'bg_color': '#E0E0E0', 'pattern': 1}
+
+# key -> (header, column width, SQL expression); dates are exported as YYYY-MM-DD.
+# ID and version are numbers; every other column is written as text.
+# Sequelize stores DATETIMEs as 'YYYY-MM-DD HH:MM:SS.SSS +00:00', so the date is the first 10 characters.
+COLUMNS = {
+    'id': ('ID', 10, 's.id'),
+    'opportunityName': ('Opportunity Name', 30, 's.opportunity_name'),
+    'companyName': ('Company Name', 25, 's.company_name'),
+    'clientName': ('Client Name', 25, 's.client_name'),
+    'contractValue': ('Contract Value', 15, 's.contract_value'),
+    'status': ('Status', 12, 's.status'),
+    'versionNumber': ('Version', 10, 's.version_number'),
+    'createdBy': ('Created By', 20, 'u.name'),
+    'createdAt': ('Created Date', 15, 'substr(s.created_at, 1, 10)'),
+    'submittedAt': ('Submitted Date', 15, 'substr(s.submitted_at, 1, 10)'),
+    'approvedAt': ('Approved Date', 15, 'substr(s.approved_at, 1, 10)'),
+    'templateName': ('Template', 25, 's.template_name'),
+    'creatorEmail': ('Creator Email', 30, 'u.email'),
+    'technicalPoc': ('Technical POC', 20, 's.technical_poc'),
+    'email': ('Email', 25, 's.email'),
+    'phone': ('Phone', 15, 's.phone'),
+    'submissionDate': ('Submission Date', 15, 'substr(s.submission_date, 1, 10)'),
+    'rfpDate': ('RFP Date', 15, 'substr(s.rfp_date, 1, 10)'),
+    'awardDate': ('Award Date', 15, 'substr(s.award_date, 1, 10)'),
+    'updatedAt': ('Updated Date', 15, 'substr(s.updated_at, 1, 10)')
+}
+NUMBER_COLUMNS = {'id', 'versionNumber'}
+DEFAULT_COLUMNS = [
+    'id', 'opportunityName', 'companyName', 'clientName', 'contractValue', 'status',
+    'versionNumber', 'createdBy', 'createdAt', 'submittedAt', 'approvedAt'
+]
+
+
+def sequelize_datetime(value):
+    """Date filter value in the format Sequelize stores and compares DATETIMEs in (UTC)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] + ' +00:00'
+
+
+def build_where_clause(filters):
+    """
+    SQL condition and parameters for DataAggregator.buildWhereClause filters
+    Returns:
+        (where SQL or '', [parameters])
+    """
+    conditions = []
+    params = []
+
+    if filters.get('startDate') and filters.get('endDate'):
+        conditions.append('s.created_at BETWEEN ? AND ?')
+        params.extend([sequelize_datetime(filters['startDate']), sequelize_datetime(filters['endDate'])])
+
+    if filters.get('status'):
+        conditions.append('s.status = ?')
+        params.append(filters['status'])
+
+    if filters.get('userId'):
+        conditions.append('s.user_id = ?')
+        params.append(filters['userId'])
+
+    if filters.get('companyName'):
+        # SQLite's LIKE is case-insensitive for ASCII, like Op.iLike
+        conditions.append('s.company_name LIKE ?')
+        params.append(f"%{filters['companyName']}%")
+
+    return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+
+def resolve_columns(columns):
+    """Validate a column selection, defaulting to the export's standard columns"""
+    columns = columns or DEFAULT_COLUMNS
+    unknown = [key for key in columns if key not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown export column(s): {', '.join(unknown)} (expected {', '.join(COLUMNS)})")
+    return list(columns)
+
+
+def has_table(connection, name):
+    row = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+    return row is not None
+
+
+def build_query(connection, columns, filters):
+    """SELECT for the chosen columns, joining the creator only when it exists and is needed"""
+    expressions = [COLUMNS[key][2] for key in columns]
+    join = ''
+    if any(expression.startswith('u.') for expression in expressions):
+        if has_table(connection, 'users'):
+            join = ' LEFT JOIN users u ON u.id = s.user_id'
+        else:
+            expressions = ['NULL' if expression.startswith('u.') else expression for expression in expressions]
+
+    where, params = build_where_clause(filters)
+    sql = (f"SELECT {', '.join(expressions)} FROM quad_chart_submissions s{join}{where}"
+           ' ORDER BY s.created_at DESC')
+    return sql, params
+
+
+def export_submissions(output_path=None, filters=None, columns=None, database=DEFAULT_DATABASE,
+                       batch_size=BATCH_SIZE):
+    """
+    Stream matching submissions into an .xlsx file
+    Args:
+        output_path: Workbook path, a binary stream, or None for a dated file in the reports dir
+        filters: startDate/endDate, status, userId, companyName (as buildWhereClause)
+        columns: Column keys to export (see COLUMNS), in order
+        database: SQLite database file
+        batch_size: Rows fetched per cursor batch
+    Returns:
+        Result dict with path, row count and timing
+    """
+    filters = filters or {}
+    columns = resolve_columns(columns)
+    if output_path is None:
+        filename = f"QuadChart_Export_{datetime.now().strftime('%Y-%m-%d')}.xlsx"
+        output_path = os.path.join(os.path.abspath(DEFAULT_REPORTS_DIR), filename)
+    if isinstance(output_path, str):
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    timer = JobTimer('export_submissions')
+    # Read-only: the exporter must never hold a write lock on the app's database
+    connection = sqlite3.connect(f'file:{os.path.abspath(database)}?mode=ro', uri=True)
+    workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+    rows = 0
+    try:
+        sheet = workbook.add_worksheet('Quad Chart Submissions')
+        header_format = workbook.add_format(HEADER_FORMAT)
+        for col, key in enumerate(columns):
+            header, width, _ = COLUMNS[key]
+            sheet.set_column(col, col, width)
+            sheet.write_string(0, col, header, header_format)
+
+        # Typed writers skip write()'s per-cell type sniffing, the bulk of xlsxwriter's cost
+        write_number, write_string = sheet.write_number, sheet.write_string
+        writers = [(col, key in NUMBER_COLUMNS) for col, key in enumerate(columns)]
+
+        sql, params = build_query(connection, columns, filters)
+        cursor = connection.execute(sql, params)
+        # constant_memory flushes each row as soon as a later row is started
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for values in batch:
+                rows += 1
+                for (col, is_number), value in zip(writers, values):
+                    if value is None:
+                        continue
+                    if is_number:
+                        write_number(rows, col, value)
+                    else:
+                        write_string(rows, col, str(value))
+    finally:
+        workbook.close()
+        connection.close()
+
+    result = {
+        'success': True,
+        'path': os.path.abspath(output_path) if isinstance(output_path, str) else None,
+        'rows': rows,
+        'columns': columns
+    }
+    result.update(timer.finish(result['path']))
+    return result
+
+
+def main():
+    """Main function for command-line execution"""
+    args = sys.argv[1:]
+    columns = pop_option(args, 'columns')
+    database = pop_option(args, 'database')
+
+    if len(args) < 1:
+        print("Usage: python submissionExport.py <filters_json|-|fd:N> [output_path|-] "
+              "[--columns=id,opportunityName,...] [--database=PATH]")
+        sys.exit(1)
+
+    output_path = args[1] if len(args) > 1 else None
+    try:
+        filters = read_job_data(args[0])
+        result = export_submissions(
+            sys.stdout.buffer if is_stdout(output_path) else output_path,
+            filters=filters,
+            columns=columns.split(',') if columns else None,
+            database=database or DEFAULT_DATABASE
+        )
+        if is_stdout(output_path):
+            sys.stdout.buffer.flush()
+        print_result(result, output_path)
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
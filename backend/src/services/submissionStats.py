@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Quad chart statistics from a columnar snapshot of the database
+Submissions and history are loaded once into NumPy column arrays (categories
+dictionary-encoded, timestamps as datetime64, contract values parsed to
+numbers once) and refreshed incrementally: only submissions whose updated_at
+moved and history rows past the last seen id are read again. Every breakdown
+DataAggregator.getQuadChartStatistics builds with separate GROUP BY queries is
+then computed from one filter mask, in the same JSON shape.
+"""
+
+import re
+import sys
+import json
+import math
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from submissionExport import DEFAULT_DATABASE
+from jobTiming import JobTimer
+from jobIO import read_job_data
+
+STATUSES = ['draft', 'in_review', 'submitted', 'approved', 'rejected', 'archived']
+TREND_DAYS = 30
+TOP_LIMIT = 10
+MS_PER_HOUR = 3600 * 1000
+
+SUBMISSION_COLUMNS = (
+    'id, user_id, template_name, company_name, status, version_number, contract_value, '
+    'created_at, submitted_at, approved_at, updated_at'
+)
+HISTORY_COLUMNS = 'id, quad_chart_id, action, created_at'
+
+LEADING_NUMBER = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+CONTRACT_CLEANUP = re.compile(r'[$\s,]')
+
+
+def parse_float(text):
+    """JavaScript parseFloat: the leading number of a string, or NaN"""
+    match = LEADING_NUMBER.match(text.lstrip())
+    return float(match.group(0)) if match else math.nan
+
+
+def parse_contract_value(value):
+    """Same rules as DataAggregator.parseContractValue ($1.5M, 500K, 1,200,000)"""
+    if not value:
+        return 0.0
+    cleaned = CONTRACT_CLEANUP.sub('', value)
+    lowered = cleaned.lower()
+    if 'm' in lowered:
+        return parse_float(re.sub('m', '', cleaned, count=1, flags=re.I)) * 1000000
+    if 'k' in lowered:
+        return parse_float(re.sub('k', '', cleaned, count=1, flags=re.I)) * 1000
+    number = parse_float(cleaned)
+    return 0.0 if math.isnan(number) else number
+
+
+def format_currency(value):
+    """Same output as DataAggregator.formatCurrency"""
+    if value >= 1000000:
+        return f'${value / 1000000:.1f}M'
+    if value >= 1000:
+        return f'${value / 1000:.0f}K'
+    return f'${value:.0f}'
+
+
+def js_round(value):
+    """Math.round (halves round up, unlike Python's round)"""
+    return int(math.floor(value + 0.5))
+
+
+def to_datetime64(values):
+    """Sequelize DATETIME strings ('YYYY-MM-DD HH:MM:SS.SSS +00:00', UTC) to datetime64[ms]; None -> NaT"""
+    return np.array([value[:23].replace(' ', 'T') if value else 'NaT' for value in values], dtype='datetime64[ms]')
+
+
+def filter_datetime(value):
+    """A startDate/endDate filter value as a UTC datetime64[ms]"""
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(parsed, 'ms')
+
+
+class Categories:
+    def __init__(self):
+        """Dictionary encoding of a string column"""
+        self.values = []
+        self.codes = {}
+
+    def encode(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        for idx, value in enumerate(values):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            codes[idx] = code
+        return codes
+
+
+class SubmissionSnapshot:
+    def __init__(self, database=DEFAULT_DATABASE):
+        """
+        Columnar copy of quad_chart_submissions and quad_chart_history
+        Args:
+            database: SQLite database file
+        """
+        self.database = database
+        self.lock = threading.Lock()
+        self.contract_values = {}
+        # Kept open so PRAGMA data_version can tell whether anyone has written since the last refresh
+        self.connection = None
+        self.data_version = None
+        self.reset()
+
+    def reset(self):
+        self.templates = Categories()
+        self.companies = Categories()
+        self.statuses = Categories()
+        self.statuses.encode(STATUSES)
+        self.actions = Categories()
+        self.positions = {}
+        self.last_updated = ''
+        self.last_history_id = 0
+        self.users = {}
+
+        self.columns = {
+            'id': np.empty(0, dtype=np.int64),
+            'user_id': np.empty(0, dtype=np.int64),
+            'template': np.empty(0, dtype=np.int32),
+            'company': np.empty(0, dtype=np.int32),
+            'status': np.empty(0, dtype=np.int32),
+            'version': np.empty(0, dtype=np.float64),
+            'contract_value': np.empty(0, dtype=np.float64),
+            'created_at': np.empty(0, dtype='datetime64[ms]'),
+            'submitted_at': np.empty(0, dtype='datetime64[ms]'),
+            'approved_at': np.empty(0, dtype='datetime64[ms]')
+        }
+        self.history = {
+            'quad_chart_id': np.empty(0, dtype=np.int64),
+            'action': np.empty(0, dtype=np.int32)
+        }
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(f'file:{self.database}?mode=ro', uri=True, check_same_thread=False)
+        return self.connection
+
+    def contract_value(self, value):
+        """Parse each distinct contract value string once for the life of the snapshot"""
+        parsed = self.contract_values.get(value)
+        if parsed is None:
+            parsed = self.contract_values[value] = parse_contract_value(value)
+        return parsed
+
+    def encode_rows(self, rows):
+        """Column arrays for submission rows"""
+        ids, user_ids, templates, companies, statuses, versions, values, created, submitted, approved, _ = (
+            zip(*rows)
+        )
+        return {
+            'id': np.array(ids, dtype=np.int64),
+            'user_id': np.array(user_ids, dtype=np.int64),
+            'template': self.templates.encode(templates),
+            'company': self.companies.encode(companies),
+            'status': self.statuses.encode(statuses),
+            'version': np.array([v if v is not None else np.nan for v in versions], dtype=np.float64),
+            # NaN marks a NULL contract value, 0 one that does not parse
+            'contract_value': np.array(
+                [self.contract_value(v) if v is not None else np.nan for v in values], dtype=np.float64
+            ),
+            'created_at': to_datetime64(created),
+            'submitted_at': to_datetime64(submitted),
+            'approved_at': to_datetime64(approved)
+        }
+
+    def apply_rows(self, rows):
+        """Update changed submissions in place and append new ones"""
+        encoded = self.encode_rows(rows)
+        existing = np.array([self.positions.get(row[0], -1) for row in rows], dtype=np.int64)
+        changed = existing >= 0
+
+        if changed.any():
+            for name, values in encoded.items():
+                self.columns[name][existing[changed]] = values[changed]
+
+        added = ~changed
+        if added.any():
+            start = len(self.columns['id'])
+            for name, values in encoded.items():
+                self.columns[name] = np.concatenate([self.columns[name], values[added]])
+            for offset, row_id in enumerate(encoded['id'][added].tolist()):
+                self.positions[row_id] = start + offset
+
+    def read_submissions(self, connection):
+        """Apply submissions updated since the last read; returns the number of rows read"""
+        read = 0
+        cursor = connection.execute(
+            f'SELECT {SUBMISSION_COLUMNS} FROM quad_chart_submissions WHERE updated_at >= ? ORDER BY id',
+            (self.last_updated,)
+        )
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            self.apply_rows(rows)
+            read += len(rows)
+            self.last_updated = max(self.last_updated, max(row[-1] or '' for row in rows))
+        return read
+
+    def refresh(self):
+        """Bring the snapshot up to date with the database; returns the number of rows read"""
+        with self.lock:
+            connection = self.connect()
+            data_version = connection.execute('PRAGMA data_version').fetchone()[0]
+            if data_version == self.data_version:
+                return 0
+            self.data_version = data_version
+
+            count, max_updated = connection.execute(
+                'SELECT COUNT(*), MAX(updated_at) FROM quad_chart_submissions'
+            ).fetchone()
+            read = 0
+
+            if (max_updated or '') > self.last_updated or count != len(self.positions):
+                read += self.read_submissions(connection)
+
+            # Every current submission is in the snapshot now, so any extra id is a
+            # deleted one (also when rows were inserted since); start over
+            if len(self.positions) != count:
+                self.reset()
+                read += self.read_submissions(connection)
+
+            # History is append-only
+            rows = connection.execute(
+                f'SELECT {HISTORY_COLUMNS} FROM quad_chart_history WHERE id > ? ORDER BY id',
+                (self.last_history_id,)
+            ).fetchall()
+            if rows:
+                _, chart_ids, actions, _ = zip(*rows)
+                self.history['quad_chart_id'] = np.concatenate(
+                    [self.history['quad_chart_id'], np.array(chart_ids, dtype=np.int64)]
+                )
+                self.history['action'] = np.concatenate([self.history['action'], self.actions.encode(actions)])
+                self.last_history_id = rows[-1][0]
+                read += len(rows)
+
+            has_users = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'"
+            ).fetchone()
+            if has_users:
+                self.users = {
+                    user_id: {'name': name, 'email': email}
+                    for user_id, name, email in connection.execute('SELECT id, name, email FROM users')
+                }
+            return read
+
+    def mask(self, filters, ignore_dates=False):
+        """Boolean row mask for DataAggregator.buildWhereClause filters"""
+        columns = self.columns
+        mask = np.ones(len(columns['id']), dtype=bool)
+
+        if filters.get('startDate') and filters.get('endDate') and not ignore_dates:
+            created = columns['created_at']
+            mask &= (created >= filter_datetime(filters['startDate'])) & (created <= filter_datetime(filters['endDate']))
+
+        if filters.get('status'):
+            code = self.statuses.codes.get(filters['status'], -1)
+            mask &= columns['status'] == code
+
+        if filters.get('userId'):
+            mask &= columns['user_id'] == int(filters['userId'])
+
+        if filters.get('companyName'):
+            # Match the distinct names once, then select rows by code (case-insensitive like Op.iLike)
+            needle = filters['companyName'].lower()
+            matching = [code for code, name in enumerate(self.companies.values) if needle in (name or '').lower()]
+            mask &= np.isin(columns['company'], matching)
+
+        return mask
+
+    def counts(self, codes, categories, mask):
+        return np.bincount(codes[mask], minlength=len(categories.values))
+
+    def statistics(self, filters):
+        """
+        Same shape as DataAggregator.getQuadChartStatistics
+        Holds the lock throughout, so a concurrent refresh cannot grow, rewrite or
+        reset the columns while they are being read.
+        """
+        with self.lock:
+            columns = self.columns
+            mask = self.mask(filters)
+            status = columns['status']
+
+            status_counts = self.counts(status, self.statuses, mask)
+            status_breakdown = {name: 0 for name in STATUSES}
+            for code in np.flatnonzero(status_counts).tolist():
+                status_breakdown[self.statuses.values[code]] = int(status_counts[code])
+
+            template_counts = self.counts(columns['template'], self.templates, mask)
+            templates = sorted(
+                ({'templateName': self.templates.values[code], 'count': int(template_counts[code])}
+                 for code in np.flatnonzero(template_counts).tolist()),
+                key=lambda item: item['templateName'] or ''
+            )
+
+            company_counts = self.counts(columns['company'], self.companies, mask)
+            top = np.flatnonzero(company_counts)
+            top = top[np.argsort(-company_counts[top], kind='stable')][:TOP_LIMIT]
+            top_companies = [
+                {'companyName': self.companies.values[code], 'count': int(company_counts[code])}
+                for code in top.tolist()
+            ]
+
+            return {
+                'overview': {
+                    'total': int(np.count_nonzero(mask)),
+                    'statusBreakdown': status_breakdown,
+                    'averageCompletionTime': self.average_completion_time(mask)
+                },
+                'templates': templates,
+                'topCompanies': top_companies,
+                'userActivity': self.user_activity(mask),
+                'trends': self.trends(filters),
+                'approvalMetrics': self.approval_metrics(mask, status_counts),
+                'contractValueStats': self.contract_value_stats(mask),
+                'activity': self.history_activity(mask)
+            }
+
+    def user_activity(self, mask):
+        """Top submitters; user ids are small integers, so counts are a bincount indexed by id"""
+        user_ids = self.columns['user_id'][mask]
+        submissions = np.bincount(user_ids)
+        versions = np.bincount(user_ids, weights=np.nan_to_num(self.columns['version'][mask]))
+        active = np.flatnonzero(submissions)
+        order = active[np.argsort(-submissions[active], kind='stable')][:TOP_LIMIT]
+        return [
+            {
+                'userId': user_id,
+                'submissions': int(submissions[user_id]),
+                'avgVersions': float(versions[user_id] / submissions[user_id]),
+                'creator': self.users.get(user_id)
+            }
+            for user_id in order.tolist()
+        ]
+
+    def trends(self, filters):
+        """Submissions per day over the last 30 days (the date filter is replaced, as in getSubmissionTrends)"""
+        since = np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=TREND_DAYS), 'ms')
+        created = self.columns['created_at']
+        mask = self.mask(filters, ignore_dates=True) & (created >= since)
+        days, counts = np.unique(created[mask].astype('datetime64[D]'), return_counts=True)
+        return [{'date': str(day), 'count': int(count)} for day, count in zip(days, counts.tolist())]
+
+    def status_mask(self, *names):
+        codes = [self.statuses.codes[name] for name in names]
+        return np.isin(self.columns['status'], codes)
+
+    def approval_metrics(self, mask, status_counts):
+        approved = int(status_counts[self.statuses.codes['approved']])
+        rejected = int(status_counts[self.statuses.codes['rejected']])
+        pending = int(status_counts[self.statuses.codes['submitted']] + status_counts[self.statuses.codes['in_review']])
+        rate = approved / (approved + rejected) * 100 if approved + rejected else 0
+
+        approved_at, submitted_at = self.columns['approved_at'], self.columns['submitted_at']
+        timed = mask & self.status_mask('approved') & ~np.isnat(approved_at) & ~np.isnat(submitted_at)
+        hours = (approved_at[timed] - submitted_at[timed]).astype(np.float64) / MS_PER_HOUR
+
+        return {
+            'approved': approved,
+            'rejected': rejected,
+            'pending': pending,
+            'approvalRate': f'{rate:.1f}',
+            'averageApprovalTimeHours': float(hours.mean()) if hours.size else 0
+        }
+
+    def contract_value_stats(self, mask):
+        values = self.columns['contract_value'][mask]
+        values = values[values > 0]
+        if not values.size:
+            return {'total': 0, 'average': 0, 'min': 0, 'max': 0, 'count': 0}
+
+        total = float(values.sum())
+        return {
+            'total': format_currency(total),
+            'average': format_currency(total / values.size),
+            'min': format_currency(float(values.min())),
+            'max': format_currency(float(values.max())),
+            'count': int(values.size)
+        }
+
+    def average_completion_time(self, mask):
+        submitted_at = self.columns['submitted_at']
+        completed = mask & self.status_mask('submitted', 'approved') & ~np.isnat(submitted_at)
+        hours = (submitted_at[completed] - self.columns['created_at'][completed]).astype(np.float64) / MS_PER_HOUR
+        average = float(hours.mean()) if hours.size else 0
+        if average < 24:
+            return f'{js_round(average)} hours'
+        return f'{js_round(average / 24)} days'
+
+    def history_activity(self, mask):
+        """History entries per action for the selected submissions"""
+        # Lookup table indexed by submission id instead of a sorted isin
+        chart_ids = self.history['quad_chart_id']
+        selected = np.zeros(max(int(chart_ids.max(initial=0)), int(self.columns['id'].max(initial=0))) + 1, dtype=bool)
+        selected[self.columns['id'][mask]] = True
+        in_selection = selected[chart_ids]
+        counts = np.bincount(self.history['action'][in_selection], minlength=len(self.actions.values))
+        return {self.actions.values[code]: int(counts[code]) for code in np.flatnonzero(counts).tolist()}
+
+    def stats(self):
+        return {
+            'database': self.database,
+            'submissions': len(self.positions),
+            'history': int(self.history['action'].size)
+        }
+
+
+# Shared process-wide snapshot used by the render worker
+submission_snapshot = SubmissionSnapshot()
+
+
+def get_statistics(filters=None, snapshot=None):
+    """Refresh the snapshot and compute the dashboard statistics"""
+    snapshot = snapshot or submission_snapshot
+    timer = JobTimer('statistics')
+    with timer.phase('refresh'):
+        rows_read = snapshot.refresh()
+    with timer.phase('compute'):
+        result = snapshot.statistics(filters or {})
+    result.update(timer.finish(rows_read=rows_read))
+    return result
+
+
+def main():
+    """Main function for command-line execution"""
+    try:
+        filters = read_job_data(sys.argv[1]) if len(sys.argv) > 1 else {}
+        database = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_DATABASE
+        print(json.dumps(get_statistics(filters, SubmissionSnapshot(database))))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
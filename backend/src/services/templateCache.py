@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+In-memory cache of parsed PowerPoint templates
+Keeps one pristine parsed Presentation per template content hash and hands
+out independent deep copies, so repeated fills skip the unzip + XML parse.
+"""
+
+import os
+import copy
+import hashlib
+import zipfile
+import threading
+from collections import OrderedDict
+from pptx import Presentation
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('TEMPLATE_CACHE_MAX_ENTRIES', 16))
+DEFAULT_MAX_BYTES = int(os.environ.get('TEMPLATE_CACHE_MAX_MB', 256)) * 1024 * 1024
+MAX_PLANS_PER_TEMPLATE = 32
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def estimate_size(path):
+    """Approximate in-memory footprint of a parsed template (uncompressed part sizes)"""
+    with zipfile.ZipFile(path) as zf:
+        return sum(info.file_size for info in zf.infolist())
+
+
+def clone_presentation(pristine):
+    """
+    Deep copy a parsed Presentation so every part and proxy shares one copied XML tree
+    lxml elements ignore the deepcopy memo, so each part's root element is copied
+    up front and seeded into the memo; otherwise the presentation proxy and its part
+    would end up holding two different copies of the same XML.
+    """
+    memo = {}
+    for part in pristine.part.package.iter_parts():
+        element = getattr(part, '_element', None)
+        if element is not None:
+            memo[id(element)] = copy.deepcopy(element)
+    return copy.deepcopy(pristine, memo)
+
+
+class TemplateCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize an empty cache
+        Args:
+            max_entries: Maximum number of parsed templates kept
+            max_bytes: Maximum approximate memory held by parsed templates
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # content hash -> {presentation, size, plans}
+        self.hashes = {}  # (path, mtime_ns, size) -> content hash
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def content_hash(self, template_path):
+        """Content hash of a template, recomputed only when its mtime or size changes"""
+        path = os.path.abspath(str(template_path))
+        stat = os.stat(path)
+        stat_key = (path, stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            cached = self.hashes.get(stat_key)
+        if cached:
+            return cached
+
+        digest = file_hash(path)
+        with self.lock:
+            # Forget hashes recorded for older versions of the same file
+            for key in [k for k in self.hashes if k[0] == path]:
+                del self.hashes[key]
+            self.hashes[stat_key] = digest
+        return digest
+
+    def get_pristine(self, template_path):
+        """
+        Return (content hash, pristine parsed Presentation)
+        Never mutate or traverse the pristine copy; use load()/clone_presentation().
+        """
+        digest = self.content_hash(template_path)
+
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry:
+                self.entries.move_to_end(digest)
+                self.hits += 1
+                return digest, entry['presentation']
+            self.misses += 1
+
+        presentation = Presentation(str(template_path))
+        size = estimate_size(template_path)
+
+        with self.lock:
+            if digest not in self.entries:
+                self.entries[digest] = {
+                    'presentation': presentation,
+                    'size': size,
+                    'plans': OrderedDict()
+                }
+                self.total_bytes += size
+                self.evict()
+        return digest, presentation
+
+    def load_with_hash(self, template_path):
+        """Return (content hash, independent mutable copy of the parsed template)"""
+        digest, pristine = self.get_pristine(template_path)
+        return digest, clone_presentation(pristine)
+
+    def load(self, template_path):
+        """Return an independent, mutable copy of the parsed template"""
+        return self.load_with_hash(template_path)[1]
+
+    def get_plan(self, digest, plan_key, compile_plan):
+        """
+        Return a plan derived from the pristine template, compiling it once
+        Args:
+            digest: Template content hash
+            plan_key: Hashable key identifying the plan
+            compile_plan: Callable taking an unfilled copy of the template
+        Returns None if the template is no longer cached.
+        """
+        with self.lock:
+            entry = self.entries.get(digest)
+            if not entry:
+                return None
+            plan = entry['plans'].get(plan_key)
+            if plan is not None:
+                entry['plans'].move_to_end(plan_key)
+                return plan
+            pristine = entry['presentation']
+
+        # Compile against a copy so proxies never cache state on the pristine tree
+        plan = compile_plan(clone_presentation(pristine))
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry:
+                plans = entry['plans']
+                plan = plans.setdefault(plan_key, plan)
+                while len(plans) > MAX_PLANS_PER_TEMPLATE:
+                    plans.popitem(last=False)
+        return plan
+
+    def evict(self):
+        """Drop least recently used templates until both limits are met (lock held)"""
+        while self.entries and (len(self.entries) > self.max_entries or
+                                self.total_bytes > self.max_bytes):
+            # Always keep the newest entry, even if it alone exceeds max_bytes
+            if len(self.entries) == 1:
+                break
+            _, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry['size']
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hashes.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Shared process-wide cache used by the filler, replicator and render worker
+template_cache = TemplateCache()
@@ -1,15 +1,13 @@
 const fs = require('fs');
 const path = require('path');
-const { spawn } = require('child_process');
 const multer = require('multer');
 const crypto = require('crypto');
+const renderWorker = require('./renderWorker');
 
 class TemplateManager {
   constructor() {
     this.templatesDir = path.join(__dirname, '../../templates/powerpoint');
     this.metadataFile = path.join(this.templatesDir, 'templates.json');
-    this.pythonPath = path.join(__dirname, '../../venv/bin/python');
-    this.replicatorPath = path.join(__dirname, './pptxTemplateReplicator.py');
 
     this.ensureDirectories();
     this.loadMetadata();
@@ -50,9 +48,15 @@ class TemplateManager {
     // Move file to templates directory
     fs.renameSync(filePath, newFilePath);
 
+    // Shrink oversized images once here instead of copying them on every render
+    const media = await this.optimizeMedia(newFilePath);
+
     // Extract template information using Python
     const templateData = await this.analyzeTemplate(newFilePath);
 
+    // Keep the package as deduplicated parts; the uploaded file is only needed if that fails
+    const stored = await this.storePackage(templateId, newFilePath);
+
     // Create template metadata
     const template = {
       id: templateId,
@@ -71,6 +75,18 @@ class TemplateManager {
       active: true,
       mappings: templateInfo.mappings || this.getDefaultMappings(templateData.placeholders)
     };
+    if (media) {
+      template.media = {
+        optimized: media.optimized,
+        deduplicated: media.deduplicated,
+        bytesBefore: media.bytes_before,
+        bytesAfter: media.bytes_after
+      };
+    }
+    if (stored) {
+      this.applyStorage(template, stored);
+      fs.unlinkSync(newFilePath);
+    }
 
     // Add to templates array
     this.templates.push(template);
@@ -80,49 +96,84 @@ class TemplateManager {
   }
 
   /**
-   * Analyze a template to find placeholders
+   * Downsample, recompress and deduplicate a template's images in place
+   * Failures are logged and the template is kept as uploaded.
    * @param {string} templatePath - Path to template file
-   * @returns {Promise<Object>} Template analysis
+   * @returns {Promise<Object|null>} Optimization result, or null if skipped or failed
    */
-  analyzeTemplate(templatePath) {
-    return new Promise((resolve, reject) => {
-      const pythonProcess = spawn(this.pythonPath, [
-        '-c',
-        `
-import json
-import sys
-sys.path.append('${path.dirname(this.replicatorPath)}')
-from pptxTemplateReplicator import TemplateReplicator
-
-replicator = TemplateReplicator('${templatePath}')
-info = replicator.get_template_info()
-print(json.dumps(info))
-        `
-      ]);
-
-      let stdout = '';
-      let stderr = '';
-
-      pythonProcess.stdout.on('data', (data) => {
-        stdout += data.toString();
+  async optimizeMedia(templatePath) {
+    try {
+      const result = await renderWorker.submit('optimize_media', {
+        template_path: templatePath
       });
+      return result.skipped ? null : result;
+    } catch (error) {
+      console.error('Template media optimization failed:', error.message);
+      return null;
+    }
+  }
 
-      pythonProcess.stderr.on('data', (data) => {
-        stderr += data.toString();
+  /**
+   * Store a template package in the content-addressed template store
+   * Parts already stored for another version are shared, so only changed parts take space.
+   * Failures are logged and the template is kept as a standalone file.
+   * @param {string} templateId - Template ID
+   * @param {string} packagePath - Path to the .pptx file
+   * @param {string|null} parentId - ID of the version it derives from
+   * @returns {Promise<Object|null>} Store result, or null if storing failed
+   */
+  async storePackage(templateId, packagePath, parentId = null) {
+    try {
+      return await renderWorker.submit('template_store', {
+        template_id: templateId,
+        template_path: packagePath,
+        parent_id: parentId
       });
+    } catch (error) {
+      console.error('Template store failed:', error.message);
+      return null;
+    }
+  }
 
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          reject(new Error(`Template analysis failed: ${stderr}`));
-        } else {
-          try {
-            const result = JSON.parse(stdout);
-            resolve(result);
-          } catch (error) {
-            reject(new Error('Failed to parse template analysis'));
-          }
-        }
-      });
+  /**
+   * Mark template metadata as kept in the template store
+   * @param {Object} template - Template metadata, updated in place
+   * @param {Object} stored - Result of a template_store or template_clone job
+   */
+  applyStorage(template, stored) {
+    template.stored = true;
+    template.filePath = null;
+    template.storage = {
+      digest: stored.digest,
+      parts: stored.parts,
+      newParts: stored.new_parts,
+      newBytes: stored.new_bytes
+    };
+  }
+
+  /**
+   * Path of a template's package, assembled from the template store if it is kept there
+   * @param {Object} template - Template metadata
+   * @returns {Promise<string>} Path to the .pptx file
+   */
+  async getTemplatePath(template) {
+    if (!template.stored) {
+      return template.filePath;
+    }
+    const result = await renderWorker.submit('template_checkout', { template_id: template.id });
+    return result.path;
+  }
+
+  /**
+   * Analyze a template to find placeholders
+   * @param {string} templatePath - Path to template file
+   * @returns {Promise<Object>} Template analysis
+   */
+  analyzeTemplate(templatePath) {
+    return renderWorker.submit('template_info', {
+      template_path: templatePath
+    }).catch(error => {
+      throw new Error(`Template analysis failed: ${error.message}`);
     });
   }
 
@@ -206,6 +257,8 @@ print(json.dumps(info))
     delete updates.fileName;
     delete updates.filePath;
     delete updates.created;
+    delete updates.stored;
+    delete updates.storage;
 
     this.templates[index] = {
       ...this.templates[index],
@@ -242,49 +295,30 @@ print(json.dumps(info))
     const outputFileName = `generated_${templateId}_${timestamp}.pptx`;
     const outputPath = path.join(__dirname, '../../data/generated_pptx', outputFileName);
 
-    return new Promise((resolve, reject) => {
-      const pythonProcess = spawn(this.pythonPath, [
-        this.replicatorPath,
-        template.filePath,
-        JSON.stringify(placeholderData),
-        outputPath
-      ]);
-
-      let stdout = '';
-      let stderr = '';
-
-      pythonProcess.stdout.on('data', (data) => {
-        stdout += data.toString();
+    let result;
+    try {
+      result = await renderWorker.submit('replicate', {
+        template_path: await this.getTemplatePath(template),
+        data: placeholderData,
+        output_path: outputPath,
+        stream: process.env.PPTX_STREAM_FILL === 'true'
       });
+    } catch (error) {
+      console.error('Python error:', error.message);
+      throw new Error(`Template processing failed: ${error.message}`);
+    }
 
-      pythonProcess.stderr.on('data', (data) => {
-        stderr += data.toString();
-      });
+    if (!result.success) {
+      throw new Error(result.error);
+    }
 
-      pythonProcess.on('close', (code) => {
-        if (code !== 0) {
-          console.error('Python error:', stderr);
-          reject(new Error(`Template processing failed: ${stderr}`));
-        } else {
-          try {
-            const result = JSON.parse(stdout);
-            if (result.success) {
-              resolve({
-                success: true,
-                path: result.path,
-                filename: outputFileName,
-                url: `/api/templates/download/${outputFileName}`,
-                replacements: result.replacements_made
-              });
-            } else {
-              reject(new Error(result.error));
-            }
-          } catch (error) {
-            reject(new Error('Failed to parse template processing result'));
-          }
-        }
-      });
-    });
+    return {
+      success: true,
+      path: result.path,
+      filename: outputFileName,
+      url: `/api/templates/download/${outputFileName}`,
+      replacements: result.replacements_made
+    };
   }
 
   /**
@@ -301,8 +335,12 @@ print(json.dumps(info))
 
     if (permanent) {
       const template = this.templates[index];
-      // Delete the actual file
-      if (fs.existsSync(template.filePath)) {
+      if (template.stored) {
+        // Drops the manifest and any parts no other version shares
+        renderWorker.submit('template_remove', { template_id: template.id })
+          .catch(error => console.error('Template store removal failed:', error.message));
+      } else if (fs.existsSync(template.filePath)) {
+        // Delete the actual file
         fs.unlinkSync(template.filePath);
       }
       // Remove from array
@@ -329,12 +367,25 @@ print(json.dumps(info))
       throw new Error('Original template not found');
     }
 
-    // Copy the file
     const newId = crypto.randomBytes(16).toString('hex');
     const newFileName = `template_${newId}.pptx`;
     const newFilePath = path.join(this.templatesDir, newFileName);
 
-    fs.copyFileSync(original.filePath, newFilePath);
+    // A stored template is cloned by copying its manifest; a standalone original is stored under the new ID
+    let stored;
+    if (original.stored) {
+      stored = await renderWorker.submit('template_clone', {
+        source_id: templateId,
+        template_id: newId
+      }).catch(error => {
+        throw new Error(`Template clone failed: ${error.message}`);
+      });
+    } else {
+      stored = await this.storePackage(newId, original.filePath, templateId);
+      if (!stored) {
+        fs.copyFileSync(original.filePath, newFilePath);
+      }
+    }
 
     // Create new metadata
     const newTemplate = {
@@ -350,6 +401,12 @@ print(json.dumps(info))
       updated: new Date().toISOString(),
       createdBy: newInfo.createdBy || 'system'
     };
+    if (stored) {
+      this.applyStorage(newTemplate, stored);
+    } else {
+      delete newTemplate.stored;
+      delete newTemplate.storage;
+    }
 
     this.templates.push(newTemplate);
     this.saveMetadata();
@@ -359,10 +416,12 @@ print(json.dumps(info))
 
   /**
    * Get template history (versions)
+   * Versions kept in the template store carry `changes`: the parts added, removed and
+   * modified relative to their parent version.
    * @param {string} templateId - Template ID
-   * @returns {Array} Template version history
+   * @returns {Promise<Array>} Template version history
    */
-  getTemplateHistory(templateId) {
+  async getTemplateHistory(templateId) {
     const template = this.getTemplate(templateId);
     if (!template) {
       return [];
@@ -390,7 +449,33 @@ print(json.dumps(info))
     const children = this.templates.filter(t => t.parentId === templateId);
     history.push(...children);
 
-    return history;
+    // Part-level changes, diffed from the stored manifests in one job
+    const compared = history.filter(t => {
+      const parent = t.parentId && this.getTemplate(t.parentId);
+      return t.stored && parent && parent.stored;
+    });
+    if (compared.length === 0) {
+      return history;
+    }
+
+    let diffs;
+    try {
+      ({ diffs } = await renderWorker.submit('template_diff', {
+        pairs: compared.map(t => [t.parentId, t.id])
+      }));
+    } catch (error) {
+      console.error('Template diff failed:', error.message);
+      return history;
+    }
+
+    const changes = new Map(compared.map((t, i) => [t.id, {
+      added: diffs[i].added,
+      removed: diffs[i].removed,
+      modified: diffs[i].modified,
+      unchanged: diffs[i].unchanged,
+      changedBytes: diffs[i].changed_bytes
+    }]));
+    return history.map(t => (changes.has(t.id) ? { ...t, changes: changes.get(t.id) } : t));
   }
 }
 
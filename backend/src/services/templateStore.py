@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Content-addressed storage for PowerPoint template versions
+A template version is stored as a manifest listing its zip members; each
+member's compressed data is stored once as an object named by the SHA-256 of
+its uncompressed content, so versions that share masters, layouts, theme and
+media share those objects. Cloning a version copies only its manifest.
+
+Packages are reassembled on demand by copying the stored compressed data into
+a new zip (no inflate or deflate) and kept in a size-bounded cache, keyed by
+the manifest's content, so identical versions share one cached package.
+
+Layout under the store directory:
+    objects/ab/<sha256>        header + compressed member data
+    manifests/<template id>.json
+    packages/<digest>.pptx     assembled package cache
+"""
+
+import os
+import sys
+import json
+import struct
+import hashlib
+import tempfile
+import threading
+import zipfile
+from datetime import datetime
+
+from pptxZip import RawZipWriter, seek_member_data
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_DIR = os.environ.get(
+    'TEMPLATE_STORE_DIR',
+    os.path.join(SERVICES_DIR, '..', '..', 'data', 'template_store')
+)
+DEFAULT_CACHE_BYTES = int(os.environ.get('TEMPLATE_STORE_CACHE_MB', 512)) * 1024 * 1024
+
+# Format of manifests and objects; bump when either changes
+STORE_VERSION = 1
+
+# Object header: magic, compression method, CRC-32 and uncompressed size of the member
+OBJECT_HEADER = struct.Struct('<4sHII')
+OBJECT_MAGIC = b'TPO1'
+
+# General-purpose flag bits worth keeping (deflate option bits); the rest are per-archive
+KEPT_FLAG_BITS = 0x06
+
+
+def member_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def manifest_digest(parts):
+    """Digest of everything that determines an assembled package's bytes"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(json.dumps(
+            [part['name'], part['hash'], part['date_time'], part['flags'], part['external_attr']]
+        ).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def diff_parts(old_parts, new_parts):
+    """
+    Which members differ between two manifests
+    Returns:
+        {'added', 'removed', 'modified': [member names], 'unchanged': count, 'changed_bytes'}
+    """
+    old = {part['name']: part for part in old_parts}
+    new = {part['name']: part for part in new_parts}
+    added = [name for name in new if name not in old]
+    removed = [name for name in old if name not in new]
+    modified = [name for name in new if name in old and new[name]['hash'] != old[name]['hash']]
+    return {
+        'added': added,
+        'removed': removed,
+        'modified': modified,
+        'unchanged': len(new) - len(added) - len(modified),
+        'changed_bytes': sum(new[name]['size'] for name in added + modified)
+    }
+
+
+class TemplateStore:
+    def __init__(self, directory=DEFAULT_STORE_DIR, cache_bytes=DEFAULT_CACHE_BYTES):
+        """
+        Initialize the store
+        Args:
+            directory: Root directory of the store
+            cache_bytes: Maximum total size of assembled packages kept
+        """
+        self.directory = os.path.abspath(directory)
+        self.cache_bytes = cache_bytes
+        self.lock = threading.RLock()
+        self.stored_objects = 0
+        self.reused_objects = 0
+        self.assembled = 0
+        self.cache_hits = 0
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    def manifest_path(self, template_id):
+        if not template_id or os.sep in template_id or '/' in template_id or template_id.startswith('.'):
+            raise ValueError(f'Invalid template id: {template_id}')
+        return os.path.join(self.directory, 'manifests', f'{template_id}.json')
+
+    def package_path(self, digest):
+        return os.path.join(self.directory, 'packages', f'{digest}.pptx')
+
+    def write_atomic(self, path, write):
+        """Write a file through a temp file in its directory, so readers never see a partial file"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.store_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def read_manifest(self, template_id):
+        try:
+            with open(self.manifest_path(template_id), encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise LookupError(f'Template not in store: {template_id}') from None
+        if manifest.get('version') != STORE_VERSION:
+            raise ValueError(f'Unsupported template manifest version for {template_id}')
+        return manifest
+
+    def write_manifest(self, manifest):
+        data = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+        self.write_atomic(self.manifest_path(manifest['id']), lambda f: f.write(data))
+
+    def has(self, template_id):
+        return os.path.exists(self.manifest_path(template_id))
+
+    def put(self, template_id, package_path, parent=None):
+        """
+        Store a package as a template version
+        Args:
+            template_id: Version ID (the template's ID)
+            package_path: Path to the .pptx to store
+            parent: ID of the version it was derived from, if any
+        Returns:
+            Counts and bytes of the members stored and reused
+        """
+        # Held throughout so remove() cannot collect an object this version is about to reference
+        with self.lock:
+            parts = []
+            new_parts = new_bytes = 0
+            with zipfile.ZipFile(package_path) as source:
+                for info in source.infolist():
+                    # Reading the member also checks its CRC
+                    digest = member_hash(source.read(info))
+                    parts.append({
+                        'name': info.filename,
+                        'hash': digest,
+                        'size': info.file_size,
+                        'date_time': list(info.date_time),
+                        'flags': info.flag_bits & KEPT_FLAG_BITS,
+                        'external_attr': info.external_attr
+                    })
+
+                    path = self.object_path(digest)
+                    if os.path.exists(path):
+                        self.reused_objects += 1
+                        continue
+
+                    header = OBJECT_HEADER.pack(OBJECT_MAGIC, info.compress_type, info.CRC, info.file_size)
+                    payload = seek_member_data(source, info).read(info.compress_size)
+                    self.write_atomic(path, lambda f: (f.write(header), f.write(payload)))
+                    self.stored_objects += 1
+                    new_parts += 1
+                    new_bytes += OBJECT_HEADER.size + len(payload)
+
+            manifest = {
+                'version': STORE_VERSION,
+                'id': template_id,
+                'parent': parent,
+                'created': datetime.now().isoformat(),
+                'digest': manifest_digest(parts),
+                'parts': parts
+            }
+            self.write_manifest(manifest)
+
+        return {
+            'success': True,
+            'template_id': template_id,
+            'digest': manifest['digest'],
+            'parts': len(parts),
+            'new_parts': new_parts,
+            'new_bytes': new_bytes,
+            'package_bytes': os.path.getsize(package_path)
+        }
+
+    def clone(self, source_id, template_id):
+        """New version with the same content as an existing one; only the manifest is written"""
+        with self.lock:
+            manifest = self.read_manifest(source_id)
+            manifest.update(id=template_id, parent=source_id, created=datetime.now().isoformat())
+            self.write_manifest(manifest)
+        return {
+            'success': True,
+            'template_id': template_id,
+            'digest': manifest['digest'],
+            'parts': len(manifest['parts']),
+            'new_parts': 0,
+            'new_bytes': 0
+        }
+
+    def assemble(self, manifest, output):
+        """Write a manifest's package to a binary stream from the stored objects"""
+        with RawZipWriter(output) as writer:
+            for part in manifest['parts']:
+                with open(self.object_path(part['hash']), 'rb') as f:
+                    magic, compress_type, crc, file_size = OBJECT_HEADER.unpack(f.read(OBJECT_HEADER.size))
+                    if magic != OBJECT_MAGIC:
+                        raise ValueError(f"Corrupt template object {part['hash']}")
+                    compress_size = os.fstat(f.fileno()).st_size - OBJECT_HEADER.size
+                    writer.copy_stream(
+                        part['name'], f, compress_size, compress_type, crc, file_size,
+                        tuple(part['date_time']), part['flags'], part['external_attr']
+                    )
+
+    def checkout(self, template_id):
+        """
+        Path of a template version's package, assembling it if it is not cached
+        Identical versions share one cached package, so its path (and mtime) is stable
+        and downstream caches keyed on path stay warm.
+        """
+        with self.lock:
+            manifest = self.read_manifest(template_id)
+            path = self.package_path(manifest['digest'])
+            if os.path.exists(path):
+                os.utime(path)
+                self.cache_hits += 1
+                cached = True
+            else:
+                self.write_atomic(path, lambda f: self.assemble(manifest, f))
+                self.assembled += 1
+                cached = False
+                self.evict(keep=path)
+        return {
+            'success': True,
+            'template_id': template_id,
+            'path': path,
+            'digest': manifest['digest'],
+            'cached': cached
+        }
+
+    def evict(self, keep=None):
+        """Drop least recently used packages until the cache fits its size limit"""
+        directory = os.path.join(self.directory, 'packages')
+        if not os.path.isdir(directory):
+            return 0
+        packages = []
+        for name in os.listdir(directory):
+            if name.endswith('.pptx'):
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                packages.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in packages)
+        evicted = 0
+        for _, size, path in sorted(packages):
+            if total <= self.cache_bytes:
+                break
+            if path != keep:
+                os.remove(path)
+                total -= size
+                evicted += 1
+        return evicted
+
+    def diff(self, old_id, new_id):
+        """Members added, removed and modified from one version to another"""
+        result = diff_parts(self.read_manifest(old_id)['parts'], self.read_manifest(new_id)['parts'])
+        result.update(success=True, old_id=old_id, new_id=new_id)
+        return result
+
+    def remove(self, template_id):
+        """Delete a version and any objects and cached packages no other version uses"""
+        with self.lock:
+            manifest = self.read_manifest(template_id)
+            os.remove(self.manifest_path(template_id))
+
+            referenced = set()
+            digests = set()
+            manifests_dir = os.path.join(self.directory, 'manifests')
+            for name in os.listdir(manifests_dir):
+                if name.endswith('.json'):
+                    other = self.read_manifest(name[:-len('.json')])
+                    referenced.update(part['hash'] for part in other['parts'])
+                    digests.add(other['digest'])
+
+            removed_objects = 0
+            for digest in {part['hash'] for part in manifest['parts']} - referenced:
+                os.remove(self.object_path(digest))
+                removed_objects += 1
+            package = self.package_path(manifest['digest'])
+            if manifest['digest'] not in digests and os.path.exists(package):
+                os.remove(package)
+
+        return {'success': True, 'template_id': template_id, 'removed_objects': removed_objects}
+
+    def usage(self):
+        """Bytes on disk by area of the store"""
+        usage = {}
+        for area in ('objects', 'manifests', 'packages'):
+            total = 0
+            for directory, _, names in os.walk(os.path.join(self.directory, area)):
+                total += sum(os.path.getsize(os.path.join(directory, name)) for name in names)
+            usage[area] = total
+        return usage
+
+    def stats(self):
+        return {
+            'stored_objects': self.stored_objects,
+            'reused_objects': self.reused_objects,
+            'assembled': self.assembled,
+            'cache_hits': self.cache_hits
+        }
+
+
+# Process-wide store shared by the render worker's jobs
+template_store = TemplateStore()
+
+
+def main():
+    """Main function for command-line execution"""
+    commands = {'put': 3, 'clone': 3, 'checkout': 2, 'diff': 3, 'remove': 2, 'usage': 1}
+    args = sys.argv[1:]
+    if not args or args[0] not in commands or len(args) < commands[args[0]]:
+        print("Usage: python templateStore.py put <template_id> <package.pptx> [parent_id]")
+        print("       python templateStore.py clone <source_id> <template_id>")
+        print("       python templateStore.py checkout <template_id>")
+        print("       python templateStore.py diff <old_id> <new_id>")
+        print("       python templateStore.py remove <template_id>")
+        print("       python templateStore.py usage")
+        sys.exit(1)
+
+    try:
+        command = args[0]
+        if command == 'put':
+            result = template_store.put(args[1], args[2], args[3] if len(args) > 3 else None)
+        elif command == 'clone':
+            result = template_store.clone(args[1], args[2])
+        elif command == 'checkout':
+            result = template_store.checkout(args[1])
+        elif command == 'diff':
+            result = template_store.diff(args[1], args[2])
+        elif command == 'remove':
+            result = template_store.remove(args[1])
+        else:
+            result = dict(template_store.usage(), success=True)
+        print(json.dumps(result, indent=2))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Text fitting with cached font metrics
+Estimates how tall wrapped text will be in a text box without rendering it:
+each font gets a glyph advance-width table (in ems, measured once per process
+with Pillow/FreeType), words are measured with vectorized table lookups, and
+lines are broken greedily like PowerPoint's word wrap. Widths are summed
+advances without kerning, which slightly over-estimates, so "fits" errs on the
+safe side.
+
+Used by the quad chart generator to pick the largest font size that fits a
+quadrant, and by the editor to ask "will this fit?" before rendering.
+"""
+
+import os
+import sys
+import json
+import math
+import bisect
+import threading
+
+import numpy as np
+from PIL import ImageFont
+
+EMU_PER_POINT = 12700
+
+# Fonts are measured at this pixel size and scaled; large enough that rounding is negligible
+REFERENCE_SIZE = 1000
+TABLE_SIZE = 0x10000
+REPLACEMENT_CHAR = 0xFFFD
+
+# Code points measured up front: Basic Latin through Latin Extended-B, and general punctuation
+PRELOAD_RANGES = [(0x20, 0x250), (0x2000, 0x2070)]
+
+DEFAULT_LINE_SPACING = 1.2
+DEFAULT_SIZE_STEP = 0.5
+
+FONT_DIRS = [
+    path for path in [
+        os.environ.get('TEXT_FIT_FONT_DIR'),
+        '/usr/share/fonts/truetype/msttcorefonts',
+        '/usr/share/fonts/truetype/crosextra',
+        '/usr/share/fonts/truetype/liberation',
+        '/usr/share/fonts/truetype/dejavu',
+        '/usr/share/fonts/dejavu',
+        '/Library/Fonts',
+        'C:\\Windows\\Fonts'
+    ] if path
+]
+
+# Font files by (family, bold), preferring the font itself and then a metric-compatible substitute
+FONT_FILES = {
+    ('calibri', False): ['calibri.ttf', 'Calibri.ttf', 'Carlito-Regular.ttf'],
+    ('calibri', True): ['calibrib.ttf', 'Calibri Bold.ttf', 'Carlito-Bold.ttf'],
+    ('arial', False): ['arial.ttf', 'Arial.ttf', 'LiberationSans-Regular.ttf'],
+    ('arial', True): ['arialbd.ttf', 'Arial Bold.ttf', 'LiberationSans-Bold.ttf']
+}
+FALLBACK_FILES = {
+    False: ['DejaVuSans.ttf', 'LiberationSans-Regular.ttf'],
+    True: ['DejaVuSans-Bold.ttf', 'LiberationSans-Bold.ttf']
+}
+
+
+def find_font_file(family, bold=False):
+    """Path of the installed file for a font family, a substitute, or None"""
+    names = FONT_FILES.get(((family or '').lower(), bool(bold)), []) + FALLBACK_FILES[bool(bold)]
+    for name in names:
+        for directory in FONT_DIRS:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                return path
+    return None
+
+
+class GlyphWidths:
+    def __init__(self, font_file=None):
+        """
+        Advance-width table for one font file
+        Args:
+            font_file: TrueType/OpenType file, or None for Pillow's built-in font
+        """
+        self.font_file = font_file
+        if font_file:
+            self.font = ImageFont.truetype(font_file, REFERENCE_SIZE)
+        else:
+            self.font = ImageFont.load_default(REFERENCE_SIZE)
+
+        # NaN marks code points not measured yet
+        self.table = np.full(TABLE_SIZE, np.nan, dtype=np.float32)
+        self.lock = threading.Lock()
+        for start, end in PRELOAD_RANGES:
+            self.measure(range(start, end))
+        self.space = float(self.table[0x20])
+
+    def measure(self, codes):
+        with self.lock:
+            for code in codes:
+                self.table[code] = self.font.getlength(chr(code)) / REFERENCE_SIZE
+
+    def widths(self, codes):
+        """Advance widths in ems for an array of code points"""
+        # Astral characters are measured as the replacement character
+        codes = np.where(codes < TABLE_SIZE, codes, REPLACEMENT_CHAR)
+        widths = self.table[codes]
+        missing = np.isnan(widths)
+        if missing.any():
+            self.measure(int(code) for code in np.unique(codes[missing]))
+            widths = self.table[codes]
+        return widths
+
+
+metrics_lock = threading.Lock()
+metrics_cache = {}
+
+
+def get_metrics(family='Calibri', bold=False):
+    """Shared glyph-width table for a font family and weight (built on first use)"""
+    font_file = find_font_file(family, bold)
+    with metrics_lock:
+        metrics = metrics_cache.get(font_file)
+        if metrics is None:
+            metrics = metrics_cache[font_file] = GlyphWidths(font_file)
+    return metrics
+
+
+class TextLayout:
+    def __init__(self, paragraphs, metrics):
+        """
+        Measure the words of some paragraphs once, for wrapping at any width
+        Args:
+            paragraphs: List of paragraph strings
+            metrics: GlyphWidths of the font
+        """
+        words = []
+        counts = []
+        for text in paragraphs:
+            paragraph_words = text.split()
+            words.extend(paragraph_words)
+            counts.append(len(paragraph_words))
+
+        self.paragraph_count = len(paragraphs)
+        self.space = metrics.space
+        self.word_widths = np.zeros(len(words), dtype=np.float64)
+        if words:
+            lengths = np.fromiter((len(word) for word in words), dtype=np.int64, count=len(words))
+            codes = np.frombuffer(''.join(words).encode('utf-32-le'), dtype=np.uint32)
+            starts = np.cumsum(lengths) - lengths
+            self.word_widths = np.add.reduceat(metrics.widths(codes).astype(np.float64), starts)
+
+        self.ends = np.cumsum(np.array(counts, dtype=np.int64))
+        self.starts = self.ends - np.array(counts, dtype=np.int64)
+        # Running width of each word plus its following space, for bisecting line ends
+        self.offsets = np.concatenate(([0.0], np.cumsum(self.word_widths + self.space)))
+        self.paragraph_widths = self.offsets[self.ends] - self.offsets[self.starts] - self.space
+        # Plain-list copies for the scalar bisect loop, which is faster on lists than on arrays
+        self.offset_list = self.offsets.tolist()
+        self.start_list = self.starts.tolist()
+        self.end_list = self.ends.tolist()
+
+    def line_count(self, width):
+        """
+        Total wrapped lines at a line width given in ems
+        Paragraphs that fit on one line are counted in bulk; only the rest are wrapped.
+        """
+        single = self.paragraph_widths <= width
+        lines = int(np.count_nonzero(single))
+        offsets = self.offset_list
+        limit = width + self.space
+
+        for idx in np.flatnonzero(~single).tolist():
+            start, end = self.start_list[idx], self.end_list[idx]
+            while start < end:
+                stop = min(bisect.bisect_right(offsets, offsets[start] + limit, start, end + 1) - 1, end)
+                if stop <= start:
+                    # A word wider than the line is broken across lines
+                    lines += max(1, math.ceil((offsets[start + 1] - offsets[start] - self.space) / width))
+                    start += 1
+                else:
+                    lines += 1
+                    start = stop
+        return lines
+
+
+def fit_text(paragraphs, width, height, family='Calibri', bold=False, max_size=12, min_size=7,
+             step=DEFAULT_SIZE_STEP, line_spacing=DEFAULT_LINE_SPACING, space_after=0):
+    """
+    Find the largest font size at which paragraphs fit in a text area
+    Args:
+        paragraphs: List of paragraph strings
+        width, height: Text area inside the frame margins, in EMU
+        family, bold: Font to measure with
+        max_size, min_size, step: Candidate font sizes in points
+        line_spacing: Line height as a multiple of the font size
+        space_after: Space after each paragraph in points
+    Returns:
+        {'size', 'fits', 'lines', 'height', 'available', 'overflow'} with sizes and heights in
+        points; when nothing fits, size is min_size and overflow is how much is cut off
+    """
+    layout = TextLayout(paragraphs, get_metrics(family, bold))
+    width_pt = width / EMU_PER_POINT
+    available = height / EMU_PER_POINT
+
+    def measure(size):
+        lines = layout.line_count(width_pt / size) if layout.paragraph_count else 0
+        return lines, lines * size * line_spacing + layout.paragraph_count * space_after
+
+    sizes = np.arange(min_size, max_size + step / 2, step)
+    # Text height grows with the font size, so binary search for the largest size that fits
+    low, high = 0, len(sizes) - 1
+    best = None
+    while low <= high:
+        mid = (low + high) // 2
+        lines, text_height = measure(float(sizes[mid]))
+        if text_height <= available:
+            best = (float(sizes[mid]), lines, text_height)
+            low = mid + 1
+        else:
+            high = mid - 1
+
+    fits = best is not None
+    if not fits:
+        best = (float(min_size),) + measure(float(min_size))
+    size, lines, text_height = best
+
+    return {
+        'size': size,
+        'fits': fits,
+        'lines': lines,
+        'height': round(text_height, 2),
+        'available': round(available, 2),
+        'overflow': round(max(0.0, text_height - available), 2)
+    }
+
+
+def main():
+    """Main function for command-line execution"""
+    if len(sys.argv) < 4:
+        print("Usage: python textFit.py <text|-> <width_emu> <height_emu> [font_family]")
+        sys.exit(1)
+
+    try:
+        text = sys.stdin.read() if sys.argv[1] == '-' else sys.argv[1]
+        result = fit_text(
+            text.split('\n'),
+            int(sys.argv[2]),
+            int(sys.argv[3]),
+            family=sys.argv[4] if len(sys.argv) > 4 else 'Calibri'
+        )
+        print(json.dumps(result))
+    except Exception as e:
+        print(json.dumps({'success': False, 'error': str(e)}), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
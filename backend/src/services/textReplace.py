@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Placeholder replacement engine for DrawingML paragraphs
+Matches placeholders across run boundaries in one linear pass per paragraph and
+keeps formatting by leaving (or copying) each run's <a:rPr> element whole,
+instead of reading and re-applying font properties through python-pptx proxies.
+
+Works on plain lxml <a:p> elements, so it serves both the python-pptx object
+model (paragraph._p) and raw slide XML parsed straight from the package.
+"""
+
+import re
+from bisect import bisect_right
+from copy import deepcopy
+
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+R_TAG = f'{{{A_NS}}}r'
+T_TAG = f'{{{A_NS}}}t'
+RPR_TAG = f'{{{A_NS}}}rPr'
+BR_TAG = f'{{{A_NS}}}br'
+FLD_TAG = f'{{{A_NS}}}fld'
+END_PARA_RPR_TAG = f'{{{A_NS}}}endParaRPr'
+
+# Same escaping python-pptx applies to run text: keep tab and line feed only
+CTRL_CHARS = re.compile(r'([\x00-\x08\x0B-\x1F])')
+
+
+def escape_ctrl_chars(text):
+    return CTRL_CHARS.sub(lambda match: '_x%04X_' % ord(match.group(1)), text)
+
+
+def run_text(run):
+    t = run.find(T_TAG)
+    if t is None or t.text is None:
+        return ''
+    return t.text
+
+
+def set_run_text(run, text):
+    t = run.find(T_TAG)
+    if t is None:
+        t = run.makeelement(T_TAG, {})
+        run.append(t)
+    t.text = escape_ctrl_chars(text)
+
+
+def run_segments(paragraph):
+    """Yield lists of consecutive <a:r> runs; line breaks and fields split segments"""
+    segment = []
+    for child in paragraph:
+        if child.tag == R_TAG:
+            segment.append(child)
+        elif segment:
+            yield segment
+            segment = []
+    if segment:
+        yield segment
+
+
+def replace_in_runs(runs, pattern, substitute):
+    """
+    Replace every match of pattern in the concatenated text of runs
+    Replacement text goes into the run where the match starts, keeping that run's
+    formatting; runs emptied because they only held the rest of a placeholder are
+    removed. substitute(match) may return None to leave a match untouched.
+    Returns the number of replacements made.
+    """
+    texts = [run_text(run) for run in runs]
+    joined = ''.join(texts)
+    if not pattern.search(joined):
+        return 0
+
+    # offsets[i] is where run i starts in the joined text
+    offsets = []
+    position = 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text)
+
+    pieces = [[] for _ in runs]
+
+    def emit(start, end):
+        # Hand original characters back to the runs they came from
+        while start < end:
+            idx = bisect_right(offsets, start) - 1
+            chunk_end = min(end, offsets[idx] + len(texts[idx]))
+            pieces[idx].append(joined[start:chunk_end])
+            start = chunk_end
+
+    count = 0
+    position = 0
+    for match in pattern.finditer(joined):
+        replacement = substitute(match)
+        if replacement is None:
+            continue
+        emit(position, match.start())
+        # Last run starting at or before the match is the one holding its first character
+        idx = bisect_right(offsets, match.start()) - 1
+        pieces[idx].append(replacement)
+        position = match.end()
+        count += 1
+
+    if not count:
+        return 0
+    emit(position, len(joined))
+
+    for run, original, new_pieces in zip(runs, texts, pieces):
+        new_text = ''.join(new_pieces)
+        if new_text == original:
+            continue
+        if original and not new_text:
+            run.getparent().remove(run)
+        else:
+            set_run_text(run, new_text)
+
+    return count
+
+
+def replace_in_paragraph(paragraph, pattern, substitute):
+    """Replace pattern matches in an <a:p> element; returns the replacement count"""
+    count = 0
+    for runs in list(run_segments(paragraph)):
+        count += replace_in_runs(runs, pattern, substitute)
+    return count
+
+
+def literal_pattern(keys):
+    """
+    One matcher for all literal keys; longest first so overlapping keys prefer the longer one
+    Ties are broken alphabetically, so the same key set always gives the same pattern
+    (fill plans are cached by pattern).
+    """
+    ordered = sorted(set(keys), key=lambda key: (-len(key), key))
+    if not ordered:
+        # Matches nothing
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(re.escape(key) for key in ordered))
+
+
+def literal_replacer(replacements):
+    """Return (pattern, substitute) replacing each literal key with its value"""
+    return literal_pattern(replacements), lambda match: replacements[match.group(0)]
+
+
+def copy_run_format(source_run, target_run):
+    """Give target_run a copy of source_run's <a:rPr> element (or none if it has none)"""
+    existing = target_run.find(RPR_TAG)
+    if existing is not None:
+        target_run.remove(existing)
+    rpr = source_run.find(RPR_TAG)
+    if rpr is not None:
+        target_run.insert(0, deepcopy(rpr))
+
+
+def set_paragraph_text(paragraph, text):
+    """
+    Replace all text in an <a:p> with one run formatted like its first run
+    Paragraph properties (<a:pPr>) and <a:endParaRPr> are kept.
+    """
+    first_run = paragraph.find(R_TAG)
+    for child in list(paragraph):
+        if child.tag in (R_TAG, BR_TAG, FLD_TAG):
+            paragraph.remove(child)
+
+    run = paragraph.makeelement(R_TAG, {})
+    if first_run is not None:
+        copy_run_format(first_run, run)
+    set_run_text(run, text)
+
+    # Runs go before <a:endParaRPr>, which must stay last
+    end_props = paragraph.find(END_PARA_RPR_TAG)
+    if end_props is not None:
+        end_props.addprevious(run)
+    else:
+        paragraph.append(run)
+    return run
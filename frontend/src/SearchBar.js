@@ -1,22 +1,42 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
+
+const API_BASE = 'http://192.168.50.2:5005';
+const SEARCH_DELAY_MS = 200;
 
 const SearchBar = ({ documents, onSelectDocument }) => {
   const [searchTerm, setSearchTerm] = useState('');
-  const [filteredDocs, setFilteredDocs] = useState([]);
+  const [results, setResults] = useState([]);
   const [showResults, setShowResults] = useState(false);
+  const latestQuery = useRef('');
 
-  const handleSearch = (term) => {
-    setSearchTerm(term);
-    if (term.length > 0) {
-      const filtered = documents.filter(doc =>
-        doc.toLowerCase().includes(term.toLowerCase())
-      );
-      setFilteredDocs(filtered);
-      setShowResults(true);
-    } else {
+  // Ranked section search on the server; document names are matched locally if it is unavailable
+  useEffect(() => {
+    const term = searchTerm.trim();
+    latestQuery.current = term;
+    if (!term) {
       setShowResults(false);
+      return undefined;
     }
-  };
+
+    const timer = setTimeout(async () => {
+      let found;
+      try {
+        const response = await fetch(`${API_BASE}/api/content/search?q=${encodeURIComponent(term)}&limit=10`);
+        if (!response.ok) throw new Error(`Search failed: ${response.status}`);
+        found = (await response.json()).results;
+      } catch (error) {
+        found = documents
+          .filter(doc => doc.toLowerCase().includes(term.toLowerCase()))
+          .map(doc => ({ document: doc, title: doc.replace('.md', '').replace(/_/g, ' ') }));
+      }
+      if (latestQuery.current === term) {
+        setResults(found);
+        setShowResults(true);
+      }
+    }, SEARCH_DELAY_MS);
+
+    return () => clearTimeout(timer);
+  }, [searchTerm, documents]);
 
   return (
     <div style={{ position: 'relative', marginBottom: '30px' }}>
@@ -24,7 +44,7 @@ const SearchBar = ({ documents, onSelectDocument }) => {
         type="text"
         placeholder="Search documents..."
         value={searchTerm}
-        onChange={(e) => handleSearch(e.target.value)}
+        onChange={(e) => setSearchTerm(e.target.value)}
         style={{
           width: '100%',
           padding: '12px 20px',
@@ -35,7 +55,7 @@ const SearchBar = ({ documents, onSelectDocument }) => {
         }}
       />
       
-      {showResults && filteredDocs.length > 0 && (
+      {showResults && results.length > 0 && (
         <div style={{
           position: 'absolute',
           top: '100%',
@@ -48,11 +68,11 @@ const SearchBar = ({ documents, onSelectDocument }) => {
           boxShadow: '0 4px 6px rgba(0,0,0,0.1)',
           zIndex: 10
         }}>
-          {filteredDocs.map(doc => (
+          {results.map(result => (
             <div
-              key={doc}
+              key={`${result.file || result.document}#${result.section || ''}`}
               onClick={() => {
-                onSelectDocument(doc);
+                onSelectDocument(result.file || result.document, result.section);
                 setShowResults(false);
                 setSearchTerm('');
               }}
@@ -61,10 +81,17 @@ const SearchBar = ({ documents, onSelectDocument }) => {
                 cursor: 'pointer',
                 borderBottom: '1px solid #eee'
               }}
-              onMouseEnter={(e) => e.target.style.background = '#f5f5f5'}
-              onMouseLeave={(e) => e.target.style.background = 'white'}
+              onMouseEnter={(e) => e.currentTarget.style.background = '#f5f5f5'}
+              onMouseLeave={(e) => e.currentTarget.style.background = 'white'}
             >
-              {doc.replace('.md', '').replace(/_/g, ' ')}
+              <div style={{ fontWeight: 'bold' }}>{result.title}</div>
+              {result.snippet && (
+                // Snippets are HTML-escaped by the search service; only <mark> tags are added
+                <div
+                  style={{ fontSize: '13px', color: '#555', marginTop: '4px' }}
+                  dangerouslySetInnerHTML={{ __html: result.snippet }}
+                />
+              )}
             </div>
           ))}
         </div>
@@ -1,22 +1,76 @@
 import React, { useState, useEffect } from 'react';
+import SearchBar from '../SearchBar';
+
+const API_BASE = 'http://192.168.50.2:5005';
+
+// Sections per request; later pages are fetched on demand so large documents paint quickly
+const PAGE_SIZE = 20;
+
+// Rendered HTML of a documentation page (by slug) or of any content document (by corpus path)
+const htmlUrl = ({ slug, document }, params) => {
+  const url = slug
+    ? new URL(`${API_BASE}/api/content/documentation/${slug}/html`)
+    : new URL(`${API_BASE}/api/content/html?document=${encodeURIComponent(document)}`);
+  Object.entries(params).forEach(([key, value]) => url.searchParams.set(key, value));
+  return url;
+};
 
 const BDBibleViewer = () => {
   const [content, setContent] = useState([]);
   const [selectedDoc, setSelectedDoc] = useState(null);
+  const [related, setRelated] = useState([]);
 
   useEffect(() => {
     // Fetch list of documents
-    fetch('http://192.168.50.2:5005/api/content/documentation')
+    fetch(`${API_BASE}/api/content/documentation`)
       .then(res => res.json())
       .then(data => setContent(data))
       .catch(err => console.error('Error fetching content:', err));
   }, []);
 
+  // Rendered HTML pages (or one section); paging state comes back in the X-Total-Sections / X-Has-More headers
+  const fetchPage = (source, page, section) =>
+    fetch(htmlUrl(source, section ? { section } : { page, pageSize: PAGE_SIZE }))
+      .then(res => (res.ok ? res.text() : Promise.reject(new Error(`HTTP ${res.status}`))).then(content => ({
+        content,
+        source,
+        page,
+        section,
+        totalSections: parseInt(res.headers.get('X-Total-Sections'), 10) || 0,
+        hasMore: res.headers.get('X-Has-More') === 'true'
+      })));
+
+  const loadRelated = (document, section) => {
+    setRelated([]);
+    const sectionParam = section ? `&section=${encodeURIComponent(section)}` : '';
+    fetch(`${API_BASE}/api/content/related?document=${encodeURIComponent(document)}${sectionParam}&limit=8`)
+      .then(res => (res.ok ? res.json() : { related: [] }))
+      .then(data => setRelated(data.related))
+      .catch(err => console.error('Error loading related sections:', err));
+  };
+
   const loadDocument = (slug) => {
-    fetch(`http://192.168.50.2:5005/api/content/documentation/${slug}`)
-      .then(res => res.json())
+    fetchPage({ slug }, 0)
       .then(data => setSelectedDoc(data))
       .catch(err => console.error('Error loading document:', err));
+    loadRelated(`${slug}.md`);
+  };
+
+  // Any content document, e.g. a search result; opens just the given section if there is one
+  const openDocument = (document, section) => {
+    fetchPage({ document }, 0, section)
+      .then(data => setSelectedDoc(data))
+      .catch(err => console.error('Error loading document:', err));
+    loadRelated(document, section);
+  };
+
+  const loadMore = () => {
+    const { source, page } = selectedDoc;
+    fetchPage(source, page + 1)
+      .then(data => setSelectedDoc(prev => (
+        prev && prev.source === source ? { ...data, content: prev.content + data.content } : prev
+      )))
+      .catch(err => console.error('Error loading more sections:', err));
   };
 
   return (
@@ -49,8 +103,69 @@ const BDBibleViewer = () => {
 
       {/* Content Area */}
       <div style={{ flex: 1, padding: '40px', background: 'white', margin: '20px', borderRadius: '8px' }}>
+        <SearchBar documents={content.map(doc => `${doc.slug}.md`)} onSelectDocument={openDocument} />
         {selectedDoc ? (
-          <div dangerouslySetInnerHTML={{ __html: selectedDoc.content }} />
+          <div>
+            <div dangerouslySetInnerHTML={{ __html: selectedDoc.content }} />
+            {selectedDoc.section && (
+              <button
+                onClick={() => openDocument(selectedDoc.source.document)}
+                style={{
+                  marginTop: '20px',
+                  padding: '10px 20px',
+                  background: '#006633',
+                  color: 'white',
+                  border: 'none',
+                  borderRadius: '4px',
+                  cursor: 'pointer'
+                }}
+              >
+                View full document ({selectedDoc.totalSections} sections)
+              </button>
+            )}
+            {selectedDoc.hasMore && (
+              <button
+                onClick={loadMore}
+                style={{
+                  marginTop: '20px',
+                  padding: '10px 20px',
+                  background: '#006633',
+                  color: 'white',
+                  border: 'none',
+                  borderRadius: '4px',
+                  cursor: 'pointer'
+                }}
+              >
+                Load more ({selectedDoc.totalSections - (selectedDoc.page + 1) * PAGE_SIZE} sections)
+              </button>
+            )}
+            {related.length > 0 && (
+              <div style={{ marginTop: '40px', borderTop: '2px solid #FFCC33', paddingTop: '20px' }}>
+                <h3 style={{ color: '#006633' }}>Related Sections</h3>
+                <ul style={{ listStyle: 'none', padding: 0 }}>
+                  {related.map(item => (
+                    <li key={`${item.file}#${item.section}`} style={{ margin: '8px 0' }}>
+                      <button
+                        onClick={() => openDocument(item.file, item.section)}
+                        disabled={!item.file.endsWith('.md')}
+                        style={{
+                          background: 'transparent',
+                          border: 'none',
+                          padding: 0,
+                          color: '#006633',
+                          cursor: item.file.endsWith('.md') ? 'pointer' : 'default',
+                          textAlign: 'left'
+                        }}
+                      >
+                        <strong>{item.title}</strong>
+                        <span style={{ color: '#666' }}> — {item.document.replace(/\.(md|txt)$/, '').replace(/_/g, ' ')}</span>
+                      </button>
+                    </li>
+                  ))}
+                </ul>
+              </div>
+            )}
+          </div>
         ) : (
           <div>
             <h1 style={{ color: '#006633' }}>Welcome to BD Bible</h1>